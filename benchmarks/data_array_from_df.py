@@ -0,0 +1,58 @@
+"""Benchmark reading DataArrays from DataFrames
+
+Compares :meth:`smif.data_layer.data_array.DataArray.from_df`, which maps index labels to
+positions with numpy, against the previous route through xarray (``DataFrame.to_xarray`` then
+reindexing to the spec's coordinates).
+
+Run with::
+
+    python benchmarks/data_array_from_df.py
+"""
+import timeit
+
+import numpy as np
+from smif.data_layer.data_array import DataArray
+from smif.metadata import Spec
+
+
+def setup(n_regions, n_intervals):
+    """Spec and shuffled DataFrame for a regions x intervals output
+    """
+    spec = Spec(
+        name='energy_demand',
+        dtype='float',
+        dims=['lad', 'hourly'],
+        coords={
+            'lad': ['E{:08d}'.format(i) for i in range(n_regions)],
+            'hourly': list(range(n_intervals))
+        }
+    )
+    dataframe = DataArray(spec, np.random.rand(n_regions, n_intervals)).as_df()
+    dataframe = dataframe.sample(frac=1, random_state=1)
+    return spec, dataframe
+
+
+def via_xarray(spec, dataframe):
+    """Previous implementation of DataArray.from_df
+    """
+    xr_data_array = dataframe.to_xarray()[spec.name]
+    return DataArray.from_xarray(spec, xr_data_array)
+
+
+def main():
+    print("{:>10} {:>12} {:>12} {:>8}".format('cells', 'xarray (s)', 'numpy (s)', 'speedup'))
+    for n_regions, n_intervals in [(100, 10), (400, 250), (400, 8760)]:
+        spec, dataframe = setup(n_regions, n_intervals)
+        assert via_xarray(spec, dataframe) == DataArray.from_df(spec, dataframe)
+
+        number = 3
+        xr_time = min(timeit.repeat(
+            lambda: via_xarray(spec, dataframe), number=number, repeat=3)) / number
+        np_time = min(timeit.repeat(
+            lambda: DataArray.from_df(spec, dataframe), number=number, repeat=3)) / number
+        print("{:>10} {:>12.4f} {:>12.4f} {:>7.1f}x".format(
+            n_regions * n_intervals, xr_time, np_time, xr_time / np_time))
+
+
+if __name__ == '__main__':
+    main()
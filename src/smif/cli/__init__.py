@@ -6,6 +6,12 @@ This command line interface implements a number of methods.
 - `setup` creates an example project with the recommended folder structure
 - `run` performs a simulation of an individual sector model, or the whole system
         of systems model
+- `worker` runs jobs queued by `run --queue`, so that a model run can be spread over
+           many processes or machines
+- `compile` validates the project configuration and compiles it to a snapshot which is read
+            instead of the YAML files until they change
+- `migrate` rewrites binary data files written by earlier versions of smif in the current
+            layout and compression
 - `validate` performs a validation check of the configuration file
 - `app` runs the graphical user interface, opening in a web browser
 
@@ -76,9 +82,12 @@ import smif
 import smif.cli.log
 from smif.controller import (ModelRunScheduler, copy_project_folder,
                              execute_model_run)
+from smif.controller.work_queue import WorkQueue, WorkQueueBackend, run_worker
 from smif.data_layer import Store
 from smif.data_layer.file import (CSVDataStore, FileMetadataStore,
                                   ParquetDataStore, YamlConfigStore)
+from smif.data_layer.file.config_snapshot import ConfigSnapshot
+from smif.data_layer.validate import validate_sos_model_config
 from smif.http_api import create_app
 
 try:
@@ -222,12 +231,82 @@ def run_model_runs(args):
         model_run_ids = [args.modelrun]
 
     store = _get_store(args)
-    execute_model_run(model_run_ids, store, args.warm)
+    if args.queue:
+        backend = WorkQueueBackend(_get_queue(args))
+    else:
+        backend = None
+    execute_model_run(model_run_ids, store, args.warm, args.workers, backend,
+                      args.write_behind, args.results_cache * 1024 * 1024)
     logger.profiling_stop('run_model_runs', '{:s}, {:s}, {:s}'.format(
         args.modelrun, args.interface, args.directory))
     logger.summary()
 
 
+def run_queue_worker(args):
+    """Run jobs from the project work queue
+
+    Parameters
+    ----------
+    args
+    """
+    store = _get_store(args)
+    run_worker(store, _get_queue(args), args.poll, args.idle_timeout)
+
+
+def migrate_binary_data(args):
+    """Rewrite binary (Parquet) data and results files in the current layout and
+    compression
+
+    Parameters
+    ----------
+    args
+    """
+    data_store = ParquetDataStore(args.directory, compression=args.compression)
+    migrated = data_store.migrate()
+    print("Migrated {} files".format(len(migrated)))
+
+
+def rebuild_results_catalogue(args):
+    """Rebuild the catalogue of results, for example of results written before the
+    catalogue existed
+
+    Parameters
+    ----------
+    args
+    """
+    store = _get_store(args)
+    model_runs = args.model_run if args.model_run else None
+    count = store.data_store.rebuild_catalogue(model_runs)
+    print("Catalogued {} results".format(count))
+
+
+def compile_config(args):
+    """Validate the project configuration, then compile it to a snapshot
+
+    Parameters
+    ----------
+    args
+    """
+    config_store = YamlConfigStore(args.directory, validation=True)
+    metadata_store = FileMetadataStore(args.directory)
+
+    models = config_store.read_models()
+    scenarios = config_store.read_scenarios()
+    for sos_model in config_store.read_sos_models():
+        validate_sos_model_config(sos_model, models, scenarios)
+    config_store.read_model_runs()
+    metadata_store.read_dimensions(skip_coords=True)
+
+    count = ConfigSnapshot(args.directory).compile()
+    print("Compiled {} configuration files".format(count))
+
+
+def _get_queue(args):
+    """Construct work queue in the project directory
+    """
+    return WorkQueue(os.path.join(args.directory, 'queue'))
+
+
 def _get_store(args):
     """Contruct store as configured by arguments
     """
@@ -238,6 +317,13 @@ def _get_store(args):
             data_store=CSVDataStore(args.directory),
             model_base_folder=args.directory
         )
+    elif args.interface == 'local_hybrid':
+        store = Store(
+            config_store=YamlConfigStore(args.directory),
+            metadata_store=FileMetadataStore(args.directory),
+            data_store=CSVDataStore(args.directory, hybrid=True),
+            model_base_folder=args.directory
+        )
     elif args.interface == 'local_binary':
         store = Store(
             config_store=YamlConfigStore(args.directory),
@@ -323,7 +409,7 @@ def parse_arguments():
                                'progress, -vv to see debug messages.')
     parent_parser.add_argument('-i', '--interface',
                                default='local_csv',
-                               choices=['local_csv', 'local_binary'],
+                               choices=['local_csv', 'local_hybrid', 'local_binary'],
                                help="Select the data interface (default: %(default)s)")
     parent_parser.add_argument('-d', '--directory',
                                default='.',
@@ -361,6 +447,23 @@ def parse_arguments():
         help="Name of the model run to list missing results"
     )
 
+    # CATALOGUE
+    parser_catalogue = subparsers.add_parser(
+        'catalogue', help='Rebuild the catalogue of available results',
+        parents=[parent_parser])
+    parser_catalogue.set_defaults(func=rebuild_results_catalogue)
+    parser_catalogue.add_argument(
+        'model_run',
+        nargs='*',
+        help="Names of the model runs to catalogue (default: all with results)"
+    )
+
+    # COMPILE
+    parser_compile = subparsers.add_parser(
+        'compile', help='Validate and compile the project configuration',
+        parents=[parent_parser])
+    parser_compile.set_defaults(func=compile_config)
+
     # APP
     parser_app = subparsers.add_parser(
         'app', help='Open smif app', parents=[parent_parser])
@@ -374,6 +477,22 @@ def parse_arguments():
                             action='store_true',
                             help="Use intermediate results from the last modelrun \
                                   and continue from where it had left")
+    parser_run.add_argument('-j', '--workers',
+                            type=int,
+                            default=1,
+                            help="Number of model jobs to run in parallel \
+                                  (default: %(default)s)")
+    parser_run.add_argument('-q', '--queue',
+                            action='store_true',
+                            help="Queue model jobs to be run by `smif worker` processes")
+    parser_run.add_argument('--write-behind',
+                            action='store_true',
+                            help="Write results in the background while models run")
+    parser_run.add_argument('--results-cache',
+                            type=int,
+                            default=256,
+                            help="Megabytes of results to keep in memory for dependent \
+                                  models (default: %(default)s)")
     parser_run.add_argument('-b', '--batchfile',
                             action='store_true',
                             help="Use a batchfile instead of a modelrun name (a \
@@ -381,6 +500,31 @@ def parse_arguments():
     parser_run.add_argument('modelrun',
                             help="Name of the model run to run")
 
+    # WORKER
+    parser_worker = subparsers.add_parser(
+        'worker', help='Run queued model jobs', parents=[parent_parser])
+    parser_worker.set_defaults(func=run_queue_worker)
+    parser_worker.add_argument('--poll',
+                               type=float,
+                               default=1.0,
+                               help="Seconds to wait between checks for queued jobs \
+                                     (default: %(default)s)")
+    parser_worker.add_argument('--idle-timeout',
+                               type=float,
+                               default=None,
+                               help="Stop after this many seconds without queued jobs \
+                                     (default: run until stopped)")
+
+    # MIGRATE
+    parser_migrate = subparsers.add_parser(
+        'migrate', help='Migrate binary data files', parents=[parent_parser])
+    parser_migrate.set_defaults(func=migrate_binary_data)
+    parser_migrate.add_argument('-c', '--compression',
+                                default='snappy',
+                                choices=['snappy', 'gzip', 'brotli', 'lz4', 'zstd', 'none'],
+                                help="Compression codec for rewritten files \
+                                      (default: %(default)s)")
+
     return parser
 
 
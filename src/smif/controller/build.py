@@ -67,7 +67,7 @@ def get_scenario_models(scenarios, handler):
     """
     scenario_models = []
     for scenario_name, variant_name in scenarios.items():
-        scenario_definition = handler.read_scenario(scenario_name)
+        scenario_definition = handler.read_scenario(scenario_name, lazy_coords=True)
 
         # assign variant name to definition
         scenario_definition['scenario'] = variant_name
@@ -98,7 +98,7 @@ def get_sector_models(sector_model_names, handler):
     sector_models = []
     loader = ModelLoader()
     for sector_model_name in sector_model_names:
-        sector_model_config = handler.read_model(sector_model_name)
+        sector_model_config = handler.read_model(sector_model_name, lazy_coords=True)
 
         # absolute path to be crystal clear for ModelLoader when loading python class
         sector_model_config['path'] = os.path.normpath(
@@ -5,13 +5,25 @@ from smif.controller.build import build_model_run, get_model_run_definition
 from smif.exception import SmifModelRunError
 
 
-def execute_model_run(model_run_ids, store, warm=False):
+def execute_model_run(model_run_ids, store, warm=False, max_workers=1, backend=None,
+                      write_behind=False, results_cache_size=None):
     """Runs the model run
 
     Parameters
     ----------
     modelrun_ids: list
         Modelrun ids that should be executed sequentially
+    store: smif.data_layer.Store
+    warm: bool, default=False
+        Continue from the last timestep with results available
+    max_workers: int, default=1
+        Number of model jobs to run concurrently within each model run
+    backend: smif.controller.scheduler.JobBackend, optional
+        Backend to dispatch model jobs to, for example a work queue
+    write_behind: bool, default=False
+        Write results in the background while models run
+    results_cache_size: int, optional
+        Maximum size in bytes of results kept in memory for dependent models
     """
     model_run_definitions = []
     for model_run in model_run_ids:
@@ -27,9 +39,12 @@ def execute_model_run(model_run_ids, store, warm=False):
 
         try:
             if warm:
-                modelrun.run(store, store.prepare_warm_start(modelrun.name))
+                modelrun.run(store, store.prepare_warm_start(modelrun.name), max_workers,
+                             backend, write_behind, results_cache_size)
             else:
-                modelrun.run(store)
+                modelrun.run(store, max_workers=max_workers, backend=backend,
+                             write_behind=write_behind,
+                             results_cache_size=results_cache_size)
         except SmifModelRunError as ex:
             logging.exception(ex)
             exit(1)
@@ -116,12 +116,26 @@ class ModelRun(object):
     def model_horizon(self, value):
         self._model_horizon = sorted(list(set(value)))
 
-    def run(self, store, warm_start_timestep=None):
+    def run(self, store, warm_start_timestep=None, max_workers=1, backend=None,
+            write_behind=False, results_cache_size=None):
         """Builds all the objects and passes them to the ModelRunner
 
         The idea is that this will add ModelRuns to a queue for asychronous
         processing
 
+        Arguments
+        ---------
+        store : :class:`smif.data_layer.Store`
+        warm_start_timestep : int, default=None
+            Timestep from which to restart a previous model run
+        max_workers : int, default=1
+            Number of jobs to run concurrently
+        backend : smif.controller.scheduler.JobBackend, optional
+            Backend to dispatch jobs to, instead of running them locally
+        write_behind : bool, default=False
+            Write results in the background while models run
+        results_cache_size : int, optional
+            Maximum size in bytes of results kept in memory for dependent models
         """
         self.logger.debug("Running model run %s", self.name)
         self.logger.profiling_start('modelrun.run', self.name)
@@ -133,7 +147,7 @@ class ModelRun(object):
                 idx = self.model_horizon.index(warm_start_timestep)
                 self.model_horizon = self.model_horizon[idx:]
             self.status = 'Running'
-            modelrunner = ModelRunner()
+            modelrunner = ModelRunner(max_workers, backend, write_behind, results_cache_size)
             modelrunner.solve_model(self, store)
             self.status = 'Successful'
         else:
@@ -145,9 +159,25 @@ class ModelRun(object):
 class ModelRunner(object):
     """The ModelRunner orchestrates the simulation of a SoSModel over decision iterations and
     timesteps as provided by a DecisionManager.
+
+    Arguments
+    ---------
+    max_workers : int, default=1
+        Number of jobs the JobScheduler may run concurrently
+    backend : smif.controller.scheduler.JobBackend, optional
+        Backend the JobScheduler dispatches jobs to
+    write_behind : bool, default=False
+        Write results in the background while models run
+    results_cache_size : int, optional
+        Maximum size in bytes of results kept in memory for dependent models
     """
-    def __init__(self):
+    def __init__(self, max_workers=1, backend=None, write_behind=False,
+                 results_cache_size=None):
         self.logger = getLogger(__name__)
+        self.max_workers = max_workers
+        self.backend = backend
+        self.write_behind = write_behind
+        self.results_cache_size = results_cache_size
 
     def solve_model(self, model_run, store):
         """Solve a ModelRun
@@ -174,20 +204,67 @@ class ModelRunner(object):
 
         # Initialise the job scheduler
         self.logger.debug("Initialising the job scheduler")
-        job_scheduler = JobScheduler()
+        job_scheduler = JobScheduler(self.max_workers, self.backend, self.write_behind,
+                                     self.results_cache_size)
         job_scheduler.store = store
 
         for bundle in decision_manager.decision_loop():
-            # each iteration is independent at this point, so the following loop is a
-            # candidate for running in parallel
             job_graph = self.build_job_graph(model_run, bundle)
 
-            job_id, err = job_scheduler.add(job_graph)
-            self.logger.debug("Running job %s", job_id)
-            if err is not None:
-                status = job_scheduler.get_status(job_id)
-                self.logger.debug("Job %s %s", job_id, status['status'])
-                raise err
+            if job_scheduler.backend is not None and len(bundle['decision_iterations']) > 1:
+                # each iteration is independent at this point, so run each decision
+                # iteration on its own worker, which initialises its own copy of the models
+                for job_id, err in job_scheduler.add_many(self.split_job_graph(job_graph)):
+                    self._check_job(job_scheduler, job_id, err)
+            else:
+                self._check_job(job_scheduler, *job_scheduler.add(job_graph))
+
+    def _check_job(self, job_scheduler, job_id, err):
+        """Raise any error from running a job graph
+        """
+        self.logger.debug("Running job %s", job_id)
+        if err is not None:
+            status = job_scheduler.get_status(job_id)
+            self.logger.debug("Job %s %s", job_id, status['status'])
+            raise err
+
+    @staticmethod
+    def split_job_graph(job_graph):
+        """Split a bundle job graph into independent job graphs
+
+        Simulate jobs are grouped by decision iteration. Jobs from a previous bundle, which
+        only appear in the graph as the source of between-bundle edges, are left out as they
+        have already been run.
+
+        Any before_model_run jobs are included in every decision iteration's job graph, as
+        each job graph may run on a different worker, with its own copy of the models.
+
+        Arguments
+        ---------
+        job_graph : :class:`networkx.DiGraph`
+            A job graph as returned by :meth:`build_job_graph`
+
+        Returns
+        -------
+        list
+            A :class:`networkx.DiGraph` for each decision iteration in the bundle, sorted by
+            decision iteration
+        """
+        before_model_run_nodes = []
+        iteration_nodes = {}
+        for job_node_id, job in job_graph.nodes(data=True):
+            if 'operation' not in job:
+                continue
+            if job['operation'] is ModelOperation.BEFORE_MODEL_RUN:
+                before_model_run_nodes.append(job_node_id)
+            else:
+                iteration = job['decision_iteration']
+                iteration_nodes.setdefault(iteration, []).append(job_node_id)
+
+        return [
+            job_graph.subgraph(before_model_run_nodes + iteration_nodes[iteration]).copy()
+            for iteration in sorted(iteration_nodes)
+        ]
 
     def build_job_graph(self, model_run, bundle):
         """ Build a job graph
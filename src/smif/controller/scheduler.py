@@ -1,20 +1,26 @@
 """Schedulers are used to run models.
 
 The defaults provided allow model runs to be scheduled as subprocesses,
-or individual models to be called in series.
+or individual models to be called in series or in parallel on a local pool
+of worker processes.
 
-Future implementations may interface with common schedulers to queue
-up models to run in parallel and/or distributed.
+Jobs may also be queued up to run distributed, on workers which share the
+store, through a :class:`~smif.controller.work_queue.WorkQueueBackend`.
 """
 import itertools
 import logging
 import subprocess
 import traceback
+import uuid
+from abc import ABCMeta, abstractmethod
 from collections import defaultdict
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                as_completed, wait)
 from datetime import datetime
 
 import networkx
 from smif.data_layer import DataHandle
+from smif.data_layer.data_handle import RunContext
 from smif.model import ModelOperation
 
 
@@ -159,12 +165,56 @@ class ModelRunScheduler(object):
 
 class JobScheduler(object):
     """Run JobGraphs produced by a :class:`~smif.controller.modelrun.ModelRun`
+
+    Parameters
+    ----------
+    max_workers : int, default=1
+        Maximum number of jobs to run at once. With a single worker, jobs are run one after
+        another in topological order. With more than one worker, each job is dispatched to a
+        pool of worker processes as soon as all of its predecessors in the job graph have
+        finished.
+    backend : JobBackend, optional
+        Backend to dispatch jobs to, for example a
+        :class:`~smif.controller.work_queue.WorkQueueBackend`. If provided,
+        overrides the local process pool set up by `max_workers`.
+    write_behind : bool, default=False
+        Write results in the background while models run (see
+        :class:`~smif.data_layer.results_buffer.ResultsBuffer`). All results are written
+        before each job graph finishes, or, when jobs are run one at a time on a pool of
+        worker processes, before each job finishes. Jobs run by a work queue write results
+        as they are set.
+    results_cache_size : int, optional
+        Maximum size in bytes of results kept in memory for dependent models in each
+        process, see :class:`~smif.data_layer.data_handle.RunContext`
+
+    Notes
+    -----
+    Model run configuration and parameters are read from the store once, by the first job
+    to run in each modelrun, then shared by later jobs run by this JobScheduler (see
+    :class:`~smif.data_layer.data_handle.RunContext`).
+
+    When running in parallel, each worker process holds its own copy of the models and of
+    the store, so models must exchange data through the store and the store must be backed
+    by something that all workers can share, such as the filesystem. Each worker calls a
+    model's ``before_model_run`` before the first simulate job it runs for that model, so
+    ``before_model_run`` may be called once in each worker process.
     """
-    def __init__(self):
+    def __init__(self, max_workers=1, backend=None, write_behind=False,
+                 results_cache_size=None):
         self._status = defaultdict(lambda: 'unstarted')
         self._id_counter = itertools.count()
         self.logger = logging.getLogger(__name__)
         self.store = None
+        self._contexts = {}
+        if max_workers < 1:
+            raise ValueError("JobScheduler needs at least one worker, got {}".format(
+                max_workers))
+        self.max_workers = max_workers
+        self.write_behind = write_behind
+        self.results_cache_size = results_cache_size
+        if backend is None and max_workers > 1:
+            backend = ProcessPoolBackend(max_workers, write_behind, results_cache_size)
+        self.backend = backend
 
     def add(self, job_graph):
         """Add a JobGraph to the JobScheduler and run directly
@@ -175,7 +225,10 @@ class JobScheduler(object):
         """
         job_graph_id = self._next_id()
         try:
-            self._run(job_graph, job_graph_id)
+            if self.backend is not None:
+                self._run_parallel(job_graph, job_graph_id)
+            else:
+                self._run(job_graph, job_graph_id)
         except Exception as ex:
             self._status[job_graph_id] = 'failed'
             traceback.print_exc()
@@ -183,6 +236,54 @@ class JobScheduler(object):
 
         return job_graph_id, None
 
+    def add_many(self, job_graphs):
+        """Add several independent JobGraphs to the JobScheduler and run directly
+
+        With a backend, the job graphs are run concurrently, each job graph on a single
+        worker. Each job graph runs to completion (or failure) independently of the others.
+
+        Arguments
+        ---------
+        job_graphs: list[:class:`networkx.graph`]
+
+        Returns
+        -------
+        list[tuple]
+            A (job_graph_id, error) pair for each job graph, in the order given, where error
+            is None if the job graph ran successfully
+        """
+        if self.backend is None or len(job_graphs) < 2:
+            return [self.add(job_graph) for job_graph in job_graphs]
+
+        job_graph_ids = [self._next_id() for _ in job_graphs]
+        errors = [None] * len(job_graphs)
+
+        self.backend.start(self.store, job_graphs)
+        try:
+            running = {}
+            for index, job_graph_id in enumerate(job_graph_ids):
+                self.logger.info("Job graph %s", job_graph_id)
+                self.logger.profiling_start(
+                    'JobScheduler._run()', 'graph_' + str(job_graph_id))
+                self._status[job_graph_id] = 'running'
+                running[self.backend.submit_graph(index)] = index
+
+            for future in as_completed(running):
+                index = running[future]
+                job_graph_id = job_graph_ids[index]
+                try:
+                    future.result()
+                    self._status[job_graph_id] = 'done'
+                except Exception as ex:
+                    self._status[job_graph_id] = 'failed'
+                    errors[index] = ex
+                self.logger.profiling_stop(
+                    'JobScheduler._run()', 'graph_' + str(job_graph_id))
+        finally:
+            self.backend.shutdown()
+
+        return list(zip(job_graph_ids, errors))
+
     def kill(self, job_graph_id):
         """Kill a job_graph that is already running - not implemented
 
@@ -229,32 +330,72 @@ class JobScheduler(object):
         for job_node_id, job in self._get_run_order(job_graph):
             self.logger.info("Job %s", job_node_id)
             self.logger.profiling_start('JobScheduler._run()', 'job_' + job_node_id)
+            run_job(self.store, job, self._contexts, self.write_behind,
+                    self.results_cache_size)
+            self.logger.profiling_stop('JobScheduler._run()', 'job_' + job_node_id)
+        flush_results(self._contexts)
 
-            model = job['model']
-            data_handle = DataHandle(
-                store=self.store,
-                model=model,
-                modelrun_name=job['modelrun_name'],
-                current_timestep=job['current_timestep'],
-                timesteps=job['timesteps'],
-                decision_iteration=job['decision_iteration']
-            )
-            operation = job['operation']
-            if operation is ModelOperation.BEFORE_MODEL_RUN:
-                # before_model_run may not be implemented by all jobs
-                if hasattr(model, "before_model_run"):
-                    model.before_model_run(data_handle)
+        self._status[job_graph_id] = 'done'
+        self.logger.profiling_stop('JobScheduler._run()', 'graph_' + str(job_graph_id))
 
-            elif operation is ModelOperation.SIMULATE:
-                model.simulate(data_handle)
+    def _run_parallel(self, job_graph, job_graph_id):
+        """Run a job graph through the backend
+        - submit each job as soon as all its predecessors are done
+        - on the first failure, cancel pending jobs and re-raise
+        """
+        self.logger.profiling_start('JobScheduler._run()', 'graph_' + str(job_graph_id))
+        self._status[job_graph_id] = 'running'
 
-            else:
-                raise ValueError("Unrecognised operation: {}".format(operation))
-            self.logger.profiling_stop('JobScheduler._run()', 'job_' + job_node_id)
+        if not networkx.is_directed_acyclic_graph(job_graph):
+            raise NotImplementedError("Job graphs must not contain cycles")
+
+        waiting_on = {
+            job_node_id: job_graph.in_degree(job_node_id)
+            for job_node_id in job_graph.nodes
+        }
+        ready = [job_node_id for job_node_id, count in waiting_on.items() if count == 0]
+
+        self.backend.start(self.store, [job_graph])
+        try:
+            running = {}
+            while ready or running:
+                for job_node_id in ready:
+                    self.logger.info("Job %s", job_node_id)
+                    self.logger.profiling_start('JobScheduler._run()', 'job_' + job_node_id)
+                    running[self.backend.submit(0, job_node_id)] = job_node_id
+                ready = []
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_node_id = running.pop(future)
+                    ready.extend(self._finish_job(
+                        future, job_node_id, job_graph, waiting_on, running))
+        finally:
+            self.backend.shutdown()
 
         self._status[job_graph_id] = 'done'
         self.logger.profiling_stop('JobScheduler._run()', 'graph_' + str(job_graph_id))
 
+    def _finish_job(self, future, job_node_id, job_graph, waiting_on, running):
+        """Check a finished job, returning successors which are now ready to run
+
+        On failure, cancel the other running jobs and re-raise the job error
+        """
+        try:
+            future.result()
+        except Exception:
+            for pending in running:
+                pending.cancel()
+            raise
+        self.logger.profiling_stop('JobScheduler._run()', 'job_' + job_node_id)
+
+        ready = []
+        for successor in job_graph.successors(job_node_id):
+            waiting_on[successor] -= 1
+            if waiting_on[successor] == 0:
+                ready.append(successor)
+        return ready
+
     def _next_id(self):
         return next(self._id_counter)
 
@@ -278,3 +419,221 @@ class JobScheduler(object):
             raise NotImplementedError("Job graphs must not contain cycles")
 
         return ordered_jobs
+
+
+class JobBackend(metaclass=ABCMeta):
+    """A JobBackend runs jobs from job graphs on behalf of a :class:`JobScheduler`
+
+    The scheduler calls :meth:`start` with the job graphs it is about to run, submits jobs
+    (or whole job graphs) by position and node id as they become ready to run, then calls
+    :meth:`shutdown`. Each submission returns a :class:`concurrent.futures.Future` which
+    completes when the job has run, or raises the error raised by the job.
+    """
+    @abstractmethod
+    def start(self, store, job_graphs):
+        """Prepare to run jobs from a list of job graphs
+
+        Arguments
+        ---------
+        store : smif.data_layer.Store
+        job_graphs : list[:class:`networkx.DiGraph`]
+        """
+
+    @abstractmethod
+    def submit(self, graph_index, job_node_id):
+        """Run a single job
+
+        Arguments
+        ---------
+        graph_index : int
+            Position of the job graph in the list passed to :meth:`start`
+        job_node_id : str
+            Job node id in the job graph
+
+        Returns
+        -------
+        concurrent.futures.Future
+        """
+
+    @abstractmethod
+    def submit_graph(self, graph_index):
+        """Run all jobs in a job graph, in order, on a single worker
+
+        Arguments
+        ---------
+        graph_index : int
+            Position of the job graph in the list passed to :meth:`start`
+
+        Returns
+        -------
+        concurrent.futures.Future
+        """
+
+    @abstractmethod
+    def shutdown(self):
+        """Release any resources held since :meth:`start`
+        """
+
+
+class ProcessPoolBackend(JobBackend):
+    """Run jobs on a local pool of worker processes
+
+    Parameters
+    ----------
+    max_workers : int
+        Number of worker processes
+    write_behind : bool, default=False
+        Write results in the background in each worker process
+    results_cache_size : int, optional
+        Maximum size in bytes of results kept in memory for dependent models in each
+        worker process
+    """
+    def __init__(self, max_workers, write_behind=False, results_cache_size=None):
+        self.max_workers = max_workers
+        self.write_behind = write_behind
+        self.results_cache_size = results_cache_size
+        self._executor = None
+        self._store = None
+        self._job_graphs = None
+        self._run_id = None
+
+    def start(self, store, job_graphs):
+        self._store = store
+        self._job_graphs = job_graphs
+        # identifies this run to worker processes, which keep RunContexts between jobs
+        self._run_id = uuid.uuid4().hex
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def submit(self, graph_index, job_node_id):
+        job = self._job_graphs[graph_index].nodes[job_node_id]
+        return self._executor.submit(_run_worker_jobs, self._run_id, self._store, [job],
+                                     self._options())
+
+    def submit_graph(self, graph_index):
+        jobs = [job for _, job in JobScheduler._get_run_order(self._job_graphs[graph_index])]
+        return self._executor.submit(_run_worker_jobs, self._run_id, self._store, jobs,
+                                     self._options())
+
+    def shutdown(self):
+        self._executor.shutdown()
+        self._executor = None
+        self._store = None
+        self._job_graphs = None
+        self._run_id = None
+
+    def _options(self):
+        return {
+            'write_behind': self.write_behind,
+            'results_cache_size': self.results_cache_size
+        }
+
+
+def run_job(store, job, contexts=None, write_behind=False, results_cache_size=None):
+    """Run a single job node: unpack model, data_handle and operation and call the model
+
+    A model's ``before_model_run`` is called at most once in each process. If a simulate
+    job runs in a process where the model's ``before_model_run`` has not yet been called,
+    for example because the before_model_run job ran on another worker, it is called
+    first, so that any state set on the model is available to ``simulate``.
+
+    Arguments
+    ---------
+    store : smif.data_layer.Store
+    job : dict
+        Job node data from a job graph
+    contexts : dict, optional
+        RunContexts by modelrun name, reused and added to so that configuration and
+        parameters are read once per modelrun rather than once per job
+    write_behind : bool, default=False
+        Write results in the background, if creating a new RunContext. Call
+        :func:`flush_results` with the contexts before results are read elsewhere.
+    results_cache_size : int, optional
+        Maximum size in bytes of results kept in memory, if creating a new RunContext
+    """
+    model = job['model']
+    if contexts is None:
+        contexts = {}
+    modelrun_name = job['modelrun_name']
+    if modelrun_name not in contexts:
+        contexts[modelrun_name] = RunContext(
+            store, modelrun_name, write_behind=write_behind,
+            results_cache_size=results_cache_size)
+    context = contexts[modelrun_name]
+
+    operation = job['operation']
+    if operation is ModelOperation.BEFORE_MODEL_RUN:
+        _before_model_run(store, model, modelrun_name, job['timesteps'], context)
+
+    elif operation is ModelOperation.SIMULATE:
+        _before_model_run(store, model, modelrun_name, job['timesteps'], context)
+        data_handle = DataHandle(
+            store=store,
+            model=model,
+            modelrun_name=modelrun_name,
+            current_timestep=job['current_timestep'],
+            timesteps=job['timesteps'],
+            decision_iteration=job['decision_iteration'],
+            context=context
+        )
+        model.simulate(data_handle)
+
+    else:
+        raise ValueError("Unrecognised operation: {}".format(operation))
+
+
+def _before_model_run(store, model, modelrun_name, timesteps, context):
+    """Call a model's before_model_run, unless already called in this process
+    """
+    if model.name in context.initialised:
+        return
+    # before_model_run may not be implemented by all jobs
+    if hasattr(model, "before_model_run"):
+        data_handle = DataHandle(
+            store=store,
+            model=model,
+            modelrun_name=modelrun_name,
+            current_timestep=None,
+            timesteps=timesteps,
+            decision_iteration=None,
+            context=context
+        )
+        model.before_model_run(data_handle)
+    context.initialised.add(model.name)
+
+
+def flush_results(contexts):
+    """Wait for results written in the background by each RunContext
+
+    Arguments
+    ---------
+    contexts : dict
+        RunContexts by modelrun name
+    """
+    for context in contexts.values():
+        context.flush_results()
+
+
+# Worker process state, kept between jobs from the same run
+_WORKER_RUN_ID = None
+_WORKER_CONTEXTS = {}  # type: dict
+_WORKER_MODELS = {}  # type: dict
+
+
+def _run_worker_jobs(run_id, store, jobs, options):
+    """Run job nodes in a worker process, in order
+
+    RunContexts and models are kept between jobs with the same `run_id`, and dropped when
+    a job from another run arrives, so that state set on a model by ``before_model_run`` is
+    available to later jobs for the same model. The jobs' successors may run in other
+    worker processes, so results are written before the last job finishes.
+    """
+    global _WORKER_RUN_ID, _WORKER_CONTEXTS, _WORKER_MODELS
+    if run_id != _WORKER_RUN_ID:
+        _WORKER_RUN_ID = run_id
+        _WORKER_CONTEXTS = {}
+        _WORKER_MODELS = {}
+    for job in jobs:
+        model = _WORKER_MODELS.setdefault(
+            (job['modelrun_name'], job['model'].name), job['model'])
+        run_job(store, dict(job, model=model), _WORKER_CONTEXTS, **options)
+    flush_results(_WORKER_CONTEXTS)
@@ -0,0 +1,363 @@
+"""A work queue lets a model run be spread over many worker processes, which may run on
+different machines.
+
+The scheduler side (:class:`WorkQueueBackend`) serialises each job - model run name, model
+name, operation, timestep and decision iteration - to a file in a queue folder. Workers
+started with ``smif worker`` (see :func:`run_worker`) claim jobs from the queue, rebuild the
+model from the project configuration, run the job and mark it done or failed. Schedulers and
+workers must share the queue folder and the store, for example through a shared filesystem.
+
+The queue folder holds one file per queued item, moving between subfolders::
+
+    /queue
+        /pending
+        /running
+        /done
+        /failed
+
+Jobs are claimed by renaming from ``pending`` to ``running``, which is atomic on POSIX
+filesystems, so each job is run by exactly one worker. Jobs left in ``running`` by a worker
+which stopped unexpectedly are not reclaimed.
+
+Workers writing results to a :class:`~smif.data_layer.file.file_data_store.FileDataStore`
+also add them to a SQLite results catalogue, which relies on file locking. On filesystems
+where locking is unreliable, such as NFS, rebuild the catalogue once the model run has
+finished (see :mod:`smif.data_layer.file.results_catalogue`).
+
+Example
+-------
+Start workers (on any node with access to the project folder)::
+
+    $ smif worker -d /projects/smif
+
+Then run a model run, queueing jobs for the workers::
+
+    $ smif run -q -d /projects/smif energy_central
+"""
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from logging import getLogger
+
+from smif.controller.build import get_model_run_definition
+from smif.controller.scheduler import JobBackend, JobScheduler, run_job
+from smif.exception import SmifModelRunError
+from smif.model import ModelOperation
+
+"""Number of runs for which a worker keeps models and RunContexts
+"""
+WORKER_RUNS = 4
+
+
+class WorkQueue(object):
+    """Folder-backed queue of jobs, shared between a scheduler and workers
+
+    Each item on the queue is a list of jobs, to be run in order by a single worker.
+
+    Parameters
+    ----------
+    queue_folder : str
+        Path to the folder holding the queue, created if it does not exist
+    """
+    STATES = ('pending', 'running', 'done', 'failed')
+
+    def __init__(self, queue_folder):
+        self.queue_folder = str(queue_folder)
+        self.folders = {}
+        for state in self.STATES:
+            dirname = os.path.join(self.queue_folder, state)
+            os.makedirs(dirname, exist_ok=True)
+            self.folders[state] = dirname
+
+    def put(self, jobs):
+        """Add a list of jobs to the queue
+
+        Arguments
+        ---------
+        jobs : list[dict]
+            Serialised jobs, as returned by :func:`serialise_job`
+
+        Returns
+        -------
+        str
+            Queue item id
+        """
+        item_id = uuid.uuid4().hex
+        tmp_path = os.path.join(self.queue_folder, '.{}.json'.format(item_id))
+        with open(tmp_path, 'w') as file_handle:
+            json.dump({'id': item_id, 'jobs': jobs}, file_handle)
+        os.rename(tmp_path, self._path('pending', item_id))
+        return item_id
+
+    def claim(self):
+        """Claim the oldest pending item
+
+        Returns
+        -------
+        tuple or None
+            (item_id, jobs) or None if no item is pending
+        """
+        pending = []
+        for entry in os.scandir(self.folders['pending']):
+            try:
+                pending.append((entry.stat().st_mtime, entry.name))
+            except FileNotFoundError:
+                # claimed by another worker
+                continue
+
+        for _, filename in sorted(pending):
+            item_id = os.path.splitext(filename)[0]
+            try:
+                os.rename(self._path('pending', item_id), self._path('running', item_id))
+            except FileNotFoundError:
+                # claimed by another worker
+                continue
+            with open(self._path('running', item_id)) as file_handle:
+                return item_id, json.load(file_handle)['jobs']
+        return None
+
+    def complete(self, item_id):
+        """Mark a claimed item as done
+        """
+        os.rename(self._path('running', item_id), self._path('done', item_id))
+
+    def fail(self, item_id, message):
+        """Mark a claimed item as failed, with an error message
+        """
+        with open(self._path('running', item_id)) as file_handle:
+            item = json.load(file_handle)
+        item['error'] = message
+        # write in full before moving into place, so status never reads a partial file
+        tmp_path = os.path.join(self.queue_folder, '.{}.json'.format(item_id))
+        with open(tmp_path, 'w') as file_handle:
+            json.dump(item, file_handle)
+        os.rename(tmp_path, self._path('failed', item_id))
+        os.remove(self._path('running', item_id))
+
+    def cancel(self, item_id):
+        """Remove an item from the queue if it has not yet been claimed
+
+        Returns
+        -------
+        bool
+            True if the item was removed
+        """
+        try:
+            os.remove(self._path('pending', item_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def status(self, item_id):
+        """Get the status of an item
+
+        Returns
+        -------
+        tuple
+            (state, error) where state is one of 'pending', 'running', 'done' or 'failed'
+            and error is the error message for failed items, otherwise None
+
+        Raises
+        ------
+        KeyError
+            If the item is not in the queue
+        """
+        for state in ('done', 'failed', 'running', 'pending'):
+            path = self._path(state, item_id)
+            if os.path.exists(path):
+                if state == 'failed':
+                    with open(path) as file_handle:
+                        return state, json.load(file_handle)['error']
+                return state, None
+        raise KeyError("Item {} not found in queue at {}".format(item_id, self.queue_folder))
+
+    def _path(self, state, item_id):
+        return os.path.join(self.folders[state], '{}.json'.format(item_id))
+
+
+class WorkQueueBackend(JobBackend):
+    """Run jobs by sending them to a :class:`WorkQueue`, to be run by separate worker
+    processes
+
+    Parameters
+    ----------
+    queue : WorkQueue
+    poll_interval : float, default=0.5
+        Seconds to wait between checks for completed jobs
+    """
+    def __init__(self, queue, poll_interval=0.5):
+        self.logger = getLogger(__name__)
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self._job_graphs = None
+        self._run_id = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._stop = None
+        self._monitor = None
+
+    def start(self, store, job_graphs):
+        # workers read from their own store, so only the job graphs are kept here
+        self._job_graphs = job_graphs
+        # identifies this run to workers, which keep models and RunContexts between jobs
+        self._run_id = uuid.uuid4().hex
+        self._futures = {}
+        self._stop = threading.Event()
+        self._monitor = threading.Thread(target=self._poll, daemon=True)
+        self._monitor.start()
+
+    def submit(self, graph_index, job_node_id):
+        job = self._job_graphs[graph_index].nodes[job_node_id]
+        return self._put([serialise_job(job, self._run_id)])
+
+    def submit_graph(self, graph_index):
+        jobs = JobScheduler._get_run_order(self._job_graphs[graph_index])
+        return self._put([serialise_job(job, self._run_id) for _, job in jobs])
+
+    def shutdown(self):
+        self._stop.set()
+        self._monitor.join()
+        # withdraw anything still queued, e.g. after another job failed
+        for item_id in self._futures:
+            self.queue.cancel(item_id)
+        self._futures = {}
+        self._job_graphs = None
+        self._run_id = None
+
+    def _put(self, jobs):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            item_id = self.queue.put(jobs)
+            self._futures[item_id] = future
+        self.logger.debug("Queued %s as %s", [job['model_name'] for job in jobs], item_id)
+        return future
+
+    def _poll(self):
+        """Check queue for finished items, setting results on the matching futures
+        """
+        while not self._stop.is_set():
+            with self._lock:
+                for item_id, future in list(self._futures.items()):
+                    try:
+                        state, error = self.queue.status(item_id)
+                    except (KeyError, ValueError):
+                        # moved between states or being written while checking, try
+                        # again next time
+                        continue
+                    if state == 'done':
+                        future.set_result(None)
+                    elif state == 'failed':
+                        future.set_exception(SmifModelRunError(error))
+                    else:
+                        continue
+                    del self._futures[item_id]
+            self._stop.wait(self.poll_interval)
+
+
+def serialise_job(job, run_id=None):
+    """Serialise a job node to a JSON-compatible dict
+
+    Arguments
+    ---------
+    job : dict
+        Job node data from a job graph
+    run_id : str, optional
+        Identifies the jobs queued by one run of a scheduler, which may share models and
+        RunContexts in a worker
+
+    Returns
+    -------
+    dict
+    """
+    return {
+        'run_id': run_id,
+        'modelrun_name': job['modelrun_name'],
+        'model_name': job['model'].name,
+        'operation': job['operation'].value,
+        'current_timestep': job['current_timestep'],
+        'timesteps': list(job['timesteps']),
+        'decision_iteration': job['decision_iteration']
+    }
+
+
+def run_worker(store, queue, poll_interval=1.0, idle_timeout=None):
+    """Run jobs from a queue until stopped, or until idle for `idle_timeout` seconds
+
+    Models, model run configuration and parameters are loaded from the store once per model
+    run, and reused for later jobs queued by the same run of a scheduler. A model run which
+    is run again is loaded again. Loaded models are kept for the most recent
+    :data:`WORKER_RUNS` runs only.
+
+    Arguments
+    ---------
+    store : smif.data_layer.Store
+    queue : WorkQueue
+    poll_interval : float, default=1.0
+        Seconds to wait between checks for pending items
+    idle_timeout : float, optional
+        Stop after this many seconds with no pending items. By default, run until killed.
+    """
+    logger = getLogger(__name__)
+    # (sos_models, contexts) by run id
+    runs = OrderedDict()  # type: OrderedDict
+    idle_since = time.monotonic()
+
+    while True:
+        claimed = queue.claim()
+        if claimed is None:
+            if idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+                logger.info("Worker stopping after %ss idle", idle_timeout)
+                return
+            time.sleep(poll_interval)
+            continue
+
+        item_id, jobs = claimed
+        logger.info("Running %s", item_id)
+        try:
+            for job in jobs:
+                # jobs queued without a run id share nothing with other items
+                sos_models, contexts = _run_state(runs, job.get('run_id') or item_id)
+                run_job(store, _deserialise_job(store, job, sos_models), contexts)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed running %s", item_id)
+            queue.fail(item_id, traceback.format_exc())
+        else:
+            queue.complete(item_id)
+        idle_since = time.monotonic()
+
+
+def _run_state(runs, run_id):
+    """Find the models and RunContexts loaded for a run, dropping the least recently used
+    run if more than WORKER_RUNS are kept
+    """
+    if run_id in runs:
+        runs.move_to_end(run_id)
+    else:
+        runs[run_id] = ({}, {})
+        if len(runs) > WORKER_RUNS:
+            runs.popitem(last=False)
+    return runs[run_id]
+
+
+def _deserialise_job(store, job, sos_models):
+    """Rebuild a job node from its serialised form, loading models as needed
+    """
+    modelrun_name = job['modelrun_name']
+    if modelrun_name not in sos_models:
+        model_run_config = get_model_run_definition(store, modelrun_name)
+        sos_models[modelrun_name] = model_run_config['sos_model']
+
+    return {
+        'model': sos_models[modelrun_name].get_model(job['model_name']),
+        'modelrun_name': modelrun_name,
+        'operation': ModelOperation(job['operation']),
+        'current_timestep': job['current_timestep'],
+        'timesteps': job['timesteps'],
+        'decision_iteration': job['decision_iteration']
+    }
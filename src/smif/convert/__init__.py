@@ -6,11 +6,12 @@ These should be useful to link models in simple cases, where it may be reasonabl
 strong assumptions about the underlying distributions of the variables to be converted.
 """
 from smif.convert.adaptor import Adaptor
+from smif.convert.chain import ChainedAdaptor
 from smif.convert.interval import IntervalAdaptor
 from smif.convert.region import RegionAdaptor
 from smif.convert.unit import UnitAdaptor
 
-__all__ = ["Adaptor", "IntervalAdaptor", "UnitAdaptor", "RegionAdaptor"]
+__all__ = ["Adaptor", "ChainedAdaptor", "IntervalAdaptor", "UnitAdaptor", "RegionAdaptor"]
 
 __author__ = "Will Usher, Tom Russell, Roald Schoenmakers"
 __copyright__ = "Will Usher, Tom Russell, Roald Schoenmakers"
@@ -4,9 +4,13 @@ data between units or dimensions.
 The method to override is `generate_coefficients`, which accepts two
 :class:`~smif.metadata.spec.Spec` definitions.
 """
+import hashlib
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from typing import List
 
 import numpy as np  # type: ignore
+from scipy import sparse  # type: ignore
 from smif.data_layer.data_array import DataArray
 from smif.data_layer.data_handle import DataHandle
 from smif.exception import SmifDataNotFoundError
@@ -23,14 +27,51 @@ class Adaptor(Model, metaclass=ABCMeta):
     """
     def simulate(self, data_handle: DataHandle):
         """Convert from input to output based on matching variable names
+
+        Variables which share coefficients are converted together, see
+        :meth:`get_group_key` and :meth:`convert_many`, and all results are written at once.
         """
+        groups = OrderedDict()
         for from_spec in self.inputs.values():
             if from_spec.name in self.outputs:
                 to_spec = self.outputs[from_spec.name]
-                coefficients = self.get_coefficients(data_handle, from_spec, to_spec)
-                data_in = data_handle.get_data(from_spec.name)
-                data_out = self.convert(data_in, to_spec, coefficients)
-                data_handle.set_results(to_spec.name, data_out)
+                group_key = self.get_group_key(from_spec, to_spec)
+                groups.setdefault(group_key, []).append((from_spec, to_spec))
+
+        results = OrderedDict()
+        for pairs in groups.values():
+            from_spec, to_spec = pairs[0]
+            coefficients = self.get_coefficients(data_handle, from_spec, to_spec)
+            data_arrays = [data_handle.get_data(from_spec.name) for from_spec, _ in pairs]
+            to_specs = [to_spec for _, to_spec in pairs]
+            converted = self.convert_many(data_arrays, to_specs, coefficients)
+            for to_spec, data_out in zip(to_specs, converted):
+                results[to_spec.name] = data_out
+
+        data_handle.set_results_many(results)
+
+    def get_group_key(self, from_spec: Spec, to_spec: Spec) -> tuple:
+        """Identify the variables which can be converted together
+
+        Variables with equal keys have the same shape before and after conversion and use
+        the same coefficients.
+
+        Parameters
+        ----------
+        from_spec : smif.metadata.spec.Spec
+        to_spec : smif.metadata.spec.Spec
+
+        Returns
+        -------
+        tuple
+        """
+        return (
+            self.get_coefficients_key(from_spec, to_spec),
+            tuple(from_spec.dims),
+            from_spec.shape,
+            tuple(to_spec.dims),
+            to_spec.shape
+        )
 
     def get_coefficients(self,
                          data_handle: DataHandle,
@@ -38,6 +79,10 @@ class Adaptor(Model, metaclass=ABCMeta):
                          to_spec: Spec) -> np.ndarray:
         """Read coefficients, or generate and save if necessary
 
+        Coefficients are identified by the names of the dimensions to convert and by
+        :meth:`get_coefficients_key`, so coefficients are generated again if the elements
+        of either dimension change.
+
         Parameters
         ----------
         data_handle : smif.data_layer.data_handle.DataHandle
@@ -46,23 +91,48 @@ class Adaptor(Model, metaclass=ABCMeta):
 
         Returns
         -------
-        numpy.ndarray
+        numpy.ndarray or scipy.sparse.csr_matrix
         """
         from_dim, to_dim = self.get_convert_dims(from_spec, to_spec)
+        key = self.get_coefficients_key(from_spec, to_spec)
         try:
-            coefficients = data_handle.read_coefficients(from_dim, to_dim)
+            coefficients = data_handle.read_coefficients(from_dim, to_dim, key)
         except SmifDataNotFoundError:
             msg = "Generating coefficients for %s to %s"
             self.logger.info(msg, from_dim, to_dim)
 
             coefficients = self.generate_coefficients(from_spec, to_spec)
-            data_handle.write_coefficients(from_dim, to_dim, coefficients)
+            data_handle.write_coefficients(from_dim, to_dim, coefficients, key)
         return coefficients
 
+    def get_coefficients_key(self, from_spec: Spec, to_spec: Spec) -> str:
+        """Identify coefficients by the type of adaptor and the content of the dimensions
+        to convert
+
+        Parameters
+        ----------
+        from_spec : smif.metadata.spec.Spec
+        to_spec : smif.metadata.spec.Spec
+
+        Returns
+        -------
+        str
+        """
+        from_dim, to_dim = self.get_convert_dims(from_spec, to_spec)
+        content = ":".join([
+            self.__class__.__name__,
+            from_spec.dim_coords(from_dim).digest,
+            to_spec.dim_coords(to_dim).digest
+        ])
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
     @abstractmethod
-    def generate_coefficients(self, from_spec: Spec, to_spec: Spec) -> np.ndarray:
+    def generate_coefficients(self, from_spec: Spec, to_spec: Spec):
         """Generate coefficients for a pair of :class:`~smif.metadata.spec.Spec` definitions
 
+        Coefficients may be returned as a dense array or, for large conversions where most
+        coefficients are zero, as a sparse matrix.
+
         Parameters
         ----------
         from_spec : smif.metadata.spec.Spec
@@ -70,21 +140,21 @@ class Adaptor(Model, metaclass=ABCMeta):
 
         Returns
         -------
-        numpy.ndarray
+        numpy.ndarray or scipy.sparse.csr_matrix
         """
         raise NotImplementedError
 
     def convert(self,
                 data_array: DataArray,
                 to_spec: Spec,
-                coefficients: np.ndarray):
+                coefficients):
         """Convert a dataset between :class:`~smif.metadata.spec.Spec` definitions
 
         Parameters
         ----------
         data: smif.data_layer.data_array.DataArray
         to_spec : smif.metadata.spec.Spec
-        coefficients : numpy.ndarray
+        coefficients : numpy.ndarray or scipy.sparse.spmatrix
 
         Returns
         -------
@@ -114,16 +184,55 @@ class Adaptor(Model, metaclass=ABCMeta):
         self.logger.debug("Converted total from %s to %s", data.sum(), converted.sum())
         return converted
 
+    def convert_many(self,
+                     data_arrays: List[DataArray],
+                     to_specs: List[Spec],
+                     coefficients) -> List[np.ndarray]:
+        """Convert several datasets which share coefficients
+
+        The datasets are stacked, so that all are converted in a single contraction.
+
+        Parameters
+        ----------
+        data_arrays : list[smif.data_layer.data_array.DataArray]
+            Datasets with equal :meth:`get_group_key`
+        to_specs : list[smif.metadata.spec.Spec]
+        coefficients : numpy.ndarray or scipy.sparse.spmatrix
+
+        Returns
+        -------
+        list[numpy.ndarray]
+        """
+        if len(data_arrays) == 1:
+            return [self.convert(data_arrays[0], to_specs[0], coefficients)]
+
+        from_spec = data_arrays[0].spec
+        from_convert_dim, _ = self.get_convert_dims(from_spec, to_specs[0])
+
+        self.logger.debug("Converting %s variables from %s together", len(data_arrays),
+                          from_convert_dim)
+
+        data = np.stack([data_array.data for data_array in data_arrays])
+        # stacked along a new first axis, so the axis to convert moves along by one
+        axis = from_spec.dims.index(from_convert_dim) + 1
+
+        if coefficients.shape[0] != data.shape[axis]:
+            msg = "Coefficients do not match dimension to convert: %s != %s"
+            raise ValueError(msg, coefficients.shape[0], data.shape[axis])
+
+        converted = self.convert_with_coefficients(data, coefficients, axis)
+        return list(converted)
+
     @staticmethod
     def convert_with_coefficients(data: np.ndarray,
-                                  coefficients: np.ndarray,
+                                  coefficients,
                                   axis: int):
         """Unchecked conversion, given data, coefficients and axis
 
         Parameters
         ----------
         data : numpy.ndarray
-        coefficients : numpy.ndarray
+        coefficients : numpy.ndarray or scipy.sparse.spmatrix
         axis : integer
             Axis along which to apply conversion coefficients
 
@@ -131,6 +240,15 @@ class Adaptor(Model, metaclass=ABCMeta):
         -------
         numpy.ndarray
         """
+        if sparse.issparse(coefficients):
+            # Sparse matrices are 2D only, so move the axis to convert to the end and
+            # flatten the other axes, multiply by the coefficients, then restore the shape
+            moved = np.moveaxis(data, axis, -1)
+            flat = moved.reshape(-1, moved.shape[-1])
+            converted = np.asarray(flat @ coefficients)
+            converted = converted.reshape(moved.shape[:-1] + (coefficients.shape[1], ))
+            return np.moveaxis(converted, -1, axis)
+
         # Effectively a tensor contraction (the generalisation of dot product to multi-
         # dimensional ndarrays, tensors) implemented using the Einstein summation convention,
         # np.einsum, which lets us be explicit which dimensions we sum along.
@@ -155,6 +273,8 @@ class Adaptor(Model, metaclass=ABCMeta):
         """Get dims for conversion from a pair of :class:`~smif.metadata.spec.Spec`,
         assuming only a single dimension will be converted.
 
+        See :class:`~smif.convert.chain.ChainedAdaptor` to convert several dimensions.
+
         Parameters
         ----------
         from_spec : smif.metadata.Spec
@@ -0,0 +1,244 @@
+"""Convert between :class:`~smif.metadata.spec.Spec` definitions which differ in several
+dimensions, and in units, in a single step.
+
+A :class:`ChainedAdaptor` plans a chain of single dimension conversions, using the
+:class:`~smif.convert.interval.IntervalAdaptor`, :class:`~smif.convert.region.RegionAdaptor`
+and :class:`~smif.convert.unit.UnitAdaptor` implementations, and applies them in memory so
+that no intermediate results are written to the store.
+"""
+import hashlib
+from collections import defaultdict, namedtuple
+from functools import reduce
+from itertools import permutations
+from operator import mul
+
+import numpy as np  # type: ignore
+from smif.convert.adaptor import Adaptor
+from smif.convert.interval import IntervalAdaptor
+from smif.convert.region import RegionAdaptor
+from smif.convert.unit import UnitAdaptor
+from smif.exception import SmifDataMismatchError
+from smif.metadata import Spec
+
+ConversionStep = namedtuple('ConversionStep', ['from_dim', 'to_dim', 'adaptor'])
+
+
+class ChainedAdaptor(Adaptor):
+    """Convert several dimensions, and units, at once
+
+    Dimensions which are only in the source spec are converted to dimensions which are only
+    in the destination spec. Each dimension is converted by the first of
+    `dimension_adaptors` whose key is in every element of the dimension, and dimensions
+    converted by the same adaptor are matched in the order they appear.
+
+    Coefficients for each pair of dimensions are read, or generated and saved, as by the
+    single dimension adaptors, so they are shared with those adaptors. The conversions are
+    applied in the order which keeps intermediate arrays smallest.
+    """
+    dimension_adaptors = [
+        ('interval', IntervalAdaptor),
+        ('feature', RegionAdaptor)
+    ]
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._adaptors = {
+            klass: klass(name) for _, klass in self.dimension_adaptors
+        }
+        self._units = UnitAdaptor(name)
+
+    def before_model_run(self, data_handle):
+        """Register unit definitions before model run
+        """
+        self._units.before_model_run(data_handle)
+
+    def plan(self, from_spec, to_spec):
+        """Plan the conversion of each pair of dimensions
+
+        Parameters
+        ----------
+        from_spec : smif.metadata.spec.Spec
+        to_spec : smif.metadata.spec.Spec
+
+        Returns
+        -------
+        list[ConversionStep]
+            In the order which keeps the total size of intermediate arrays smallest
+
+        Raises
+        ------
+        SmifDataMismatchError
+            If the dimensions to convert cannot be matched, or no adaptor can convert a pair
+            of dimensions
+        """
+        steps = [
+            ConversionStep(from_dim, to_dim, self._adaptors[klass])
+            for from_dim, to_dim, klass in self.get_convert_dim_pairs(from_spec, to_spec)
+        ]
+        if len(steps) < 2:
+            return steps
+
+        sizes = {dim: len(from_spec.dim_coords(dim).ids) for dim in from_spec.dims}
+        sizes.update({dim: len(to_spec.dim_coords(dim).ids) for dim in to_spec.dims})
+
+        def intermediate_size(order):
+            dims = set(from_spec.dims)
+            total = 0
+            for step in order[:-1]:
+                dims = dims - {step.from_dim} | {step.to_dim}
+                total += reduce(mul, (sizes[dim] for dim in dims), 1)
+            return total
+
+        return list(min(permutations(steps), key=intermediate_size))
+
+    def get_convert_dim_pairs(self, from_spec, to_spec):
+        """Get pairs of dims for conversion from a pair of :class:`~smif.metadata.spec.Spec`
+
+        Dims are matched by the adaptor which can convert them, in the order they appear.
+
+        Parameters
+        ----------
+        from_spec : smif.metadata.Spec
+        to_spec : smif.metadata.Spec
+
+        Returns
+        -------
+        list[tuple]
+            (from_dim, to_dim, adaptor class) for each pair of dims
+
+        Raises
+        ------
+        SmifDataMismatchError
+            If no adaptor can convert a dim, or the dims cannot be matched
+        """
+        from_dims = defaultdict(list)
+        for dim in from_spec.dims:
+            if dim not in to_spec.dims:
+                from_dims[self._get_dim_adaptor(dim, from_spec.dim_elements(dim))].append(dim)
+        to_dims = defaultdict(list)
+        for dim in to_spec.dims:
+            if dim not in from_spec.dims:
+                to_dims[self._get_dim_adaptor(dim, to_spec.dim_elements(dim))].append(dim)
+
+        pairs = []
+        for _, klass in self.dimension_adaptors:
+            if len(from_dims[klass]) != len(to_dims[klass]):
+                msg = "Cannot match dimensions to convert from {} {} to {} {}"
+                raise SmifDataMismatchError(msg.format(
+                    from_spec.name, from_dims[klass], to_spec.name, to_dims[klass]))
+            pairs.extend(
+                (from_dim, to_dim, klass)
+                for from_dim, to_dim in zip(from_dims[klass], to_dims[klass]))
+        return pairs
+
+    def _get_dim_adaptor(self, dim, elements):
+        for element_key, klass in self.dimension_adaptors:
+            if all(element_key in element for element in elements):
+                return klass
+        msg = "No adaptor found to convert {}"
+        raise SmifDataMismatchError(msg.format(dim))
+
+    @staticmethod
+    def _step_specs(from_spec, to_spec, step):
+        """Single dimension specs, to convert one step with a single dimension adaptor
+        """
+        step_from_spec = Spec(
+            name=from_spec.name, coords=[from_spec.dim_coords(step.from_dim)],
+            dtype=from_spec.dtype)
+        step_to_spec = Spec(
+            name=to_spec.name, coords=[to_spec.dim_coords(step.to_dim)],
+            dtype=to_spec.dtype)
+        return step_from_spec, step_to_spec
+
+    def get_coefficients(self, data_handle, from_spec, to_spec):
+        """Read coefficients for each step, or generate and save if necessary
+
+        Returns
+        -------
+        list[tuple]
+            (from_dim, to_dim, coefficients) for each step, in order
+        """
+        coefficients = []
+        for step in self.plan(from_spec, to_spec):
+            step_from_spec, step_to_spec = self._step_specs(from_spec, to_spec, step)
+            step_coefficients = step.adaptor.get_coefficients(
+                data_handle, step_from_spec, step_to_spec)
+            coefficients.append((step.from_dim, step.to_dim, step_coefficients))
+        return coefficients
+
+    def generate_coefficients(self, from_spec, to_spec):
+        coefficients = []
+        for step in self.plan(from_spec, to_spec):
+            step_from_spec, step_to_spec = self._step_specs(from_spec, to_spec, step)
+            step_coefficients = step.adaptor.generate_coefficients(
+                step_from_spec, step_to_spec)
+            coefficients.append((step.from_dim, step.to_dim, step_coefficients))
+        return coefficients
+
+    def get_coefficients_key(self, from_spec, to_spec):
+        content = ":".join(self._get_step_keys(from_spec, to_spec))
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+    def _get_step_keys(self, from_spec, to_spec):
+        keys = []
+        for step in self.plan(from_spec, to_spec):
+            step_from_spec, step_to_spec = self._step_specs(from_spec, to_spec, step)
+            keys.append(step.adaptor.get_coefficients_key(step_from_spec, step_to_spec))
+        return keys
+
+    def get_group_key(self, from_spec, to_spec):
+        return (
+            self.get_coefficients_key(from_spec, to_spec),
+            tuple(from_spec.dims),
+            from_spec.shape,
+            from_spec.unit,
+            tuple(to_spec.dims),
+            to_spec.shape,
+            to_spec.unit
+        )
+
+    def convert(self, data_array, to_spec, coefficients):
+        return self._convert_steps(data_array.data, data_array.spec, to_spec, coefficients)
+
+    def convert_many(self, data_arrays, to_specs, coefficients):
+        data = np.stack([data_array.data for data_array in data_arrays])
+        converted = self._convert_steps(
+            data, data_arrays[0].spec, to_specs[0], coefficients, stacked=True)
+        return list(converted)
+
+    def _convert_steps(self, data, from_spec, to_spec, coefficients, stacked=False):
+        """Apply each step of coefficients in turn, then the unit conversion, then match the
+        order of dims to `to_spec`
+        """
+        offset = 1 if stacked else 0
+        dims = list(from_spec.dims)
+
+        convert_units = from_spec.unit != to_spec.unit
+        if convert_units and not self._is_linear(from_spec.unit, to_spec.unit):
+            # offset or non-affine conversions must apply to the source values
+            data = self._units._convert_units(data, from_spec.unit, to_spec.unit)
+            convert_units = False
+
+        for from_dim, to_dim, step_coefficients in coefficients:
+            if convert_units and step_coefficients.shape[1] > step_coefficients.shape[0]:
+                # scale before disaggregating, while the array is smaller
+                data = self._units._convert_units(data, from_spec.unit, to_spec.unit)
+                convert_units = False
+            axis = dims.index(from_dim)
+            if step_coefficients.shape[0] != data.shape[axis + offset]:
+                msg = "Coefficients do not match dimension to convert: %s != %s"
+                raise ValueError(msg, step_coefficients.shape[0], data.shape[axis + offset])
+            data = self.convert_with_coefficients(data, step_coefficients, axis + offset)
+            dims[axis] = to_dim
+
+        if convert_units:
+            data = self._units._convert_units(data, from_spec.unit, to_spec.unit)
+
+        if dims != list(to_spec.dims):
+            order = [dims.index(dim) + offset for dim in to_spec.dims]
+            data = np.transpose(data, list(range(offset)) + order)
+        return data
+
+    def _is_linear(self, from_unit, to_unit):
+        conversion = self._units.get_conversion(from_unit, to_unit)
+        return conversion is not None and not conversion[1]
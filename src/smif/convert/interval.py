@@ -133,6 +133,7 @@ from datetime import datetime, timedelta
 
 import numpy as np  # type: ignore
 from isodate import parse_duration  # type: ignore
+from scipy import sparse  # type: ignore
 from smif.convert.adaptor import Adaptor
 from smif.convert.register import NDimensionalRegister, ResolutionSet
 
@@ -145,6 +146,10 @@ __license__ = "mit"
 """
 BASE_YEAR = 2010
 
+"""Number of hours in the (non-leap) reference year
+"""
+HOURS_IN_YEAR = 8760
+
 
 class IntervalAdaptor(Adaptor):
     """Convert intervals, assuming uniform distributions where necessary
@@ -224,6 +229,7 @@ class Interval(object):
     def __init__(self, name, list_of_intervals, base_year=BASE_YEAR):
         self._name = name
         self._baseyear = base_year
+        self._bounds = None
         self.logger = logging.getLogger(__name__)
 
         if not list_of_intervals:
@@ -314,6 +320,7 @@ class Interval(object):
             msg = "A time interval must add either a single tuple or a list of tuples"
             raise ValueError(msg)
 
+        self._bounds = None
         self._validate()
 
     @property
@@ -348,6 +355,8 @@ class Interval(object):
     def bounds(self):
         """Return a list of tuples of the intervals in terms of hours
 
+        Bounds are calculated from the ISO8601 durations once, then kept.
+
         Returns
         -------
         list
@@ -355,12 +364,14 @@ class Interval(object):
             of the interval
 
         """
-        hours = []
-        for start_interval, end_interval in self.interval:
-            start = self._convert_to_hours(start_interval)
-            end = self._convert_to_hours(end_interval)
-            hours.append((start, end))
-        return hours
+        if self._bounds is None:
+            hours = []
+            for start_interval, end_interval in self.interval:
+                start = self._convert_to_hours(start_interval)
+                end = self._convert_to_hours(end_interval)
+                hours.append((start, end))
+            self._bounds = hours
+        return list(self._bounds)
 
     def _convert_to_hours(self, duration):
         """
@@ -394,7 +405,7 @@ class Interval(object):
         numpy.ndarray
             A boolean array
         """
-        array = np.zeros(8760, dtype=np.int)
+        array = np.zeros(HOURS_IN_YEAR, dtype=int)
         for lower, upper in self.bounds:
             array[lower:upper] += 1
         return array
@@ -417,21 +428,59 @@ class IntervalSet(ResolutionSet):
         self.logger = logging.getLogger(__name__)
         self.name = name
         self._base_year = base_year
+        self._hour_counts = None
+        self._bool_array = None
         self.data = data
-        self.bool_array = self._make_intersection_array()
 
-    def _make_intersection_array(self):
+    @property
+    def hour_counts(self):
+        """Sparse matrix where rows correspond to entries in the interval set, columns
+        represent hours of the year and values count the number of times each interval
+        covers each hour
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
         """
+        if self._hour_counts is None:
+            self._hour_counts = self._make_hour_counts()
+        return self._hour_counts
+
+    @property
+    def bool_array(self):
+        """Sparse boolean matrix where rows correspond to entries in the interval set and
+        columns represent hours of the year
+
         Returns
         -------
-        numpy.array
-            A boolean array where rows correspond to entries in the interval
-            set and columns represent hours of the year
+        scipy.sparse.csr_matrix
         """
-        array = np.zeros((len(self.data), 8760), dtype=np.bool)
+        if self._bool_array is None:
+            self._bool_array = (self.hour_counts > 0).astype(np.int64)
+        return self._bool_array
+
+    def _make_hour_counts(self):
+        rows, lowers, uppers = [], [], []
         for row, interval in enumerate(self.data):
-            array[row, :] = interval.to_hourly_array()
-        return array
+            for lower, upper in interval.bounds:
+                rows.append(row)
+                lowers.append(lower)
+                uppers.append(upper)
+        lowers = np.clip(np.array(lowers, dtype=np.int64), 0, HOURS_IN_YEAR)
+        uppers = np.clip(np.array(uppers, dtype=np.int64), lowers, HOURS_IN_YEAR)
+        lengths = uppers - lowers
+
+        # expand each (lower, upper) pair to the hours it covers
+        hour_rows = np.repeat(np.array(rows, dtype=np.int64), lengths)
+        offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        hours = np.arange(lengths.sum()) - offsets + np.repeat(lowers, lengths)
+
+        counts = sparse.coo_matrix(
+            (np.ones(len(hours), dtype=np.int64), (hour_rows, hours)),
+            shape=(len(self.data), HOURS_IN_YEAR)
+        )
+        # duplicate entries are summed on conversion
+        return counts.tocsr()
 
     @staticmethod
     def get_bounds(entry):
@@ -468,6 +517,41 @@ class IntervalSet(ResolutionSet):
 
         return proportion
 
+    def get_proportions(self, to_set):
+        """Calculate the proportion of each interval in this set which is in each interval
+        of `to_set`
+
+        Overlapping hours for every pair of intervals are found at once, by multiplying
+        the boolean hour matrices of the two sets.
+
+        Arguments
+        ---------
+        to_set : IntervalSet
+
+        Returns
+        -------
+        tuple
+            (rows, cols, values) arrays, as for
+            :meth:`smif.convert.register.ResolutionSet.get_proportions`
+        """
+        overlap = (self.bool_array @ to_set.bool_array.T).tocoo()
+        overlap.eliminate_zeros()
+        rows, cols = overlap.row, overlap.col
+
+        from_durations = np.asarray(self.hour_counts.sum(axis=1)).ravel()
+        values = overlap.data / from_durations[rows]
+
+        from_n_bounds = np.array([len(interval.bounds) for interval in self.data])
+        to_n_bounds = np.array([len(interval.bounds) for interval in to_set.data])
+        # resampling
+        resample = from_n_bounds[rows] > 2
+        values[resample] = values[resample] * from_n_bounds[rows][resample]
+        # remapping
+        remap = ~resample & (to_n_bounds[cols] > 2)
+        values[remap] = values[remap] / to_n_bounds[cols][remap]
+
+        return rows, cols, values
+
     def _compute_proportion(self, from_interval, to_interval):
         from_hours = from_interval.to_hourly_array()
         to_hours = to_interval.to_hourly_array()
@@ -489,8 +573,7 @@ class IntervalSet(ResolutionSet):
         -------
         float
         """
-        compact_array = np.sum(self.bool_array, axis=1)
-        coverage_value = np.sum(compact_array, axis=0)
+        coverage_value = self.bool_array.nnz
         self.logger.debug("Coverage of %s is %s", self.name, coverage_value)
         return coverage_value
 
@@ -514,8 +597,8 @@ class IntervalSet(ResolutionSet):
         elements = []
 
         for lower, upper in to_entry.bounds:
-            bool_array = np.sum(self.bool_array[:, lower:upper], axis=1)
-            intersect = np.nonzero(bool_array)[0]
+            bool_array = self.bool_array[:, lower:upper].sum(axis=1)
+            intersect = np.nonzero(np.asarray(bool_array).ravel())[0]
             self.logger.debug(
                 "Interval '%s' intersects with '%s'",
                 to_entry.name, ",".join([str(self.data[x].name) for x in intersect])
@@ -568,13 +651,12 @@ class IntervalSet(ResolutionSet):
                 Interval(name, interval_list, self._base_year))
             names[name] = len(self._data) - 1
 
+        self._hour_counts = None
+        self._bool_array = None
         self._validate_intervals()
 
     def _get_hourly_array(self):
-        array = np.zeros(8760, dtype=np.int)
-        for interval in self.data:
-            array += interval.to_hourly_array()
-        return array
+        return np.asarray(self.hour_counts.sum(axis=0)).ravel()
 
     def _validate_intervals(self):
         if self.data:
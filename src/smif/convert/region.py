@@ -1,9 +1,14 @@
 """Handles conversion between the sets of regions used in the `SosModel`
 """
+import os
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np  # type: ignore
 from rtree import index  # type: ignore
+from shapely import wkb  # type: ignore
 from shapely.geometry import mapping, shape  # type: ignore
+from shapely.prepared import prep  # type: ignore
 from shapely.validation import explain_validity  # type: ignore
 from smif.convert.adaptor import Adaptor
 from smif.convert.register import NDimensionalRegister, ResolutionSet
@@ -12,10 +17,25 @@ __author__ = "Will Usher, Tom Russell"
 __copyright__ = "Will Usher, Tom Russell"
 __license__ = "mit"
 
+"""Minimum number of regions in the destination set for intersections to be calculated
+on a pool of worker processes
+"""
+PARALLEL_MIN_SIZE = 1000
+
 
 class RegionAdaptor(Adaptor):
     """Convert regions, assuming uniform distributions where necessary
     """
+    # reads geometries already parsed by the store, while generating coefficients
+    _read_geometries = None
+
+    def get_coefficients(self, data_handle, from_spec, to_spec):
+        self._read_geometries = data_handle.read_dimension_geometries
+        try:
+            return super().get_coefficients(data_handle, from_spec, to_spec)
+        finally:
+            self._read_geometries = None
+
     def generate_coefficients(self, from_spec, to_spec):
         """Generate conversion coefficients for spatial dimensions
 
@@ -29,8 +49,10 @@ class RegionAdaptor(Adaptor):
         from_coords = from_spec.dim_coords(from_dim)
         to_coords = to_spec.dim_coords(to_dim)
         # create RegionSets from Coordinates
-        from_set = RegionSet(from_dim, from_coords.elements)
-        to_set = RegionSet(to_dim, to_coords.elements)
+        from_set = RegionSet(from_dim, from_coords.elements,
+                             geometries=self._dimension_geometries(from_dim))
+        to_set = RegionSet(to_dim, to_coords.elements,
+                           geometries=self._dimension_geometries(to_dim))
         # register RegionSets
         register = NDimensionalRegister()
         register.register(from_set)
@@ -39,6 +61,11 @@ class RegionAdaptor(Adaptor):
         coefficients = register.get_coefficients(from_dim, to_dim)
         return coefficients
 
+    def _dimension_geometries(self, dim):
+        if self._read_geometries is None:
+            return None
+        return self._read_geometries(dim)
+
 
 NamedShape = namedtuple('NamedShape', ['name', 'shape'])
 
@@ -54,18 +81,43 @@ class RegionSet(ResolutionSet):
     elements: iterable
         Iterable (probably a list or a reader handle)
         of fiona feature records e.g. the 'features' entry of
-        a GeoJSON collection
+        a GeoJSON collection.
+    max_workers : int or None, default=1
+        Number of worker processes used to calculate intersections with large region sets.
+        By default, all intersections are calculated in this process, as models may already
+        be running on a pool of worker processes (``smif run -j``). Set to None to use one
+        worker process per CPU.
+    geometries : dict, optional
+        (WKB bytes, (minx, miny, maxx, maxy) bounds) by element name, for example as kept
+        by a :class:`~smif.data_layer.file.spatial_cache.SpatialCache`. If given for every
+        element, shapes are loaded from WKB instead of parsed from each feature.
 
     """
-    def __init__(self, set_name, elements):
+    def __init__(self, set_name, elements, max_workers=1, geometries=None):
         super().__init__()
         self.name = set_name
+        self.max_workers = max_workers
         self._regions = []
-        self.data = [e['feature'] for e in elements]
+        self._valid = {}
+        elements = list(elements)
+
+        if geometries is not None:
+            geometries = [geometries.get(e['name']) for e in elements]
+        if geometries is None or None in geometries:
+            self.data = [e['feature'] for e in elements]
+            bounds = [region.shape.bounds for region in self._regions]
+        else:
+            self._add_regions(
+                NamedShape(e['feature']['properties']['name'], wkb.loads(region_wkb))
+                for e, (region_wkb, _) in zip(elements, geometries))
+            bounds = [region_bounds for _, region_bounds in geometries]
 
-        self._idx = index.Index()
-        for pos, region in enumerate(self._regions):
-            self._idx.insert(pos, region.shape.bounds)
+        # bulk loading is much faster than inserting one region at a time
+        if len(bounds):
+            self._idx = index.Index(
+                (pos, tuple(region_bounds), None) for pos, region_bounds in enumerate(bounds))
+        else:
+            self._idx = index.Index()
 
     @property
     def data(self):
@@ -73,19 +125,18 @@ class RegionSet(ResolutionSet):
 
     @data.setter
     def data(self, value):
+        self._add_regions(
+            NamedShape(region['properties']['name'], shape(region['geometry']))
+            for region in value)
+
+    def _add_regions(self, named_shapes):
         names = {}
-        for region in value:
-            name = region['properties']['name']
-            if name in names:
+        for region in named_shapes:
+            if region.name in names:
                 msg = "Region set must have uniquely named regions - {} duplicated"
-                raise AssertionError(msg.format(name))
-            names[name] = True
-            self._regions.append(
-                NamedShape(
-                    name,
-                    shape(region['geometry'])
-                )
-            )
+                raise AssertionError(msg.format(region.name))
+            names[region.name] = True
+            self._regions.append(region)
 
     def get_entry_names(self):
         return [region.name for region in self.data]
@@ -139,7 +190,7 @@ class RegionSet(ResolutionSet):
         """Calculate the proportion of shape a that intersects with shape b
         """
         entry_a = self.data[from_idx]
-        if self.check_valid_shape(entry_a.shape):
+        if self.is_valid(from_idx):
             if self.check_valid_shape(entry_b.shape):
                 intersection = entry_a.shape.intersection(entry_b.shape)
                 return intersection.area / entry_a.shape.area
@@ -148,6 +199,69 @@ class RegionSet(ResolutionSet):
         else:
             raise RuntimeError("Shape {} from {} is not valid".format(entry_a.name, self.name))
 
+    def get_proportions(self, to_set):
+        """Calculate the proportion of each region in this set which intersects with each
+        region in `to_set`
+
+        Candidate pairs of regions are found from the spatial index. Each region is
+        checked for validity once, and each region in `to_set` is prepared once to test
+        candidates for containment or intersection before calculating the area of any
+        intersection. For large destination sets, `to_set` is split across a pool of worker
+        processes.
+
+        Arguments
+        ---------
+        to_set : RegionSet
+
+        Returns
+        -------
+        tuple
+            (rows, cols, values) arrays, as for
+            :meth:`smif.convert.register.ResolutionSet.get_proportions`
+        """
+        pairs = [
+            (from_idx, to_idx)
+            for to_idx, to_entry in enumerate(to_set)
+            for from_idx in self.intersection(to_entry)
+        ]
+        for from_idx in sorted({from_idx for from_idx, _ in pairs}):
+            if not self.is_valid(from_idx):
+                raise RuntimeError("Shape {} from {} is not valid".format(
+                    self.data[from_idx].name, self.name))
+        for to_idx in sorted({to_idx for _, to_idx in pairs}):
+            if not to_set.is_valid(to_idx):
+                raise RuntimeError("Shape {} is not valid".format(to_set.data[to_idx].name))
+
+        max_workers = self.max_workers or os.cpu_count() or 1
+        if max_workers > 1 and len(to_set) >= PARALLEL_MIN_SIZE:
+            chunks = _split_pairs(pairs, len(to_set), max_workers * 4)
+            args = [self._chunk_args(to_set, chunk) for chunk in chunks]
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                values = list(executor.map(_intersection_proportions, *zip(*args)))
+            values = np.concatenate(values) if values else np.zeros(0)
+        else:
+            values = _intersection_proportions(*self._chunk_args(to_set, pairs))
+
+        rows = np.array([from_idx for from_idx, _ in pairs], dtype=np.int64)
+        cols = np.array([to_idx for _, to_idx in pairs], dtype=np.int64)
+        nonzero = values > 0
+        return rows[nonzero], cols[nonzero], values[nonzero]
+
+    def _chunk_args(self, to_set, pairs):
+        """Shapes needed to calculate proportions for a list of (from, to) pairs
+        """
+        from_shapes = {from_idx: self.data[from_idx].shape for from_idx, _ in pairs}
+        to_shapes = {to_idx: to_set.data[to_idx].shape for _, to_idx in pairs}
+        return from_shapes, to_shapes, pairs
+
+    def is_valid(self, idx):
+        """Check whether the region at position `idx` has a valid shape, checking each
+        region once
+        """
+        if idx not in self._valid:
+            self._valid[idx] = self.check_valid_shape(self.data[idx].shape)
+        return self._valid[idx]
+
     def check_valid_shape(self, shape):
         if not shape.is_valid:
             validity = explain_validity(shape)
@@ -169,3 +283,46 @@ class RegionSet(ResolutionSet):
 
     def __len__(self):
         return len(self._regions)
+
+
+def _split_pairs(pairs, n_to, n_chunks):
+    """Split (from, to) pairs, ordered by destination, into chunks covering contiguous
+    ranges of destination regions
+    """
+    to_idxs = [to_idx for _, to_idx in pairs]
+    bounds = np.linspace(0, n_to, n_chunks + 1).astype(int)[1:-1]
+    splits = np.searchsorted(to_idxs, bounds)
+    starts = np.concatenate([[0], splits])
+    ends = np.concatenate([splits, [len(pairs)]])
+    return [pairs[start:end] for start, end in zip(starts, ends) if end > start]
+
+
+def _intersection_proportions(from_shapes, to_shapes, pairs):
+    """Calculate the proportion of each source shape which is in each destination shape
+
+    Arguments
+    ---------
+    from_shapes : dict
+        Source shapes by position
+    to_shapes : dict
+        Destination shapes by position
+    pairs : list
+        (from position, to position) pairs to calculate
+
+    Returns
+    -------
+    numpy.ndarray
+        Proportion for each pair
+    """
+    prepared = {}
+    values = np.zeros(len(pairs))
+    for pos, (from_idx, to_idx) in enumerate(pairs):
+        if to_idx not in prepared:
+            prepared[to_idx] = prep(to_shapes[to_idx])
+        from_shape = from_shapes[from_idx]
+        if prepared[to_idx].contains(from_shape):
+            values[pos] = 1
+        elif prepared[to_idx].intersects(from_shape):
+            intersection = from_shape.intersection(to_shapes[to_idx])
+            values[pos] = intersection.area / from_shape.area
+    return values
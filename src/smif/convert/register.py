@@ -10,6 +10,12 @@ from collections import OrderedDict, defaultdict
 from typing import Dict, List
 
 import numpy as np  # type: ignore
+from scipy import sparse  # type: ignore
+
+# Coefficients with at least this many cells, and at most this proportion of non-zero
+# values, are generated as sparse matrices. Smaller or denser coefficients are dense arrays.
+SPARSE_MIN_SIZE = 10000
+SPARSE_MAX_DENSITY = 0.1
 
 
 class ResolutionSet(metaclass=ABCMeta):
@@ -82,6 +88,40 @@ class ResolutionSet(metaclass=ABCMeta):
         """
         raise NotImplementedError
 
+    def get_proportions(self, to_set):
+        """Calculate the proportion of each entry in this set which is in each entry of
+        `to_set`
+
+        Override to calculate proportions for a whole pair of sets at once, where that is
+        faster than calling :meth:`get_proportion` for each intersecting pair of entries.
+
+        Arguments
+        ---------
+        to_set : ResolutionSet
+
+        Returns
+        -------
+        tuple
+            (rows, cols, values) where each value is the proportion of entry number `row` of
+            this set which is in entry number `col` of `to_set`
+        """
+        from_positions = {
+            name: position for position, name in enumerate(self.get_entry_names())}
+        rows, cols, values = [], [], []
+        for to_idx, to_entry in enumerate(to_set):
+            for from_idx in self.intersection(to_entry):
+                from_entry = self.data[from_idx]
+                proportion = self.get_proportion(from_idx, to_entry)
+
+                self.logger.debug("%i percent of %s (#%s) is in %s (#%s)",
+                                  proportion * 100,
+                                  to_entry.name, to_idx,
+                                  from_entry.name, from_idx)
+                rows.append(from_positions[from_entry.name])
+                cols.append(to_idx)
+                values.append(proportion)
+        return rows, cols, values
+
     @property
     @abstractmethod
     def coverage(self):
@@ -200,11 +240,9 @@ class Register(LogMixin, metaclass=ABCMeta):
                 raise ValueError(msg, coefficients.shape[axis], data_count)
 
         if axis == 0:
-            converted = np.dot(coefficients.T, data)
-        elif axis == 1:
-            converted = np.dot(data, coefficients)
+            converted = coefficients.T @ data
         else:
-            converted = np.dot(data, coefficients)
+            converted = data @ coefficients
 
         return converted
 
@@ -307,13 +345,15 @@ class NDimensionalRegister(Register):
 
         return coefficients
 
-    def generate_coefficients(
-            self, from_set: ResolutionSet, to_set: ResolutionSet) -> np.ndarray:
+    def generate_coefficients(self, from_set: ResolutionSet, to_set: ResolutionSet):
         """Generate coefficients for converting between two :class:`ResolutionSet`s
 
         Coefficients for converting a single dimension will always be 2D, of shape
         (len(from_set), len(to_set)).
 
+        Large, mostly-zero coefficients are returned as a sparse matrix, see
+        :func:`as_coefficients`.
+
         Parameters
         ----------
         from_set : ResolutionSet
@@ -321,24 +361,54 @@ class NDimensionalRegister(Register):
 
         Returns
         -------
-        numpy.ndarray
+        numpy.ndarray or scipy.sparse.csr_matrix
         """
-        coefficients = np.zeros((len(from_set), len(to_set)), dtype=np.float)
+        shape = (len(from_set), len(to_set))
         self.logger.debug("Coefficients array is of shape %s for %s to %s",
-                          coefficients.shape, from_set.name, to_set.name)
-
-        from_names = from_set.get_entry_names()
-        for to_idx, to_entry in enumerate(to_set):
-            for from_idx in from_set.intersection(to_entry):
-                from_entry = from_set.data[from_idx]
-                proportion = from_set.get_proportion(from_idx, to_entry)
-
-                self.logger.debug("%i percent of %s (#%s) is in %s (#%s)",
-                                  proportion * 100,
-                                  to_entry.name, to_idx,
-                                  from_entry.name, from_idx)
-                from_idx = from_names.index(from_entry.name)
+                          shape, from_set.name, to_set.name)
 
-                coefficients[from_idx, to_idx] = proportion
+        rows, cols, values = from_set.get_proportions(to_set)
+        coefficients = as_coefficients(rows, cols, values, shape)
         self.logger.debug("Generated %s", coefficients)
         return coefficients
+
+
+def as_coefficients(rows, cols, values, shape):
+    """Create a coefficients matrix from its non-zero values
+
+    Coefficients are created as a :class:`scipy.sparse.csr_matrix` if they have at least
+    `SPARSE_MIN_SIZE` cells and at most `SPARSE_MAX_DENSITY` of them are non-zero, otherwise
+    as a dense :class:`numpy.ndarray`.
+
+    If a (row, col) position is given more than once, the last value is used.
+
+    Parameters
+    ----------
+    rows : list[int]
+        Row (source) position of each value
+    cols : list[int]
+        Column (destination) position of each value
+    values : list[float]
+    shape : tuple
+        (source size, destination size)
+
+    Returns
+    -------
+    numpy.ndarray or scipy.sparse.csr_matrix
+    """
+    size = shape[0] * shape[1]
+    if size >= SPARSE_MIN_SIZE and len(values) <= SPARSE_MAX_DENSITY * size:
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        # csr_matrix sums duplicate entries, so keep only the last of each, as for the
+        # dense array
+        flat = rows * shape[1] + cols
+        _, last = np.unique(flat[::-1], return_index=True)
+        keep = len(flat) - 1 - last
+        return sparse.csr_matrix(
+            (values[keep], (rows[keep], cols[keep])), shape=shape, dtype=np.float64)
+
+    coefficients = np.zeros(shape, dtype=np.float64)
+    coefficients[rows, cols] = values
+    return coefficients
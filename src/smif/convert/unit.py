@@ -1,5 +1,6 @@
 """Handles conversion between units used in the `SosModel`
 """
+import numpy as np  # type: ignore
 from pint import DimensionalityError, UndefinedUnitError, UnitRegistry  # type: ignore
 
 from smif.convert.adaptor import Adaptor
@@ -8,34 +9,96 @@ from smif.data_layer.data_handle import DataHandle
 
 class UnitAdaptor(Adaptor):
     """Scalar conversion of units
+
+    Most unit conversions are affine, ``to = from * scale + offset``. The scale and offset
+    for each pair of units are found once, then applied to data with numpy. Other
+    conversions, for example between logarithmic units, are done by pint.
     """
     def __init__(self, name):
         self._register = UnitRegistry()
+        self._conversions = {}
         super().__init__(name)
 
     def before_model_run(self, data_handle: DataHandle):
-        """Register unit definitions in registry before model run
+        """Register unit definitions in registry before model run, then resolve the
+        conversion between each pair of input and output units
         """
         units = data_handle.read_unit_definitions()
         for unit in units:
             self._register.define(unit)
 
+        self._conversions = {}
+        for from_spec in self.inputs.values():
+            if from_spec.name in self.outputs:
+                self.get_conversion(from_spec.unit, self.outputs[from_spec.name].unit)
+
     def convert(self, data_array, to_spec, coefficients):
-        data = data_array.data
-        from_spec = data_array.spec
+        return self._convert_units(data_array.data, data_array.spec.unit, to_spec.unit)
+
+    def convert_many(self, data_arrays, to_specs, coefficients):
+        from_spec = data_arrays[0].spec
+        data = np.stack([data_array.data for data_array in data_arrays])
+        return list(self._convert_units(data, from_spec.unit, to_specs[0].unit))
+
+    def get_group_key(self, from_spec, to_spec):
+        return (from_spec.unit, to_spec.unit, from_spec.shape)
+
+    def _convert_units(self, data, from_unit, to_unit):
+        conversion = self.get_conversion(from_unit, to_unit)
+        if conversion is None:
+            return self._convert_quantity(data, from_unit, to_unit)
+
+        scale, offset = conversion
+        converted = np.multiply(data, scale)
+        if offset:
+            converted += offset
+        return converted
+
+    def get_conversion(self, from_unit, to_unit):
+        """Get the scale and offset to convert between a pair of units
+
+        Parameters
+        ----------
+        from_unit : str
+        to_unit : str
+
+        Returns
+        -------
+        tuple or None
+            (scale, offset), or None if the conversion is not affine
+
+        Raises
+        ------
+        ValueError
+            If either unit is undefined, or the units cannot be converted
+        """
+        if (from_unit, to_unit) not in self._conversions:
+            # converting 0, 1 and 2 finds the offset, the scale and checks the conversion
+            # is affine
+            zero, one, two = self._convert_quantity(
+                np.array([0., 1., 2.]), from_unit, to_unit)
+            scale = one - zero
+            if np.isclose(two, zero + 2 * scale, rtol=1e-12, atol=0):
+                self._conversions[(from_unit, to_unit)] = (scale, zero)
+            else:
+                self._conversions[(from_unit, to_unit)] = None
+        return self._conversions[(from_unit, to_unit)]
 
+    def _convert_quantity(self, data, from_unit, to_unit):
+        """Convert data using pint
+        """
         try:
-            quantity = self._register.Quantity(data, from_spec.unit)
+            quantity = self._register.Quantity(data, from_unit)
         except UndefinedUnitError:
-            raise ValueError('Cannot convert from undefined unit {}'.format(from_spec.unit))
+            raise ValueError('Cannot convert from undefined unit {}'.format(from_unit))
 
         try:
-            converted_quantity = quantity.to(to_spec.unit)
+            converted_quantity = quantity.to(to_unit)
         except UndefinedUnitError as ex:
-            raise ValueError('Cannot convert undefined unit {}'.format(to_spec.unit)) from ex
+            raise ValueError('Cannot convert undefined unit {}'.format(to_unit)) from ex
         except DimensionalityError as ex:
             msg = 'Cannot convert unit from {} to {}'
-            raise ValueError(msg.format(from_spec.unit, to_spec.unit)) from ex
+            raise ValueError(msg.format(from_unit, to_unit)) from ex
 
         return converted_quantity.magnitude
 
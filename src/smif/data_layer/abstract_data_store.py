@@ -186,11 +186,11 @@ class DataStore(metaclass=ABCMeta):
 
     # region Conversion coefficients
     @abstractmethod
-    def read_coefficients(self, source_dim, destination_dim):
+    def read_coefficients(self, source_dim, destination_dim, key=None):
         """Reads coefficients from the store
 
-        Coefficients are uniquely identified by their source/destination dimensions.
-        This method and `write_coefficients` implement caching of conversion
+        Coefficients are uniquely identified by their source/destination dimensions and
+        key. This method and `write_coefficients` implement caching of conversion
         coefficients between a single pair of dimensions.
 
         Parameters
@@ -199,10 +199,13 @@ class DataStore(metaclass=ABCMeta):
             dimension name
         destination_dim : str
             dimension name
+        key : str, optional
+            identifies the content of the dimensions, so that coefficients written for
+            different dimension elements are not returned
 
         Returns
         -------
-        numpy.ndarray
+        numpy.ndarray or scipy.sparse.csr_matrix
 
         Notes
         -----
@@ -210,11 +213,11 @@ class DataStore(metaclass=ABCMeta):
         """
 
     @abstractmethod
-    def write_coefficients(self, source_dim, destination_dim, data):
+    def write_coefficients(self, source_dim, destination_dim, data, key=None):
         """Writes coefficients to the store
 
-        Coefficients are uniquely identified by their source/destination dimensions.
-        This method and `read_coefficients` implement caching of conversion
+        Coefficients are uniquely identified by their source/destination dimensions and
+        key. This method and `read_coefficients` implement caching of conversion
         coefficients between a single pair of dimensions.
 
         Parameters
@@ -223,7 +226,9 @@ class DataStore(metaclass=ABCMeta):
             dimension name
         destination_dim : str
             dimension name
-        data : numpy.ndarray
+        data : numpy.ndarray or scipy.sparse.spmatrix
+        key : str, optional
+            identifies the content of the dimensions
 
         Notes
         -----
@@ -265,6 +270,24 @@ class DataStore(metaclass=ABCMeta):
         decision_iteration : int, optional
         """
 
+    def write_results_many(self, data_arrays, modelrun_name, model_name, timestep=None,
+                           decision_iteration=None):
+        """Write several results of a `model_name` in `model_run_name` at once
+
+        Override where a data store can write several results faster than one at a time.
+
+        Parameters
+        ----------
+        data_arrays : list[~smif.data_layer.data_array.DataArray]
+        model_run_id : str
+        model_name : str
+        timestep : int, optional
+        decision_iteration : int, optional
+        """
+        for data_array in data_arrays:
+            self.write_results(
+                data_array, modelrun_name, model_name, timestep, decision_iteration)
+
     @abstractmethod
     def available_results(self, modelrun_name):
         """List available results from a model run
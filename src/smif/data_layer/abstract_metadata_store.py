@@ -89,4 +89,19 @@ class MetadataStore(metaclass=ABCMeta):
         ----------
         dimension_name : str
         """
+
+    def read_dimension_geometries(self, dimension_name):
+        """Return the geometries of a spatial dimension, if already parsed
+
+        Parameters
+        ----------
+        dimension_name : str
+
+        Returns
+        -------
+        dict or None
+            (WKB bytes, (minx, miny, maxx, maxy) bounds) by element name, or None if the
+            store does not keep geometries for the dimension
+        """
+        return None
     # endregion
@@ -1,6 +1,6 @@
 """DataArray provides a thin wrapper around multidimensional arrays and metadata
 """
-from logging import getLogger
+from logging import DEBUG, getLogger
 
 import numpy as np  # type: ignore
 from smif.exception import (SmifDataError, SmifDataMismatchError,
@@ -28,6 +28,10 @@ class DataArray():
     """DataArray provides access to input/parameter/results data, with conversions to common
     python data libraries (for example: numpy, pandas, xarray).
 
+    The data may be backed by memory which smif does not own, for example a memory-mapped
+    file or the buffer of a :class:`pyarrow.Table` (see :meth:`from_arrow`). Such data is
+    read-only: copy it to change values.
+
     Attributes
     ----------
     spec: smif.metadata.spec.Spec
@@ -133,15 +137,15 @@ class DataArray():
 
     def as_df(self) -> pandas.DataFrame:
         """Access DataArray as a :class:`pandas.DataFrame`
-        """
-        dims = self.dims
-        coords = [c.ids for c in self.coords]
 
+        The DataFrame shares memory with the DataArray where possible, and uses the index
+        cached on the spec, so is cheap to create. Copy it before changing values.
+        """
         try:
-            if dims and coords:
-                index = pandas.MultiIndex.from_product(coords, names=dims)
+            if self.dims:
                 return pandas.DataFrame(
-                    {self.name: np.reshape(self.data, self.data.size)}, index=index)
+                    np.reshape(self.data, (self.data.size, 1)), index=self.spec.index.view(),
+                    columns=[self.name], copy=False)
             else:
                 # with no dims or coords, should be in the zero-dimensional case
                 if self.data.shape != ():
@@ -178,38 +182,42 @@ class DataArray():
                 data_columns=data_columns,
                 index_names=index_names))
 
-        try:
-            # convert to dataset
-            xr_dataset = dataframe.to_xarray()
-
-            # extract xr.DataArray
-            xr_data_array = xr_dataset[spec.name]
+        if not dims:
+            # zero-dimensional case (scalar)
+            return cls(spec, dataframe[name].values)
 
-            # reindex to ensure data order and fill out NaNs
-            xr_data_array = _reindex_xr_data_array(spec, xr_data_array)
+        values = dataframe[name].values
+        flat_positions = _flat_positions(spec, dataframe.index)
+        size = int(np.prod(spec.shape))
 
-        # xarray raises Exception in v0.10 (narrowed to ValueError in v0.11)
-        except Exception as ex:  # pylint: disable=broad-except
+        counts = np.bincount(flat_positions, minlength=size)
+        if np.any(counts > 1):
             dups = find_duplicate_indices(dataframe)
-            if dups:
-                msg = "Data for '{name}' contains duplicate values at {dups}"
-                raise SmifDataMismatchError(msg.format(name=name, dups=dups)) from ex
-            else:
-                raise ex
+            msg = "Data for '{name}' contains duplicate values at {dups}"
+            raise SmifDataMismatchError(msg.format(name=name, dups=dups))
 
-        return cls(spec, xr_data_array.data)
+        if len(flat_positions) == size:
+            data = np.empty(size, dtype=values.dtype)
+        else:
+            # fill out missing values with NaN
+            data = np.full(size, np.nan, dtype=_nan_dtype(values.dtype))
+        data[flat_positions] = values
+
+        return cls(spec, data.reshape(spec.shape))
 
     def as_xarray(self):
         """Access DataArray as a :class:`xarray.DataArray`
+
+        The xarray.DataArray wraps the same data, without copying.
         """
         metadata = self.spec.as_dict()
         del metadata['dims']
         del metadata['coords']
 
         dims = self.dims
-        coords = {c.name: c.ids for c in self.coords}
 
         try:
+            coords = dict(zip(dims, self.spec.dim_indexes))
             return xarray.DataArray(
                 self.data,
                 coords=coords,
@@ -220,6 +228,49 @@ class DataArray():
         except NameError as ex:
             raise SmifDataError(INSTALL_WARNING) from ex
 
+    @classmethod
+    def from_arrow(cls, spec, table):
+        """Create a DataArray from a :class:`pyarrow.Table`, with a column for each dim and a
+        column named for the spec
+
+        If every value is present, in the order of the spec (as written from :meth:`as_df`),
+        the data wraps the buffer of the table without copying, and is read-only. Otherwise
+        values are copied into place.
+        """
+        name = spec.name
+        columns = table.column_names
+        if not spec.dims or name not in columns or \
+                any(dim not in columns or table.column(dim).null_count for dim in spec.dims):
+            # let pandas recover the layout, or report what is wrong
+            return cls.from_df(spec, table.to_pandas())
+
+        levels = {}
+        for dim in spec.dims:
+            encoded = table.column(dim).combine_chunks().dictionary_encode()
+            levels[dim] = (
+                encoded.indices.to_numpy(zero_copy_only=False).astype(np.intp),
+                encoded.dictionary.to_numpy(zero_copy_only=False))
+        flat_positions = _flat_positions_from_levels(
+            spec, levels, lambda dim, unknown: levels[dim][1][levels[dim][0][unknown]])
+
+        size = int(np.prod(spec.shape))
+        if np.any(np.bincount(flat_positions, minlength=size) > 1):
+            # report duplicates as for a DataFrame
+            return cls.from_df(spec, table.to_pandas())
+
+        values = table.column(name).combine_chunks().to_numpy(zero_copy_only=False)
+        if len(flat_positions) == size and \
+                np.array_equal(flat_positions, np.arange(size)):
+            return cls(spec, values.reshape(spec.shape))
+
+        if len(flat_positions) == size:
+            data = np.empty(size, dtype=values.dtype)
+        else:
+            # fill out missing values with NaN
+            data = np.full(size, np.nan, dtype=_nan_dtype(values.dtype))
+        data[flat_positions] = values
+        return cls(spec, data.reshape(spec.shape))
+
     @classmethod
     def from_xarray(cls, spec, xr_data_array):
         """Create a DataArray from a :class:`xarray.DataArray`
@@ -230,28 +281,63 @@ class DataArray():
 
     def update(self, other):
         """Update data values with any from other which are non-null
+
+        Values are written in place, unless the data is read-only, or the values of other
+        cannot be held in the data type of this DataArray.
         """
         assert self.spec == other.spec, "Specs must match when updating DataArray"
-        # convert self and other to xarray representation
-        self_xr = self.as_xarray()
-        other_xr = other.as_xarray()
-        # use xarray.combine_first convenience function
-        overridden = other_xr.combine_first(self_xr)
-        # assign result back to self
-        self.data = overridden.data
+        other_data = np.asarray(other.data)
+        self._prepare_update(other_data.dtype)
+        np.copyto(self.data, other_data, where=~_isnull(other_data), casting='unsafe')
+
+    def update_many(self, others):
+        """Update data values with any from each of a list of others which are non-null,
+        later DataArrays overriding earlier ones
+
+        Equivalent to calling :meth:`update` with each in turn, in a single pass.
+        """
+        if not others:
+            return
+        for other in others:
+            assert self.spec == other.spec, "Specs must match when updating DataArray"
+        if len(others) == 1:
+            self.update(others[0])
+            return
+
+        stacked = np.stack([other.data for other in others])
+        present = ~_isnull(stacked)
+        # position of the last non-null value along the stacked axis
+        last = len(others) - 1 - np.argmax(present[::-1], axis=0)
+        values = np.take_along_axis(stacked, last[np.newaxis], axis=0)[0]
+
+        self._prepare_update(stacked.dtype)
+        np.copyto(self.data, values, where=np.any(present, axis=0), casting='unsafe')
+
+    def _prepare_update(self, dtype):
+        """Make sure data is a writeable array which can hold values of `dtype`
+        """
+        if not isinstance(self.data, np.ndarray):
+            # zero-dimensional data may be held as a numpy scalar
+            self.data = np.array(self.data)
+        result_dtype = np.result_type(self.data.dtype, dtype)
+        if result_dtype != self.data.dtype:
+            self.data = self.data.astype(result_dtype)
+        elif not self.data.flags.writeable:
+            self.data = self.data.copy()
 
     def validate_as_full(self):
         """Check that the data array contains no NaN values
         """
-        dataframe = self.as_df()
-        if np.any(dataframe.isnull()):
-            expected_len = len(dataframe)
-            missing_data = show_null(dataframe)
-            actual_len = expected_len - len(missing_data)
+        missing = _isnull(self.data)
+        if np.any(missing):
+            expected_len = self.data.size
+            actual_len = expected_len - int(np.count_nonzero(missing))
             dim_lens = "{" + ", ".join(
                 "{}: {}".format(dim, len_) for dim, len_ in zip(self.dims, self.shape)
             ) + "}"
-            self.logger.debug("Missing data:\n\n    %s", missing_data)
+            if self.logger.isEnabledFor(DEBUG):
+                missing_data = show_null(self.as_df())
+                self.logger.debug("Missing data:\n\n    %s", missing_data)
             msg = "Data for '{name}' had missing values - read {actual_len} but expected " + \
                   "{expected_len} in total, from dims of length {dim_lens}"
             raise SmifDataMismatchError(msg.format(
@@ -298,6 +384,80 @@ def _array_equal_nan(a, b):
         return np.all(a == b)
 
 
+def _isnull(data):
+    """Find null values, NaN or None, in a numpy array
+    """
+    if np.issubdtype(data.dtype, np.floating) or np.issubdtype(data.dtype, np.complexfloating):
+        return np.isnan(data)
+    if data.dtype.kind in 'mM':
+        return np.isnat(data)
+    if data.dtype == object:
+        return np.frompyfunc(lambda value: value is None or value != value, 1, 1)(data) \
+            .astype(bool)
+    # integer, boolean and string arrays cannot hold nulls
+    return np.zeros(data.shape, dtype=bool)
+
+
+def _flat_positions(spec, index):
+    """Find the position of each row of a DataFrame index in the flattened data array of a
+    spec
+
+    Labels are looked up once for each unique value, using the position lookup of each
+    dimension's Coordinates, then spread back over the rows.
+    """
+    if isinstance(index, pandas.MultiIndex):
+        levels = {
+            dim: (index.codes[i], index.levels[i].values)
+            for i, dim in enumerate(index.names)
+        }
+    else:
+        codes, uniques = pandas.factorize(index)
+        levels = {index.name: (codes, np.asarray(uniques))}
+
+    return _flat_positions_from_levels(
+        spec, levels, lambda dim, unknown: index.get_level_values(dim)[unknown])
+
+
+def _flat_positions_from_levels(spec, levels, unknown_labels):
+    """Find flat positions in the data array of a spec from the codes and labels of each
+    dimension
+
+    Parameters
+    ----------
+    spec : smif.metadata.spec.Spec
+    levels : dict
+        (codes, labels) by dimension name, where codes of -1 mark missing labels
+    unknown_labels : callable
+        Given a dimension name and a mask of rows, returns the labels of those rows, used to
+        report labels which are not in the spec
+    """
+    positions = []
+    for dim, coords in zip(spec.dims, spec.coords):
+        codes, labels = levels[dim]
+        label_positions = coords.positions(labels)
+        dim_positions = label_positions[codes]
+        # codes of -1 mark missing (NaN) labels
+        unknown = (dim_positions < 0) | (codes < 0)
+        if np.any(unknown):
+            extras = list(pandas.unique(unknown_labels(dim, unknown)))
+            msg = "Data for '{name}' contained unexpected values in the set of " + \
+                  "coordinates for dimension '{dim}': {extras}"
+            raise SmifDataMismatchError(msg.format(dim=dim, extras=extras, name=spec.name))
+        positions.append(dim_positions)
+
+    return np.ravel_multi_index(positions, spec.shape)
+
+
+def _nan_dtype(dtype):
+    """Data type which can hold NaN to mark missing values, following xarray's promotion
+    """
+    if np.issubdtype(dtype, np.floating) or np.issubdtype(dtype, np.complexfloating):
+        return dtype
+    if np.issubdtype(dtype, np.integer):
+        return np.float64
+    return object
+
+
 def _reindex_xr_data_array(spec, xr_data_array):
     """Reindex to ensure full data, order
     """
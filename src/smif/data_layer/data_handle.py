@@ -6,6 +6,7 @@ transparent access to the relevant data and parameters for the current
 data (at any computed or pre-computed timestep) and write access to output data
 (at the current timestep).
 """
+from collections import Counter, OrderedDict, defaultdict
 from copy import copy
 from logging import getLogger
 from types import MappingProxyType
@@ -14,108 +15,305 @@ from typing import Dict, List, Optional, Union
 import numpy as np  # type: ignore
 
 from smif.data_layer.data_array import DataArray
+from smif.data_layer.results_buffer import ResultsBuffer
 from smif.data_layer.store import Store
 from smif.exception import SmifDataError
 from smif.metadata import RelativeTimestep
 
-
-class DataHandle(object):
-    """Get/set model parameters and data
+# Default maximum size in bytes of results kept in memory for dependent models in a model run
+RESULTS_CACHE_SIZE = 256 * 1024 * 1024
+
+
+class RunContext(object):
+    """Configuration, dependencies and parameters for a model run, loaded once and shared
+    between the DataHandles created while running it
+
+    Model run and system-of-systems model configuration are read from the store when the
+    context is created. Dependencies and parameter values for each model are read the
+    first time they are requested, then kept for later requests.
+
+    Parameter values are shared between DataHandles, so their data arrays are marked
+    read-only. Each DataHandle gives its model a writeable copy of a parameter the first
+    time it is requested.
+
+    Conversion coefficients are kept in memory once read or written, for the most
+    recently used `coefficient_cache_size` pairs of dimensions, so each conversion reads
+    its coefficients from the store once per run rather than once per timestep.
+
+    Results are always written to the store. Results which other models depend on are also
+    kept in memory, up to `results_cache_size` bytes, and handed to the models which read
+    them without reading them back from the store. Each result is dropped from memory once
+    every dependency on it has been read, or when it is the least recently used and the
+    cache is full. Every model which reads a result gets its own copy, except the last,
+    which is given the cached array.
+
+    With `write_behind`, results are written to the store in the background by a
+    :class:`~smif.data_layer.results_buffer.ResultsBuffer`, and read back from memory until
+    written. :meth:`flush_results` must be called before results are read other than through
+    this context.
+
+    Parameters
+    ----------
+    store : Store
+        Backing store for configuration and parameters
+    modelrun_name : str
+        Name of the modelrun
+    coefficient_cache_size : int, default=32
+        Number of sets of conversion coefficients to keep in memory
+    write_behind : bool, default=False
+        Write results in the background
+    results_cache_size : int, default=RESULTS_CACHE_SIZE
+        Maximum size in bytes of the results kept in memory for dependent models
+
+    Attributes
+    ----------
+    initialised : set
+        Names of the models whose ``before_model_run`` has been called in this process
     """
-    def __init__(self, store: Store, modelrun_name, current_timestep, timesteps, model,
-                 decision_iteration=None):
-        """Create a DataHandle for a Model to access data, parameters and state, and to
-        communicate results.
+    def __init__(self, store: Store, modelrun_name, coefficient_cache_size=32,
+                 write_behind=False, results_cache_size=None):
+        self.logger = getLogger(__name__)
+        self._store = store
+        self.modelrun_name = modelrun_name
+        self.modelrun = store.read_model_run(modelrun_name)
+        self.sos_model = store.read_sos_model(self.modelrun['sos_model'])
+        self._dependencies = {}  # type: Dict[str, tuple]
+        self._parameters = {}  # type: Dict[str, Dict[str, DataArray]]
+        self.coefficient_cache_size = coefficient_cache_size
+        self._coefficients = OrderedDict()  # type: OrderedDict
+        self.initialised = set()
+        if write_behind:
+            self._results_writer = ResultsBuffer(store)
+        else:
+            self._results_writer = store
+        if results_cache_size is None:
+            results_cache_size = RESULTS_CACHE_SIZE
+        self.results_cache_size = results_cache_size
+        self._results = OrderedDict()  # type: OrderedDict
+        self._results_nbytes = 0
+        self._consumers = Counter(
+            (dep['source'], dep['source_output'])
+            for dep in self.sos_model.get('model_dependencies', []))
+
+    def read_results(self, model_name, output_spec, timestep=None, decision_iteration=None,
+                     consume=False):
+        """Read results of a `model_name` in this model run
 
         Parameters
         ----------
-        store : Store
-            Backing store for inputs, parameters, results
-        modelrun_name : str
-            Name of the current modelrun
-        current_timestep : str
-        timesteps : list
-        model : Model
-            Model which will use this DataHandle
-        decision_iteration : int, default=None
-            ID of the current Decision iteration
+        model_name : str
+        output_spec : smif.metadata.Spec
+        timestep : int, optional
+        decision_iteration : int, optional
+        consume : bool, default=False
+            Whether the results are read to satisfy a model dependency, so count towards
+            dropping them from memory
+
+        Returns
+        -------
+        ~smif.data_layer.data_array.DataArray
         """
-        self.logger = getLogger(__name__)
-        self._store = store
-        self._modelrun_name = modelrun_name
-        self._current_timestep = current_timestep
-        self._timesteps = timesteps
-        self._decision_iteration = decision_iteration
+        key = (model_name, output_spec.name, timestep, decision_iteration)
+        if key in self._results:
+            data, remaining = self._results[key]
+            if consume:
+                remaining -= 1
+            if remaining > 0:
+                self._results[key] = (data, remaining)
+                self._results.move_to_end(key)
+                return DataArray(output_spec, data.copy())
+            # last read, so hand over the cached array
+            self._drop_results(key)
+            data.flags.writeable = True
+            return DataArray(output_spec, data)
+
+        return self._results_writer.read_results(
+            self.modelrun_name, model_name, output_spec, timestep, decision_iteration)
+
+    def _cache_results(self, data_array, model_name, timestep, decision_iteration):
+        key = (model_name, data_array.name, timestep, decision_iteration)
+        if key in self._results:
+            self._drop_results(key)
+
+        consumers = self._consumers[(model_name, data_array.name)]
+        nbytes = data_array.data.nbytes
+        if not consumers or nbytes > self.results_cache_size:
+            return
+
+        while self._results and self._results_nbytes + nbytes > self.results_cache_size:
+            self._drop_results(next(iter(self._results)))
+
+        data = np.array(data_array.data, copy=True)
+        data.flags.writeable = False
+        self._results[key] = (data, consumers)
+        self._results_nbytes += nbytes
+
+    def _drop_results(self, key):
+        data, _ = self._results.pop(key)
+        self._results_nbytes -= data.nbytes
+
+    def write_results(self, data_arrays, model_name, timestep=None, decision_iteration=None):
+        """Write results of a `model_name` in this model run
 
-        self._model_name = model.name
-        self._inputs = model.inputs
-        self._outputs = model.outputs
-        self._model = model
+        Parameters
+        ----------
+        data_arrays : list[~smif.data_layer.data_array.DataArray]
+        model_name : str
+        timestep : int, optional
+        decision_iteration : int, optional
+        """
+        if isinstance(self._results_writer, ResultsBuffer):
+            for data_array in data_arrays:
+                self._results_writer.write_results(
+                    data_array, self.modelrun_name, model_name, timestep, decision_iteration)
+        else:
+            self._store.write_results_many(
+                data_arrays, self.modelrun_name, model_name, timestep, decision_iteration)
 
-        modelrun = self._store.read_model_run(self._modelrun_name)
-        sos_model = self._store.read_sos_model(modelrun['sos_model'])
+        for data_array in data_arrays:
+            self._cache_results(data_array, model_name, timestep, decision_iteration)
 
-        self._scenario_dependencies = {}  # type: Dict[str, Dict]
-        self._model_dependencies = {}  # type: Dict[str, Dict]
-        scenario_variants = modelrun['scenarios']
-        self._load_dependencies(sos_model, scenario_variants)
-        self.logger.debug(
-            "Create with %s model, %s scenario dependencies",
-            len(self._scenario_dependencies),
-            len(self._model_dependencies))
+    def flush_results(self):
+        """Wait for any results written in the background to be written to the store
 
-        self._parameters = {}  # type: Dict[str, DataArray]
-        self._load_parameters(sos_model, modelrun['narratives'])
+        Raises
+        ------
+        SmifDataError
+            If any results could not be written
+        """
+        if isinstance(self._results_writer, ResultsBuffer):
+            self._results_writer.flush()
+
+    def read_coefficients(self, source_dim, destination_dim, key=None):
+        """Read conversion coefficients, from memory if recently used, otherwise from the
+        store
 
-    def _load_dependencies(self, sos_model, scenario_variants):
-        """Load Model dependencies as a dict with {input_name: list[Dependency]}
+        Parameters
+        ----------
+        source_dim : str
+        destination_dim : str
+        key : str, optional
+
+        Returns
+        -------
+        numpy.ndarray or scipy.sparse.csr_matrix
+        """
+        cache_key = (source_dim, destination_dim, key)
+        if cache_key in self._coefficients:
+            self._coefficients.move_to_end(cache_key)
+            return self._coefficients[cache_key]
+        data = self._store.read_coefficients(source_dim, destination_dim, key)
+        self._cache_coefficients(cache_key, data)
+        return data
+
+    def write_coefficients(self, source_dim, destination_dim, data, key=None):
+        """Write conversion coefficients to the store, and keep them in memory
+
+        Parameters
+        ----------
+        source_dim : str
+        destination_dim : str
+        data : numpy.ndarray or scipy.sparse.spmatrix
+        key : str, optional
         """
-        for dep in sos_model['model_dependencies']:
-            if dep['sink'] == self._model_name:
+        self._store.write_coefficients(source_dim, destination_dim, data, key)
+        self._cache_coefficients((source_dim, destination_dim, key), data)
+
+    def _cache_coefficients(self, cache_key, data):
+        self._coefficients[cache_key] = data
+        self._coefficients.move_to_end(cache_key)
+        while len(self._coefficients) > self.coefficient_cache_size:
+            self._coefficients.popitem(last=False)
+
+    def get_dependencies(self, model_name):
+        """Get the dependencies of a model
+
+        Parameters
+        ----------
+        model_name : str
+
+        Returns
+        -------
+        tuple
+            (scenario_dependencies, model_dependencies), each a dict of
+            {input_name: dependency}
+        """
+        if model_name not in self._dependencies:
+            self._dependencies[model_name] = self._load_dependencies(model_name)
+        return self._dependencies[model_name]
+
+    def get_parameters(self, model):
+        """Get the parameter values of a model, with narrative variants applied
+
+        Parameters
+        ----------
+        model : Model
+
+        Returns
+        -------
+        dict
+            Parameter values as {parameter_name: DataArray}
+        """
+        if model.name not in self._parameters:
+            parameters = self._load_parameters(model)
+            for parameter in parameters.values():
+                parameter.data.flags.writeable = False
+            self._parameters[model.name] = parameters
+        return self._parameters[model.name]
+
+    def _load_dependencies(self, model_name):
+        """Load Model dependencies as dicts with {input_name: dependency}
+        """
+        model_dependencies = {}  # type: Dict[str, Dict]
+        for dep in self.sos_model['model_dependencies']:
+            if dep['sink'] == model_name:
                 input_name = dep['sink_input']
-                self._model_dependencies[input_name] = {
+                model_dependencies[input_name] = {
                     'source_model_name': dep['source'],
                     'source_output_name': dep['source_output'],
                     'type': 'model'
                 }
 
-        for dep in sos_model['scenario_dependencies']:
-            if dep['sink'] == self._model_name:
+        scenario_dependencies = {}  # type: Dict[str, Dict]
+        scenario_variants = self.modelrun['scenarios']
+        for dep in self.sos_model['scenario_dependencies']:
+            if dep['sink'] == model_name:
                 input_name = dep['sink_input']
-                self._scenario_dependencies[input_name] = {
+                scenario_dependencies[input_name] = {
                     'source_model_name': dep['source'],
                     'source_output_name': dep['source_output'],
                     'type': 'scenario',
                     'variant': scenario_variants[dep['source']]
                 }
 
-    def _load_parameters(self, sos_model, concrete_narratives):
-        """Load parameter values for model run
+        self.logger.debug(
+            "Loaded %s model, %s scenario dependencies for %s",
+            len(model_dependencies),
+            len(scenario_dependencies),
+            model_name)
+        return scenario_dependencies, model_dependencies
 
-        Parameters for each of the contained sector models are loaded
-        into memory as a data_handle is initialised.
+    def _load_parameters(self, model):
+        """Load parameter values for model run
 
         Firstly, default values for the parameters are loaded from the parameter
-        specs contained within each of the sector models
+        specs contained within the sector model
 
         Then, the data from the list of narrative variants linked to the current
-        model run are loaded into the parameters contained within the
-
-        Arguments
-        ---------
-        sos_model : dict
-            A configuration dictionary of a system-of-systems model
-        concrete_narratives: dict of list
-            Links narrative names to a list of variants to furnish parameters
-            with values {narrative_name: [variant_name, ...]}
+        model run are loaded into the parameters contained within the model
         """
-        # Populate the parameters with their default values
-        for parameter in self._model.parameters.values():
-            self._parameters[parameter.name] = \
-                self._store.read_model_parameter_default(self._model.name, parameter.name)
+        sos_model = self.sos_model
+        parameters = {}  # type: Dict[str, DataArray]
+
+        # Populate the parameters with copies of their default values, so that applying
+        # variants leaves the data held by the store unchanged
+        for parameter in model.parameters.values():
+            default = self._store.read_model_parameter_default(model.name, parameter.name)
+            parameters[parameter.name] = DataArray(default.spec, np.array(default.data))
 
         # Load in the concrete narrative and selected variants from the model run
-        for narrative_name, variant_names in concrete_narratives.items():
+        variant_data = defaultdict(list)  # type: Dict[str, List[DataArray]]
+        for narrative_name, variant_names in self.modelrun['narratives'].items():
             # Load the narrative
             try:
                 narrative = [x for x in sos_model['narratives']
@@ -126,11 +324,10 @@ class DataHandle(object):
             self.logger.debug("Loaded narrative: %s", narrative)
             self.logger.debug("Considering variants: %s", variant_names)
 
-            # Read parameter data from each variant, later variants overriding
-            # previous parameter values
+            # Read parameter data from each variant
             for variant_name in variant_names:
                 try:
-                    parameter_list = narrative['provides'][self._model.name]
+                    parameter_list = narrative['provides'][model.name]
                 except KeyError:
                     parameter_list = []
 
@@ -139,7 +336,61 @@ class DataHandle(object):
                         sos_model['name'],
                         narrative_name, variant_name, parameter
                     )
-                    self._parameters[parameter].update(da)
+                    variant_data[parameter].append(da)
+
+        # Apply all variants to each parameter at once, later variants overriding previous
+        # parameter values
+        for parameter, data_arrays in variant_data.items():
+            parameters[parameter].update_many(data_arrays)
+
+        return parameters
+
+
+class DataHandle(object):
+    """Get/set model parameters and data
+    """
+    def __init__(self, store: Store, modelrun_name, current_timestep, timesteps, model,
+                 decision_iteration=None, context=None):
+        """Create a DataHandle for a Model to access data, parameters and state, and to
+        communicate results.
+
+        Parameters
+        ----------
+        store : Store
+            Backing store for inputs, parameters, results
+        modelrun_name : str
+            Name of the current modelrun
+        current_timestep : str
+        timesteps : list
+        model : Model
+            Model which will use this DataHandle
+        decision_iteration : int, default=None
+            ID of the current Decision iteration
+        context : RunContext, default=None
+            Configuration and parameters for the current modelrun, shared between
+            DataHandles. If not provided, a new RunContext is read from the store.
+        """
+        self.logger = getLogger(__name__)
+        self._store = store
+        self._modelrun_name = modelrun_name
+        self._current_timestep = current_timestep
+        self._timesteps = timesteps
+        self._decision_iteration = decision_iteration
+
+        self._model_name = model.name
+        self._inputs = model.inputs
+        self._outputs = model.outputs
+        self._model = model
+
+        if context is None:
+            context = RunContext(store, modelrun_name)
+        self._context = context
+
+        self._scenario_dependencies, self._model_dependencies = \
+            context.get_dependencies(self._model_name)
+        self._shared_parameters = context.get_parameters(model)  # type: Dict[str, DataArray]
+        # writeable copies of shared parameters, made on first request
+        self._parameters = {}  # type: Dict[str, DataArray]
 
     def derive_for(self, model):
         """Derive a new DataHandle configured for the given Model
@@ -155,11 +406,12 @@ class DataHandle(object):
             current_timestep=self._current_timestep,
             timesteps=list(self.timesteps),
             model=model,
-            decision_iteration=self._decision_iteration
+            decision_iteration=self._decision_iteration,
+            context=self._context
         )
 
     def __getitem__(self, key):
-        if key in self._parameters:
+        if key in self._shared_parameters:
             return self.get_parameter(key)
         elif key in self._inputs:
             return self.get_data(key)
@@ -344,12 +596,12 @@ class DataHandle(object):
         self.logger.debug("Getting model result for %s via %s from %s",
                           input_spec, dep, output_spec)
         try:
-            data = self._store.read_results(
-                self._modelrun_name,
+            data = self._context.read_results(
                 dep['source_model_name'],  # read from source model
                 output_spec,  # using source model output spec
                 timestep,
-                self._decision_iteration
+                self._decision_iteration,
+                consume=True
             )
             data.name = input_spec.name  # ensure name matches input (as caller expects)
         except SmifDataError as ex:
@@ -470,11 +722,14 @@ class DataHandle(object):
             Contains data annotated with the metadata and provides utility methods
             to access the data in different ways
         """
-        if parameter_name not in self._parameters:
+        if parameter_name not in self._shared_parameters:
             raise KeyError(
                 "'{}' not recognised as parameter for '{}'".format(
                     parameter_name, self._model_name))
 
+        if parameter_name not in self._parameters:
+            shared = self._shared_parameters[parameter_name]
+            self._parameters[parameter_name] = DataArray(shared.spec, shared.data.copy())
         return self._parameters[parameter_name]
 
     def get_parameters(self):
@@ -485,6 +740,8 @@ class DataHandle(object):
         parameters : MappingProxyType
             Read-only view of parameters (like a read-only dict)
         """
+        for parameter_name in self._shared_parameters:
+            self.get_parameter(parameter_name)
         return MappingProxyType(self._parameters)
 
     def set_results(self, output_name, data):
@@ -495,23 +752,33 @@ class DataHandle(object):
         output_name : str
         data : numpy.ndarray
         """
-        if hasattr(data, 'as_ndarray'):
-            raise TypeError("Pass in a numpy array")
+        self.set_results_many({output_name: data})
 
-        if output_name not in self._outputs:
-            raise KeyError(
-                "'{}' not recognised as output for '{}'".format(output_name, self._model_name))
+    def set_results_many(self, results):
+        """Set results values for several model outputs at once
 
-        self.logger.debug(
-            "Write %s %s %s", self._model_name, output_name, self._current_timestep)
+        Parameters
+        ----------
+        results : dict
+            Output name => numpy.ndarray
+        """
+        data_arrays = []
+        for output_name, data in results.items():
+            if hasattr(data, 'as_ndarray'):
+                raise TypeError("Pass in a numpy array")
 
-        spec = self._outputs[output_name]
+            if output_name not in self._outputs:
+                raise KeyError(
+                    "'{}' not recognised as output for '{}'".format(
+                        output_name, self._model_name))
 
-        da = DataArray(spec, data)
+            data_arrays.append(DataArray(self._outputs[output_name], data))
 
-        self._store.write_results(
-            da,
-            self._modelrun_name,
+        self.logger.debug(
+            "Write %s %s %s", self._model_name, list(results), self._current_timestep)
+
+        self._context.write_results(
+            data_arrays,
             self._model_name,
             self._current_timestep,
             self._decision_iteration
@@ -562,8 +829,7 @@ class DataHandle(object):
         self.logger.debug(
             "Read %s %s %s", model_name, output_name, timestep)
 
-        return self._store.read_results(
-            self._modelrun_name,
+        return self._context.read_results(
             model_name,
             spec,
             timestep,
@@ -579,12 +845,27 @@ class DataHandle(object):
         """
         return self._store.read_unit_definitions()
 
-    def read_coefficients(self, source_dim: str, destination_dim: str) -> np.ndarray:
+    def read_dimension_geometries(self, dimension_name: str):
+        """Read the geometries of a spatial dimension, if already parsed by the store
+
+        Parameters
+        ----------
+        dimension_name : str
+
+        Returns
+        -------
+        dict or None
+            (WKB bytes, (minx, miny, maxx, maxy) bounds) by element name
+        """
+        return self._store.read_dimension_geometries(dimension_name)
+
+    def read_coefficients(self, source_dim: str, destination_dim: str, key=None):
         """Reads coefficients from the store
 
-        Coefficients are uniquely identified by their source/destination dimensions.
-        This method and `write_coefficients` implement caching of conversion
-        coefficients between dimensions.
+        Coefficients are uniquely identified by their source/destination dimensions and
+        key. This method and `write_coefficients` implement caching of conversion
+        coefficients between dimensions. Recently used coefficients are kept in memory,
+        shared by all DataHandles in the model run.
 
         Parameters
         ----------
@@ -592,19 +873,21 @@ class DataHandle(object):
             Dimension name
         destination_dim: str
             Dimension name
+        key: str, optional
+            Identifies the content of the dimensions, so that coefficients written for
+            different dimension elements are not returned
 
         Returns
         -------
-        numpy.ndarray
+        numpy.ndarray or scipy.sparse.csr_matrix
         """
-        data = self._store.read_coefficients(source_dim, destination_dim)
-        return data
+        return self._context.read_coefficients(source_dim, destination_dim, key)
 
-    def write_coefficients(self, source_dim: str, destination_dim: str, data: np.ndarray):
+    def write_coefficients(self, source_dim: str, destination_dim: str, data, key=None):
         """Writes coefficients to the store
 
-        Coefficients are uniquely identified by their source/destination dimensions.
-        This method and `read_coefficients` implement caching of conversion
+        Coefficients are uniquely identified by their source/destination dimensions and
+        key. This method and `read_coefficients` implement caching of conversion
         coefficients between dimensions.
 
         Parameters
@@ -613,10 +896,11 @@ class DataHandle(object):
             Dimension name
         destination_dim: str
             Dimension name
-        data : numpy.ndarray
+        data : numpy.ndarray or scipy.sparse.spmatrix
+        key: str, optional
+            Identifies the content of the dimensions
         """
-        data = self._store.write_coefficients(source_dim, destination_dim, data)
-        return data
+        self._context.write_coefficients(source_dim, destination_dim, data, key)
 
 
 class ResultsHandle(object):
@@ -1271,10 +1271,10 @@ class DbDataStore(DataStore):
     # endregion
 
     # region Conversion coefficients
-    def read_coefficients(self, source_dim, destination_dim):
+    def read_coefficients(self, source_dim, destination_dim, key=None):
         raise NotImplementedError
 
-    def write_coefficients(self, source_dim, destination_dim, data):
+    def write_coefficients(self, source_dim, destination_dim, data, key=None):
         raise NotImplementedError()
     # endregion
 
@@ -0,0 +1,117 @@
+"""In-memory cache of parsed YAML configuration files
+"""
+import hashlib
+import os
+import pickle
+import time
+from collections import namedtuple
+from threading import Lock
+
+from ruamel.yaml import YAML  # type: ignore
+from smif.data_layer.file.config_snapshot import (RACY_INTERVAL, _hash_file,
+                                                  _to_plain)
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'currsize'])
+
+
+class ConfigCache(object):
+    """Parsed YAML configuration files, kept until the files change
+
+    A cached file is read again if its size or modification time has changed, or if it was
+    last modified too recently for its modification time to show every change and its
+    contents have changed. Writers should call :meth:`invalidate` after writing a file.
+
+    Data are kept pickled, so every read returns a new copy which callers may change
+    freely.
+
+    Parameters
+    ----------
+    snapshot : ~smif.data_layer.file.config_snapshot.ConfigSnapshot, optional
+        Read files from the snapshot where they have not changed since it was compiled,
+        instead of parsing them
+    """
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # type: dict
+        self._lock = Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_entries'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def read(self, path):
+        """Read a YAML file into plain data (lists, dicts and simple values)
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        Plain data, a new copy on every read
+        """
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and self._is_current(path, stat, entry):
+            with self._lock:
+                self.hits += 1
+            return pickle.loads(entry[4])
+
+        with open(path, 'rb') as file_handle:
+            contents = file_handle.read()
+        data = self._load(path, contents)
+        racy = stat.st_mtime_ns > int(time.time() * 1e9) - RACY_INTERVAL
+        digest = hashlib.sha1(contents).hexdigest()
+        pickled = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = (stat.st_mtime_ns, stat.st_size, racy, digest, pickled)
+        return pickle.loads(pickled)
+
+    def invalidate(self, path=None):
+        """Drop a file, or all files, from the cache
+
+        Parameters
+        ----------
+        path : str, optional
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def info(self):
+        """Report cache use
+
+        Returns
+        -------
+        CacheInfo
+            Named tuple of (hits, misses, currsize)
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, len(self._entries))
+
+    @staticmethod
+    def _is_current(path, stat, entry):
+        mtime_ns, size, racy, digest, _ = entry
+        if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+            return False
+        return not racy or _hash_file(path) == digest
+
+    def _load(self, path, contents):
+        if self.snapshot is not None:
+            try:
+                return self.snapshot.read(path)
+            except KeyError:
+                pass
+        return _to_plain(YAML().load(contents))
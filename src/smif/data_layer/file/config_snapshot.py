@@ -0,0 +1,167 @@
+"""Snapshot of the YAML configuration of a project
+
+``smif compile`` parses every YAML configuration file of a project into a single
+:class:`ConfigSnapshot`, which the file stores then read instead of parsing each YAML file
+again. Each file in the snapshot is checked against its size, modification time and, if
+either has changed, a hash of its contents, so files edited since the snapshot was compiled
+are always read from YAML.
+"""
+import hashlib
+import os
+import pickle
+import time
+from logging import getLogger
+
+from ruamel.yaml import YAML  # type: ignore
+
+SNAPSHOT_FILENAME = 'config.snapshot'
+SNAPSHOT_VERSION = 1
+
+# Files modified this close to compiling (in nanoseconds) may change again without any
+# change to their modification time, so are always checked against their hash
+RACY_INTERVAL = 2 * 10**9
+
+
+class ConfigSnapshot(object):
+    """Parsed YAML configuration files, kept in a single binary file
+
+    The snapshot is loaded when first read. Each file is stored pickled, so every read
+    returns a new copy of its data.
+
+    Parameters
+    ----------
+    base_folder : str
+        The project folder, containing ``project.yml`` and the ``config`` folder
+    """
+    def __init__(self, base_folder):
+        self.logger = getLogger(__name__)
+        self.base_folder = str(base_folder)
+        self.path = os.path.join(self.base_folder, SNAPSHOT_FILENAME)
+        self._files = None
+
+    def __getstate__(self):
+        # reload rather than send the snapshot along with the store
+        state = self.__dict__.copy()
+        del state['logger']
+        state['_files'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = getLogger(__name__)
+
+    def read(self, path):
+        """Read the data of a YAML file, as parsed when the snapshot was compiled
+
+        Parameters
+        ----------
+        path : str
+            Path to the YAML file
+
+        Returns
+        -------
+        Plain data (lists, dicts and simple values)
+
+        Raises
+        ------
+        KeyError
+            If the file is not in the snapshot, or has changed since it was compiled
+        """
+        key = self._key(path)
+        mtime_ns, size, digest, racy, data = self._load()[key]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise KeyError(key)
+        if racy or (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+            if stat.st_size != size or _hash_file(path) != digest:
+                raise KeyError(key)
+        return pickle.loads(data)
+
+    def compile(self):
+        """Parse all YAML configuration files and write the snapshot
+
+        Returns
+        -------
+        int
+            Number of files in the snapshot
+        """
+        started_ns = int(time.time() * 1e9)
+        files = {}
+        for path in self._find_files():
+            stat = os.stat(path)
+            with open(path, 'rb') as file_handle:
+                contents = file_handle.read()
+            data = _to_plain(YAML().load(contents))
+            files[self._key(path)] = (
+                stat.st_mtime_ns,
+                stat.st_size,
+                hashlib.sha1(contents).hexdigest(),
+                stat.st_mtime_ns > started_ns - RACY_INTERVAL,
+                pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as file_handle:
+            pickle.dump({'version': SNAPSHOT_VERSION, 'files': files}, file_handle,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        self._files = files
+        return len(files)
+
+    def _find_files(self):
+        paths = []
+        project_path = os.path.join(self.base_folder, 'project.yml')
+        if os.path.isfile(project_path):
+            paths.append(project_path)
+        for dirpath, _, filenames in os.walk(os.path.join(self.base_folder, 'config')):
+            paths.extend(
+                os.path.join(dirpath, filename)
+                for filename in sorted(filenames)
+                if filename.endswith('.yml'))
+        return paths
+
+    def _key(self, path):
+        return os.path.relpath(path, self.base_folder).replace(os.sep, '/')
+
+    def _load(self):
+        if self._files is None:
+            self._files = {}
+            try:
+                with open(self.path, 'rb') as file_handle:
+                    snapshot = pickle.load(file_handle)
+            except FileNotFoundError:
+                return self._files
+            except Exception as ex:
+                self.logger.warning("Could not read config snapshot %s: %s", self.path, ex)
+                return self._files
+            if snapshot.get('version') == SNAPSHOT_VERSION:
+                self._files = snapshot['files']
+            else:
+                self.logger.warning(
+                    "Ignoring config snapshot %s from another version of smif, run "
+                    "`smif compile` to replace it", self.path)
+        return self._files
+
+
+def _hash_file(path):
+    with open(path, 'rb') as file_handle:
+        return hashlib.sha1(file_handle.read()).hexdigest()
+
+
+def _to_plain(data):
+    """Convert parsed YAML to plain python lists, dicts and simple values
+    """
+    if isinstance(data, dict):
+        return {key: _to_plain(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_to_plain(value) for value in data]
+    if isinstance(data, bool):
+        return bool(data)
+    if isinstance(data, int):
+        return int(data)
+    if isinstance(data, float):
+        return float(data)
+    if isinstance(data, str):
+        return str(data)
+    return data
@@ -6,6 +6,8 @@ from logging import getLogger
 
 from ruamel.yaml import YAML  # type: ignore
 from smif.data_layer.abstract_config_store import ConfigStore
+from smif.data_layer.file.config_cache import ConfigCache
+from smif.data_layer.file.config_snapshot import ConfigSnapshot
 from smif.data_layer.validate import (validate_sos_model_config,
                                       validate_sos_model_format)
 from smif.exception import (SmifDataExistsError, SmifDataMismatchError,
@@ -45,6 +47,10 @@ class YamlConfigStore(ConfigStore):
 
             self.config_folders[folder] = dirname
 
+        # cache parsed config files (invalidate on write or change), reading files compiled
+        # by `smif compile` from the snapshot, if unchanged
+        self._cache = ConfigCache(ConfigSnapshot(self.base_folder))
+
         # cache results of reading project_config (invalidate on write)
         self._project_config_cache_invalid = True
         # MUST ONLY access through self.read_project_config()
@@ -57,6 +63,16 @@ class YamlConfigStore(ConfigStore):
             # write empty config if none found
             self._write_project_config({})
 
+    def cache_info(self):
+        """Report use of the cache of parsed config files
+
+        Returns
+        -------
+        ~smif.data_layer.file.config_cache.CacheInfo
+            Named tuple of (hits, misses, currsize)
+        """
+        return self._cache.info()
+
     def read_project_config(self):
         """Read the project configuration
 
@@ -67,7 +83,8 @@ class YamlConfigStore(ConfigStore):
         """
         if self._project_config_cache_invalid:
 
-            self._project_config_cache = _read_yaml_file(self.base_folder, 'project')
+            self._project_config_cache = _read_yaml_file(
+                self.base_folder, 'project', self._cache)
             self._project_config_cache_invalid = False
         return copy.deepcopy(self._project_config_cache)
 
@@ -81,7 +98,7 @@ class YamlConfigStore(ConfigStore):
         """
         self._project_config_cache_invalid = True
         self._project_config_cache = None
-        _write_yaml_file(self.base_folder, 'project', data)
+        _write_yaml_file(self.base_folder, 'project', data, self._cache)
 
     def _read_config(self, config_type, config_name):
         """Read config item - used by decorators for existence/consistency checks
@@ -105,16 +122,19 @@ class YamlConfigStore(ConfigStore):
         return modelrun_config
 
     def _read_model_run(self, model_run_name):
-        return _read_yaml_file(self.config_folders['model_runs'], model_run_name)
+        return _read_yaml_file(
+            self.config_folders['model_runs'], model_run_name, self._cache)
 
     def _overwrite_model_run(self, model_run_name, model_run):
-        _write_yaml_file(self.config_folders['model_runs'], model_run_name, model_run)
+        _write_yaml_file(
+            self.config_folders['model_runs'], model_run_name, model_run, self._cache)
 
     def write_model_run(self, model_run):
         _assert_file_not_exists(self.config_folders, 'model_run', model_run['name'])
         config = copy.copy(model_run)
         config['strategies'] = []
-        _write_yaml_file(self.config_folders['model_runs'], config['name'], config)
+        _write_yaml_file(
+            self.config_folders['model_runs'], config['name'], config, self._cache)
 
     def update_model_run(self, model_run_name, model_run):
         if model_run['name'] != model_run_name:
@@ -128,7 +148,9 @@ class YamlConfigStore(ConfigStore):
 
     def delete_model_run(self, model_run_name):
         _assert_file_exists(self.config_folders, 'model_run', model_run_name)
-        os.remove(os.path.join(self.config_folders['model_runs'], model_run_name + '.yml'))
+        path = os.path.join(self.config_folders['model_runs'], model_run_name + '.yml')
+        os.remove(path)
+        self._cache.invalidate(path)
     # endregion
 
     # region System-of-system models
@@ -140,14 +162,16 @@ class YamlConfigStore(ConfigStore):
     def read_sos_model(self, sos_model_name):
         _assert_file_exists(self.config_folders, 'sos_model', sos_model_name)
 
-        data = _read_yaml_file(self.config_folders['sos_models'], sos_model_name)
+        data = _read_yaml_file(
+            self.config_folders['sos_models'], sos_model_name, self._cache)
         if self.validation:
             validate_sos_model_format(data)
         return data
 
     def write_sos_model(self, sos_model):
         _assert_file_not_exists(self.config_folders, 'sos_model', sos_model['name'])
-        _write_yaml_file(self.config_folders['sos_models'], sos_model['name'], sos_model)
+        _write_yaml_file(
+            self.config_folders['sos_models'], sos_model['name'], sos_model, self._cache)
 
     def update_sos_model(self, sos_model_name, sos_model):
         if sos_model['name'] != sos_model_name:
@@ -160,11 +184,14 @@ class YamlConfigStore(ConfigStore):
                 self.read_models(),
                 self.read_scenarios(),
             )
-        _write_yaml_file(self.config_folders['sos_models'], sos_model['name'], sos_model)
+        _write_yaml_file(
+            self.config_folders['sos_models'], sos_model['name'], sos_model, self._cache)
 
     def delete_sos_model(self, sos_model_name):
         _assert_file_exists(self.config_folders, 'sos_model', sos_model_name)
-        os.remove(os.path.join(self.config_folders['sos_models'], sos_model_name + '.yml'))
+        path = os.path.join(self.config_folders['sos_models'], sos_model_name + '.yml')
+        os.remove(path)
+        self._cache.invalidate(path)
     # endregion
 
     # region Models
@@ -176,7 +203,8 @@ class YamlConfigStore(ConfigStore):
     def read_model(self, model_name):
         _assert_file_exists(self.config_folders, 'sector_model', model_name)
 
-        model = _read_yaml_file(self.config_folders['sector_models'], model_name)
+        model = _read_yaml_file(
+            self.config_folders['sector_models'], model_name, self._cache)
         return model
 
     def write_model(self, model):
@@ -187,7 +215,8 @@ class YamlConfigStore(ConfigStore):
             model['interventions'] = []
 
         model = _skip_coords(model, ('inputs', 'outputs', 'parameters'))
-        _write_yaml_file(self.config_folders['sector_models'], model['name'], model)
+        _write_yaml_file(
+            self.config_folders['sector_models'], model['name'], model, self._cache)
 
     def update_model(self, model_name, model):
         if model['name'] != model_name:
@@ -199,7 +228,8 @@ class YamlConfigStore(ConfigStore):
         # ignore interventions and initial conditions which the app doesn't handle
         if model['interventions'] or model['initial_conditions']:
 
-            old_model = _read_yaml_file(self.config_folders['sector_models'], model['name'])
+            old_model = _read_yaml_file(
+                self.config_folders['sector_models'], model['name'], self._cache)
 
         if model['interventions']:
             self.logger.warning("Ignoring interventions write")
@@ -211,12 +241,14 @@ class YamlConfigStore(ConfigStore):
 
         model = _skip_coords(model, ('inputs', 'outputs', 'parameters'))
 
-        _write_yaml_file(self.config_folders['sector_models'], model['name'], model)
+        _write_yaml_file(
+            self.config_folders['sector_models'], model['name'], model, self._cache)
 
     def delete_model(self, model_name):
         _assert_file_exists(self.config_folders, 'sector_model', model_name)
-        os.remove(
-            os.path.join(self.config_folders['sector_models'], model_name + '.yml'))
+        path = os.path.join(self.config_folders['sector_models'], model_name + '.yml')
+        os.remove(path)
+        self._cache.invalidate(path)
     # endregion
 
     # region Scenarios
@@ -227,23 +259,27 @@ class YamlConfigStore(ConfigStore):
     def read_scenario(self, scenario_name):
         _assert_file_exists(self.config_folders, 'scenario', scenario_name)
 
-        scenario = _read_yaml_file(self.config_folders['scenarios'], scenario_name)
+        scenario = _read_yaml_file(
+            self.config_folders['scenarios'], scenario_name, self._cache)
         return scenario
 
     def write_scenario(self, scenario):
         _assert_file_not_exists(self.config_folders, 'scenario', scenario['name'])
         scenario = _skip_coords(scenario, ['provides'])
-        _write_yaml_file(self.config_folders['scenarios'], scenario['name'], scenario)
+        _write_yaml_file(
+            self.config_folders['scenarios'], scenario['name'], scenario, self._cache)
 
     def update_scenario(self, scenario_name, scenario):
         _assert_file_exists(self.config_folders, 'scenario', scenario_name)
         scenario = _skip_coords(scenario, ['provides'])
-        _write_yaml_file(self.config_folders['scenarios'], scenario['name'], scenario)
+        _write_yaml_file(
+            self.config_folders['scenarios'], scenario['name'], scenario, self._cache)
 
     def delete_scenario(self, scenario_name):
         _assert_file_exists(self.config_folders, 'scenario', scenario_name)
-        os.remove(
-            os.path.join(self.config_folders['scenarios'], "{}.yml".format(scenario_name)))
+        path = os.path.join(self.config_folders['scenarios'], "{}.yml".format(scenario_name))
+        os.remove(path)
+        self._cache.invalidate(path)
     # endregion
 
     # region Scenario Variants
@@ -295,20 +331,24 @@ class YamlConfigStore(ConfigStore):
     # endregion
 
 
-def _read_yaml_file(directory, name):
+def _read_yaml_file(directory, name, cache=None):
     """Read yaml config file into plain data (lists, dicts and simple values)
 
     Parameters
     ----------
     directory : str
     name : str
+    cache : ~smif.data_layer.file.config_cache.ConfigCache, optional
+        Read through the cache
     """
     path = os.path.join(directory, "{}.yml".format(name))
+    if cache is not None:
+        return cache.read(path)
     with open(path, 'r') as file_handle:
         return YAML().load(file_handle)
 
 
-def _write_yaml_file(directory, name, data):
+def _write_yaml_file(directory, name, data, cache=None):
     """Write plain data to a file as yaml
 
     Arguments
@@ -319,13 +359,19 @@ def _write_yaml_file(directory, name, data):
         Name of config item (filename without .yml extension)
     data
         Data to be written to the file
+    cache: ~smif.data_layer.file.config_cache.ConfigCache, optional
+        Cache to invalidate
     """
     path = os.path.join(directory, "{}.yml".format(name))
-    with open(path, 'w') as file_handle:
-        yaml = YAML()
-        yaml.default_flow_style = False
-        yaml.allow_unicode = True
-        return yaml.dump(data, file_handle)
+    try:
+        with open(path, 'w') as file_handle:
+            yaml = YAML()
+            yaml.default_flow_style = False
+            yaml.allow_unicode = True
+            return yaml.dump(data, file_handle)
+    finally:
+        if cache is not None:
+            cache.invalidate(path)
 
 
 def _assert_file_exists(file_dir, dtype, name):
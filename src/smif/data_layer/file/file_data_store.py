@@ -2,14 +2,19 @@
 """
 import glob
 import os
+import shutil
 from abc import abstractmethod
+from collections import OrderedDict
 from logging import getLogger
 
 import numpy as np  # type: ignore
 import pandas  # type: ignore
 import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+from scipy import sparse  # type: ignore
 from smif.data_layer.abstract_data_store import DataStore
 from smif.data_layer.data_array import DataArray
+from smif.data_layer.file.results_catalogue import ResultsCatalogue
 from smif.exception import SmifDataMismatchError, SmifDataNotFoundError
 
 
@@ -23,11 +28,15 @@ class FileDataStore(DataStore):
         self.ext = ''
         # extension for bare numpy.ndarray data - override in implementations
         self.coef_ext = ''
+        # extension for state data - override in implementations
+        self.state_ext = ''
 
         self.base_folder = str(base_folder)
         self.data_folder = str(os.path.join(self.base_folder, 'data'))
         self.data_folders = {}
         self.results_folder = str(os.path.join(self.base_folder, 'results'))
+        # results catalogues by model run name, each holding a database connection
+        self._catalogues = {}  # type: dict
         data_folders = [
             'coefficients',
             'strategies',
@@ -183,10 +192,13 @@ class FileDataStore(DataStore):
         os.makedirs(os.path.dirname(path), exist_ok=True)
         self._write_list_of_dicts(path, state)
 
-    def _get_state_path(self, modelrun_name, timestep=None, decision_iteration=None):
+    def _get_state_path(self, modelrun_name, timestep=None, decision_iteration=None,
+                        ext=None):
         """Compose a unique filename for state file:
                 state_{timestep|0000}[_decision_{iteration}].{ext}
         """
+        if ext is None:
+            ext = self.state_ext
         if timestep is None:
             timestep = '0000'
 
@@ -196,15 +208,19 @@ class FileDataStore(DataStore):
         else:
             separator = '_decision_'
 
-        filename = 'state_{}{}{}.{}'.format(timestep, separator, decision_iteration, self.ext)
+        filename = 'state_{}{}{}.{}'.format(timestep, separator, decision_iteration, ext)
         path = os.path.join(self.results_folder, modelrun_name, filename)
 
         return path
     # endregion
 
     # region Conversion coefficients
-    def read_coefficients(self, source_dim, destination_dim):
-        results_path = self._get_coefficients_path(source_dim, destination_dim)
+    def read_coefficients(self, source_dim, destination_dim, key=None):
+        sparse_path = self._get_coefficients_path(source_dim, destination_dim, 'npz', key)
+        if os.path.exists(sparse_path):
+            return sparse.load_npz(sparse_path).tocsr()
+
+        results_path = self._get_coefficients_path(source_dim, destination_dim, key=key)
         try:
             return self._read_ndarray(results_path)
         except FileNotFoundError:
@@ -212,20 +228,35 @@ class FileDataStore(DataStore):
             self.logger.warning(msg, source_dim, destination_dim)
             raise SmifDataNotFoundError(msg.format(source_dim, destination_dim))
 
-    def write_coefficients(self, source_dim, destination_dim, data):
-        results_path = self._get_coefficients_path(source_dim, destination_dim)
-        header = "Conversion coefficients {}:{}".format(source_dim, destination_dim)
-        self._write_ndarray(results_path, data, header)
+    def write_coefficients(self, source_dim, destination_dim, data, key=None):
+        """Write coefficients, as a sparse matrix file if the coefficients are sparse,
+        otherwise in the dense array format of this store
+        """
+        sparse_path = self._get_coefficients_path(source_dim, destination_dim, 'npz', key)
+        results_path = self._get_coefficients_path(source_dim, destination_dim, key=key)
 
-    def _get_coefficients_path(self, source_dim, destination_dim):
-        path = os.path.join(
-            self.data_folders['coefficients'],
-            "{}.{}.{}".format(
-                source_dim,
-                destination_dim,
-                self.coef_ext
-            )
-        )
+        if sparse.issparse(data):
+            sparse.save_npz(sparse_path, data.tocsr())
+            stale_path = results_path
+        else:
+            header = "Conversion coefficients {}:{}".format(source_dim, destination_dim)
+            self._write_ndarray(results_path, data, header)
+            stale_path = sparse_path
+
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+
+    def _get_coefficients_path(self, source_dim, destination_dim, ext=None, key=None):
+        """Compose a filename for coefficients:
+                {source_dim}.{destination_dim}[.{key}].{ext}
+        """
+        if ext is None:
+            ext = self.coef_ext
+        parts = [source_dim, destination_dim]
+        if key is not None:
+            parts.append(key)
+        parts.append(ext)
+        path = os.path.join(self.data_folders['coefficients'], ".".join(parts))
         return path
     # endregion
 
@@ -250,6 +281,13 @@ class FileDataStore(DataStore):
 
     def write_results(self, data_array, modelrun_id, model_name, timestep=None,
                       decision_iteration=None):
+        self.write_results_many(
+            [data_array], modelrun_id, model_name, timestep, decision_iteration)
+
+    def write_results_many(self, data_arrays, modelrun_name, model_name, timestep=None,
+                           decision_iteration=None):
+        """Write several results, then add them all to the catalogue at once
+        """
         if timestep is None:
             raise NotImplementedError()
 
@@ -258,16 +296,83 @@ class FileDataStore(DataStore):
         if decision_iteration:
             assert isinstance(decision_iteration, int), "Decision iteration must be an integer"
 
-        results_path = self._get_results_path(
-            modelrun_id, model_name, data_array.name,
-            timestep, decision_iteration
-        )
-        os.makedirs(os.path.dirname(results_path), exist_ok=True)
-        self._write_data_array(results_path, data_array)
+        for data_array in data_arrays:
+            results_path = self._get_results_path(
+                modelrun_name, model_name, data_array.name, timestep, decision_iteration)
+            os.makedirs(os.path.dirname(results_path), exist_ok=True)
+            self._write_data_array(results_path, data_array)
+        self._catalogue_results(modelrun_name, [
+            (timestep, decision_iteration, model_name, data_array.name)
+            for data_array in data_arrays
+        ])
+
+    def _catalogue_results(self, modelrun_name, keys):
+        """Add results to the catalogue, once written
+        """
+        self._get_catalogue(modelrun_name).add(
+            keys, lambda: self._find_results(modelrun_name))
+
+    def _get_catalogue(self, modelrun_name):
+        """Catalogue of the results of a model run, kept with the results so that it is
+        removed along with them
+        """
+        try:
+            return self._catalogues[modelrun_name]
+        except KeyError:
+            catalogue = ResultsCatalogue(
+                os.path.join(self.results_folder, modelrun_name, 'catalogue.db'))
+            return self._catalogues.setdefault(modelrun_name, catalogue)
 
     def available_results(self, modelrun_name):
         """List available results for a given model run
 
+        Results are listed from the catalogue of the model run, which is built first if
+        necessary, for example for results written before the catalogue existed.
+        """
+        if not os.path.isdir(os.path.join(self.results_folder, modelrun_name)):
+            return []
+
+        catalogue = self._get_catalogue(modelrun_name)
+        if not catalogue.is_built():
+            self.rebuild_catalogue([modelrun_name])
+        return catalogue.available()
+
+    def rebuild_catalogue(self, modelrun_names=None):
+        """Rebuild the results catalogue from the results files
+
+        Use this after results files have been added, moved or removed other than through
+        this store.
+
+        Parameters
+        ----------
+        modelrun_names : list[str], optional
+            Model runs to catalogue, by default all model runs with a results folder
+
+        Returns
+        -------
+        int
+            Number of results catalogued
+        """
+        if modelrun_names is None:
+            if os.path.isdir(self.results_folder):
+                modelrun_names = sorted(
+                    name for name in os.listdir(self.results_folder)
+                    if os.path.isdir(os.path.join(self.results_folder, name)))
+            else:
+                modelrun_names = []
+
+        count = 0
+        for modelrun_name in modelrun_names:
+            os.makedirs(os.path.join(self.results_folder, modelrun_name), exist_ok=True)
+            keys = self._get_catalogue(modelrun_name).rebuild(
+                lambda name=modelrun_name: self._find_results(name))
+            self.logger.debug("Catalogued %s results of %s", len(keys), modelrun_name)
+            count += len(keys)
+        return count
+
+    def _find_results(self, modelrun_name):
+        """List results for a given model run from the results files
+
         See _get_results_path for path construction.
 
         On the pattern of:
@@ -337,7 +442,8 @@ class FileDataStore(DataStore):
         # split to last directories and filename
         model_name, decision_str, output_str = path.split(os.sep)[-3:]
         # trim "decision_"
-        decision_iteration = int(decision_str[9:])
+        decision_str = decision_str[9:]
+        decision_iteration = None if decision_str == 'none' else int(decision_str)
         # trim "output_" [...]
         output_str_trimmed = output_str[7:]
         # trim extension
@@ -376,21 +482,48 @@ class FileDataStore(DataStore):
 
 class CSVDataStore(FileDataStore):
     """CSV text file data store
+
+    Reading a single timestep from a data file (for example scenario or narrative variant
+    data) parses the whole file once and splits it by timestep. The split data is kept in
+    a least-recently-used cache, so later timesteps are served without re-reading the file.
+    Cached data is discarded if the file is written or changed on disk.
+
+    In hybrid mode, data which is only read and written by smif is kept in binary files,
+    while model inputs and results stay in CSV files. Dense conversion coefficients are
+    written as ``.npy`` files and read memory-mapped, and state is written as Arrow IPC
+    (``.arrow``) files. Coefficients and state in text files, written before hybrid mode was
+    enabled, are still read, and are replaced when next written.
+
+    Parameters
+    ----------
+    base_folder : str
+    timestep_cache_size : int, default=8
+        Maximum number of data files to hold in the timestep cache. Set to zero to disable
+        caching.
+    hybrid : bool, default=False
+        Write coefficients and state in binary files
     """
-    def __init__(self, base_folder):
+    def __init__(self, base_folder, timestep_cache_size=8, hybrid=False):
         super().__init__(base_folder)
         self.ext = 'csv'
         self.coef_ext = 'txt.gz'
+        self.state_ext = 'csv'
+        self.hybrid = hybrid
+        self.timestep_cache_size = timestep_cache_size
+        self._timestep_cache = OrderedDict()  # type: OrderedDict
 
     def _read_data_array(self, path, spec, timestep=None):
         """Read DataArray from file
         """
-        try:
-            dataframe = pandas.read_csv(path)
-        except FileNotFoundError:
-            raise SmifDataNotFoundError
+        if timestep is not None and self.timestep_cache_size > 0:
+            dataframe = self._read_timestep_slice(path, spec, timestep)
+        else:
+            try:
+                dataframe = pandas.read_csv(path)
+            except FileNotFoundError:
+                raise SmifDataNotFoundError
 
-        dataframe = self._filter_on_timestep(timestep, dataframe, path, spec)
+            dataframe = self._filter_on_timestep(timestep, dataframe, path, spec)
 
         if spec.dims:
             data_array = DataArray.from_df(spec, dataframe)
@@ -404,9 +537,46 @@ class CSVDataStore(FileDataStore):
             data_array = DataArray(spec, data.iloc[0])
         return data_array
 
+    def _read_timestep_slice(self, path, spec, timestep):
+        """Read the rows for a single timestep from file, through the timestep cache
+
+        Cache entries are keyed by path and checked against the file modification time and
+        size. Each read returns a copy of the cached rows, which callers may change freely.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise SmifDataNotFoundError
+        file_key = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self._timestep_cache.get(path)
+        if cached is not None and cached[0] == file_key:
+            self._timestep_cache.move_to_end(path)
+            slices = cached[1]
+        else:
+            dataframe = pandas.read_csv(path)
+            if 'timestep' not in dataframe.columns:
+                # raises a helpful error if there is no timestep to split on
+                self._filter_on_timestep(timestep, dataframe, path, spec)
+            slices = {
+                key: group.drop('timestep', axis=1)
+                for key, group in dataframe.groupby('timestep', sort=False)
+            }
+            self._timestep_cache[path] = (file_key, slices)
+            self._timestep_cache.move_to_end(path)
+            while len(self._timestep_cache) > self.timestep_cache_size:
+                self._timestep_cache.popitem(last=False)
+
+        try:
+            return slices[timestep].copy()
+        except KeyError:
+            raise SmifDataNotFoundError(
+                "Data for '{}' not found for timestep {}".format(spec.name, timestep))
+
     def _write_data_array(self, path, data_array, timestep=None):
         """Write DataArray to file
         """
+        self._timestep_cache.pop(path, None)
         dataframe = data_array.as_df()
         if timestep is not None:
             dataframe['timestep'] = timestep
@@ -439,18 +609,120 @@ class CSVDataStore(FileDataStore):
         """
         np.savetxt(path, data, header=header)
 
+    # region Hybrid mode
+    def read_state(self, modelrun_name, timestep, decision_iteration=None):
+        if self.hybrid:
+            path = self._get_state_path(modelrun_name, timestep, decision_iteration, 'arrow')
+            if os.path.exists(path):
+                with pa.memory_map(path) as source:
+                    return pa.ipc.open_file(source).read_all().to_pylist()
+        # text state, written before hybrid mode was enabled
+        return super().read_state(modelrun_name, timestep, decision_iteration)
+
+    def write_state(self, state, modelrun_name, timestep=None, decision_iteration=None):
+        binary_path = self._get_state_path(
+            modelrun_name, timestep, decision_iteration, 'arrow')
+        if self.hybrid:
+            os.makedirs(os.path.dirname(binary_path), exist_ok=True)
+            table = pa.Table.from_pylist(state)
+            with pa.OSFile(binary_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            self._remove_stale(
+                self._get_state_path(modelrun_name, timestep, decision_iteration))
+        else:
+            super().write_state(state, modelrun_name, timestep, decision_iteration)
+            self._remove_stale(binary_path)
+
+    def read_coefficients(self, source_dim, destination_dim, key=None):
+        if self.hybrid:
+            path = self._get_coefficients_path(source_dim, destination_dim, 'npy', key)
+            if os.path.exists(path):
+                return np.load(path, mmap_mode='r')
+        # sparse coefficients, or text coefficients written before hybrid mode was enabled
+        return super().read_coefficients(source_dim, destination_dim, key)
+
+    def write_coefficients(self, source_dim, destination_dim, data, key=None):
+        binary_path = self._get_coefficients_path(source_dim, destination_dim, 'npy', key)
+        if self.hybrid and not sparse.issparse(data):
+            np.save(binary_path, np.asarray(data))
+            self._remove_stale(
+                self._get_coefficients_path(source_dim, destination_dim, 'npz', key),
+                self._get_coefficients_path(source_dim, destination_dim, key=key))
+        else:
+            # sparse coefficients are written in the same format in either mode
+            super().write_coefficients(source_dim, destination_dim, data, key)
+            self._remove_stale(binary_path)
+
+    @staticmethod
+    def _remove_stale(*paths):
+        """Remove files replaced by a file in another format
+        """
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+    # endregion
+
 
 class ParquetDataStore(FileDataStore):
     """Binary file data store
+
+    DataArrays written for a single timestep (for example scenario or narrative variant data)
+    are stored as a dataset partitioned by timestep, one Parquet file per timestep::
+
+        /scenarios
+            /population_high.parquet
+                /timestep=2015
+                    part-0.parquet
+                /timestep=2020
+                    part-0.parquet
+
+    Reading a single timestep decodes only the matching partition. Reading a single timestep
+    from an unpartitioned file pushes the timestep filter down to the Parquet reader, which
+    skips row groups that cannot match.
+
+    Use :meth:`migrate` to rewrite data files written by earlier versions into the current
+    layout and compression.
+
+    DataArrays are read through Arrow, without going through pandas. With `memory_map`, files
+    are memory-mapped and data which is in order in the file wraps the Arrow buffer it is
+    decoded into, so a DataArray takes no more memory than its values. Data read this way is
+    read-only.
+
+    Parameters
+    ----------
+    base_folder : str
+    compression : str, default='snappy'
+        Compression codec for files written by this store, one of 'snappy', 'gzip', 'brotli',
+        'lz4', 'zstd' or 'none'. Files are read whatever codec they were written with.
+    memory_map : bool, default=False
+        Read files memory-mapped, and return read-only data without copying
     """
-    def __init__(self, base_folder):
+    def __init__(self, base_folder, compression='snappy', memory_map=False):
         super().__init__(base_folder)
         self.ext = 'parquet'
         self.coef_ext = 'npy'
+        self.state_ext = 'parquet'
+        self.compression = compression
+        self.memory_map = memory_map
 
     def _read_parquet_data_array(self, path, spec, timestep=None):
 
-        dataframe = pandas.read_parquet(path, engine='pyarrow')
+        if spec.dims:
+            table = self._read_table(path, timestep)
+            if table is not None:
+                data_array = DataArray.from_arrow(spec, table)
+                if not self.memory_map and not data_array.data.flags.writeable:
+                    data_array.data = data_array.data.copy()
+                return data_array
+
+        if os.path.isdir(path):
+            dataframe = self._read_partitioned(path, timestep)
+        elif timestep is not None and 'timestep' in pq.read_schema(path).names:
+            table = pq.read_table(path, filters=[('timestep', '=', timestep)])
+            dataframe = table.to_pandas()
+        else:
+            dataframe = pq.read_table(path).to_pandas()
         dataframe = self._filter_on_timestep(timestep, dataframe, path, spec)
 
         if spec.dims:
@@ -465,6 +737,35 @@ class ParquetDataStore(FileDataStore):
 
         return data_array
 
+    def _read_table(self, path, timestep=None):
+        """Read a table, with only the rows for `timestep` if given
+
+        Returns None if there are no rows for `timestep`, or no timestep column to filter
+        on, so that the error can be reported as for any other data file.
+        """
+        if timestep is None:
+            return pq.read_table(path, memory_map=self.memory_map)
+
+        if not os.path.isdir(path) and 'timestep' not in pq.read_schema(path).names:
+            return None
+        table = pq.read_table(
+            path, filters=[('timestep', '=', timestep)], memory_map=self.memory_map)
+        if table.num_rows == 0:
+            return None
+        return table.drop(['timestep'])
+
+    def _read_partitioned(self, path, timestep=None):
+        """Read from a dataset partitioned by timestep, decoding only the partition for
+        `timestep` if given
+        """
+        if timestep is None:
+            dataframe = pq.read_table(path).to_pandas()
+        else:
+            dataframe = pq.read_table(path, filters=[('timestep', '=', timestep)]).to_pandas()
+        # partition keys are read as categorical
+        dataframe['timestep'] = dataframe['timestep'].astype('int64')
+        return dataframe
+
     def _read_data_array(self, path, spec, timestep=None):
         """Read DataArray from file
         """
@@ -476,12 +777,77 @@ class ParquetDataStore(FileDataStore):
         return data_array
 
     def _write_data_array(self, path, data_array, timestep=None):
-        """Write DataArray to file
+        """Write DataArray to file, or to a timestep partition if `timestep` is given
         """
         dataframe = data_array.as_df()
-        if timestep is not None:
-            dataframe['timestep'] = timestep
-        dataframe.to_parquet(path, engine='pyarrow', compression='gzip')
+        if timestep is None:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            dataframe.to_parquet(path, engine='pyarrow', compression=self.compression)
+        else:
+            if os.path.isfile(path):
+                # replace unpartitioned file, as if overwriting
+                os.remove(path)
+            if data_array.dims:
+                dataframe = dataframe.reset_index()
+            self._write_partition(path, timestep, dataframe)
+
+    def _write_partition(self, path, timestep, dataframe):
+        """Write dataframe to the partition for `timestep` of a dataset, replacing any
+        data already in that partition
+        """
+        dirname = os.path.join(path, 'timestep={}'.format(int(timestep)))
+        if os.path.isdir(dirname):
+            shutil.rmtree(dirname)
+        os.makedirs(dirname)
+        table = pa.Table.from_pandas(dataframe, preserve_index=False)
+        pq.write_table(
+            table, os.path.join(dirname, 'part-0.parquet'), compression=self.compression)
+
+    def migrate(self):
+        """Rewrite existing data files in the current layout and compression
+
+        Scenario and narrative variant files with a timestep column are split into datasets
+        partitioned by timestep. All other Parquet files in the data and results folders are
+        rewritten with the compression codec of this store. Files which are not Parquet
+        (for example CSV files from a text data store) are left as they are.
+
+        Returns
+        -------
+        list[str]
+            Paths of the migrated files
+        """
+        migrated = []
+        partitioned_folders = (self.data_folders['scenarios'], self.data_folders['narratives'])
+        paths = glob.glob(os.path.join(self.data_folder, '**', '*'), recursive=True) + \
+            glob.glob(os.path.join(self.results_folder, '**', '*'), recursive=True)
+
+        for path in sorted(paths):
+            if not os.path.isfile(path) or os.path.basename(path) == 'part-0.parquet':
+                continue
+            try:
+                table = pq.read_table(path)
+            except (pa.lib.ArrowInvalid, OSError):
+                # not a parquet file
+                continue
+
+            tmp_path = path + '.migrate'
+            if os.path.dirname(path) in partitioned_folders and \
+                    'timestep' in table.schema.names:
+                dataframe = table.to_pandas()
+                if dataframe.index.names != [None]:
+                    dataframe = dataframe.reset_index()
+                for timestep, partition in dataframe.groupby('timestep'):
+                    self._write_partition(
+                        tmp_path, timestep, partition.drop('timestep', axis=1))
+            else:
+                pq.write_table(table, tmp_path, compression=self.compression)
+            os.remove(path)
+            os.rename(tmp_path, path)
+            migrated.append(path)
+            self.logger.debug("Migrated %s", path)
+
+        return migrated
 
     def _read_list_of_dicts(self, path):
         """Read file to list[dict]
@@ -496,22 +862,30 @@ class ParquetDataStore(FileDataStore):
         """Write list[dict] to file
         """
         if data:
-            pandas.DataFrame.from_records(data).to_parquet(path, engine='pyarrow')
+            pandas.DataFrame.from_records(data).to_parquet(
+                path, engine='pyarrow', compression=self.compression)
         else:
-            pandas.DataFrame(columns=['placeholder']).to_parquet(path, engine='pyarrow')
+            pandas.DataFrame(columns=['placeholder']).to_parquet(
+                path, engine='pyarrow', compression=self.compression)
 
     def _read_ndarray(self, path):
-        """Read numpy.ndarray
+        """Read numpy.ndarray, memory-mapped (read-only) from the file
         """
         try:
-            return np.load(path)
+            return np.load(path, mmap_mode='r')
         except OSError:
             raise FileNotFoundError(path)
 
     def _write_ndarray(self, path, data, header=None):
         """Write numpy.ndarray
+
+        Writes to a new file then moves it into place, so any array already memory-mapped
+        from `path` keeps reading the previous file.
         """
-        np.save(path, data)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file_handle:
+            np.save(file_handle, data)
+        os.replace(tmp_path, path)
 
 
 def _nest_keys(intervention):
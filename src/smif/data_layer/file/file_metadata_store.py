@@ -12,6 +12,9 @@ from pandas import compat as pandas_compat
 from pandas.core import common as pandas_common  # type: ignore
 from ruamel.yaml import YAML  # type: ignore
 from smif.data_layer.abstract_metadata_store import MetadataStore
+from smif.data_layer.file.config_cache import ConfigCache
+from smif.data_layer.file.config_snapshot import ConfigSnapshot
+from smif.data_layer.file.spatial_cache import SpatialCache
 from smif.exception import SmifDataNotFoundError, SmifDataReadError
 
 # Import fiona if available (optional dependency)
@@ -32,6 +35,21 @@ class FileMetadataStore(MetadataStore):
         self.units_path = os.path.join(base_folder, 'data', 'user-defined-units.txt')
         self.data_folder = os.path.join(base_folder, 'data', 'dimensions')
         self.config_folder = os.path.join(base_folder, 'config', 'dimensions')
+        # cache parsed config files (invalidate on write or change), reading files compiled
+        # by `smif compile` from the snapshot, if unchanged
+        self._cache = ConfigCache(ConfigSnapshot(base_folder))
+        # cache spatial dimension files as WKB, by file hash
+        self._spatial_cache = SpatialCache(os.path.join(self.data_folder, '.spatial_cache'))
+
+    def cache_info(self):
+        """Report use of the cache of parsed config files
+
+        Returns
+        -------
+        ~smif.data_layer.file.config_cache.CacheInfo
+            Named tuple of (hits, misses, currsize)
+        """
+        return self._cache.info()
 
     # region Units
     def read_unit_definitions(self) -> List[str]:
@@ -53,7 +71,7 @@ class FileMetadataStore(MetadataStore):
         return [self.read_dimension(name, skip_coords) for name in dim_names]
 
     def read_dimension(self, dimension_name: str, skip_coords=False):
-        dim = _read_yaml_file(self.config_folder, dimension_name)
+        dim = _read_yaml_file(self.config_folder, dimension_name, self._cache)
         if skip_coords:
             del dim['elements']
         else:
@@ -69,12 +87,13 @@ class FileMetadataStore(MetadataStore):
         # refer to elements by filename and add to config
         dimension_with_ref = copy.copy(dimension)
         dimension_with_ref['elements'] = elements_filename
-        _write_yaml_file(self.config_folder, dimension['name'], dimension_with_ref)
+        _write_yaml_file(
+            self.config_folder, dimension['name'], dimension_with_ref, self._cache)
 
     def update_dimension(self, dimension_name: str, dimension: Dict):
         # look up elements filename and write elements
 
-        old_dim = _read_yaml_file(self.config_folder, dimension_name)
+        old_dim = _read_yaml_file(self.config_folder, dimension_name, self._cache)
         elements_filename = old_dim['elements']
         elements = dimension['elements']
         self._write_dimension_file(elements_filename, elements)
@@ -83,17 +102,28 @@ class FileMetadataStore(MetadataStore):
         dimension_with_ref = copy.copy(dimension)
         dimension_with_ref['elements'] = elements_filename
 
-        _write_yaml_file(self.config_folder, dimension_name, dimension_with_ref)
+        _write_yaml_file(self.config_folder, dimension_name, dimension_with_ref, self._cache)
 
     def delete_dimension(self, dimension_name: str):
         # read to find filename
 
-        old_dim = _read_yaml_file(self.config_folder, dimension_name)
+        old_dim = _read_yaml_file(self.config_folder, dimension_name, self._cache)
         elements_filename = old_dim['elements']
         # remove elements data
         os.remove(os.path.join(self.data_folder, elements_filename))
         # remove description
-        os.remove(os.path.join(self.config_folder, "{}.yml".format(dimension_name)))
+        path = os.path.join(self.config_folder, "{}.yml".format(dimension_name))
+        os.remove(path)
+        self._cache.invalidate(path)
+
+    def read_dimension_geometries(self, dimension_name: str):
+        dim = _read_yaml_file(self.config_folder, dimension_name, self._cache)
+        filename = dim['elements']
+        if os.path.splitext(filename)[1] not in ('.geojson', '.shp'):
+            return None
+        # geometries are kept by the spatial cache as the file is read
+        self._read_dimension_file(filename)
+        return self._spatial_cache.geometries(os.path.join(self.data_folder, filename))
 
     @lru_cache(maxsize=32)
     def _read_dimension_file(self, filename: str) -> List[Dict]:
@@ -105,7 +135,7 @@ class FileMetadataStore(MetadataStore):
             if 'interval' in data[0]:
                 data = self._unstringify_interval(data)
         elif ext in ('.geojson', '.shp'):
-            data = self._read_spatial_file(filepath)
+            data = self._spatial_cache.read(filepath, self._read_spatial_file)
         else:
             msg = "Extension '{}' not recognised, expected one of ('.csv', "
             msg += "'.geojson', '.shp') when reading {}"
@@ -180,7 +210,7 @@ class FileMetadataStore(MetadataStore):
             raise SmifDataNotFoundError(msg) from ex
 
 
-def _read_yaml_file(directory, name):
+def _read_yaml_file(directory, name, cache=None):
     """Parse yaml config file into plain data (lists, dicts and simple values)
 
     Parameters
@@ -188,13 +218,17 @@ def _read_yaml_file(directory, name):
     directory : str
     name : str
         file basename (without yml extension)
+    cache : ~smif.data_layer.file.config_cache.ConfigCache, optional
+        Read through the cache
     """
     path = os.path.join(directory, "{}.yml".format(name))
+    if cache is not None:
+        return cache.read(path)
     with open(path, 'r') as file_handle:
         return YAML().load(file_handle)
 
 
-def _write_yaml_file(directory, name, data):
+def _write_yaml_file(directory, name, data, cache=None):
     """Write plain data to a file as yaml
 
     Parameters
@@ -204,13 +238,19 @@ def _write_yaml_file(directory, name, data):
         file basename (without yml extension)
     data
         Data to write (should be lists, dicts and simple values)
+    cache : ~smif.data_layer.file.config_cache.ConfigCache, optional
+        Cache to invalidate
     """
     path = os.path.join(directory, "{}.yml".format(name))
-    with open(path, 'w') as file_handle:
-        yaml = YAML()
-        yaml.default_flow_style = False
-        yaml.allow_unicode = True
-        return yaml.dump(data, file_handle)
+    try:
+        with open(path, 'w') as file_handle:
+            yaml = YAML()
+            yaml.default_flow_style = False
+            yaml.allow_unicode = True
+            return yaml.dump(data, file_handle)
+    finally:
+        if cache is not None:
+            cache.invalidate(path)
 
 
 def _read_filenames_in_dir(path, extension):
@@ -0,0 +1,203 @@
+"""Catalogue of the results written by a model run
+
+A :class:`ResultsCatalogue` keeps the key of each results file in a SQLite database beside
+the results, so that available, missing and complete results can be found without listing
+every results file.
+
+The catalogue relies on SQLite's file locking to let several processes (for example the
+workers of a :class:`~smif.controller.work_queue.WorkQueue`) add results at once. File
+locking is broken or missing on some network filesystems, NFS in particular, where
+concurrent writers may then corrupt the catalogue. Where results are written to such a
+filesystem by more than one process, rebuild the catalogue once the model run has finished
+(see ``FileDataStore.rebuild_catalogue``).
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+from threading import Lock
+
+# Seconds to wait for another process writing to the catalogue
+CATALOGUE_TIMEOUT = 60
+
+# Stored in place of a missing decision iteration, so that keys stay unique
+NO_DECISION = -1
+
+
+class ResultsCatalogue(object):
+    """Index of the results of a model run, kept in a SQLite database
+
+    The catalogue is complete once it has been built, from the results already written, by
+    :meth:`rebuild` or the first :meth:`add`, and is then kept up to date by :meth:`add`.
+    Removing the database (for example with the rest of the results of a model run) means it
+    must be built again.
+
+    A single connection is kept open, and shared between threads, until :meth:`close`. It is
+    opened again if the database is removed. The catalogue may be shared between processes,
+    each with its own connection, subject to the file locking described above.
+
+    Parameters
+    ----------
+    path : str
+        Path to the SQLite database
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        self._connection = None
+        self._inode = None
+        self._lock = Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_connection'] = None
+        state['_inode'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def close(self):
+        """Close the connection to the database, if open
+        """
+        with self._lock:
+            self._close()
+
+    @contextmanager
+    def _connect(self):
+        with self._lock:
+            try:
+                inode = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                inode = None
+            if self._connection is not None and inode != self._inode:
+                # removed or replaced since connecting
+                self._close()
+            if self._connection is None:
+                self._open()
+            yield self._connection
+
+    def _open(self):
+        # autocommit, with transactions started explicitly
+        connection = sqlite3.connect(
+            self.path, timeout=CATALOGUE_TIMEOUT, isolation_level=None,
+            check_same_thread=False)
+        connection.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                model TEXT NOT NULL,
+                output TEXT NOT NULL,
+                timestep INTEGER NOT NULL,
+                decision_iteration INTEGER NOT NULL,
+                PRIMARY KEY (model, output, timestep, decision_iteration)
+            )""")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS built (built INTEGER NOT NULL)")
+        self._connection = connection
+        self._inode = os.stat(self.path).st_ino
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+        self._inode = None
+
+    def is_built(self):
+        """Check whether the catalogue lists all results
+
+        Returns
+        -------
+        bool
+        """
+        if not os.path.isfile(self.path):
+            return False
+        with self._connect() as connection:
+            row = connection.execute("SELECT 1 FROM built").fetchone()
+        return row is not None
+
+    def add(self, keys, find_results):
+        """Add results to the catalogue, in a single transaction
+
+        If the catalogue has not been built, it is built instead, as by :meth:`rebuild`.
+
+        Parameters
+        ----------
+        keys : list[tuple]
+            Each tuple is (timestep, decision_iteration, model_name, output_name)
+        find_results : callable
+            Returns a list of (timestep, decision_iteration, model_name, output_name),
+            including `keys`
+        """
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if connection.execute("SELECT 1 FROM built").fetchone() is None:
+                    self._rebuild(connection, find_results)
+                else:
+                    self._insert(connection, keys)
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def rebuild(self, find_results):
+        """Replace all results in the catalogue
+
+        `find_results` is called while the catalogue is locked against other writers, so
+        results added during the rebuild are not lost.
+
+        Parameters
+        ----------
+        find_results : callable
+            Returns a list of (timestep, decision_iteration, model_name, output_name)
+
+        Returns
+        -------
+        list[tuple]
+            The results found
+        """
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                keys = self._rebuild(connection, find_results)
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        return keys
+
+    def available(self):
+        """List results in the catalogue
+
+        Returns
+        -------
+        list[tuple]
+            Each tuple is (timestep, decision_iteration, model_name, output_name)
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                """SELECT timestep, decision_iteration, model, output FROM results
+                ORDER BY model, output, timestep, decision_iteration""").fetchall()
+        return [
+            (timestep, None if decision_iteration == NO_DECISION else decision_iteration,
+             model_name, output_name)
+            for timestep, decision_iteration, model_name, output_name in rows
+        ]
+
+    def _rebuild(self, connection, find_results):
+        keys = find_results()
+        connection.execute("DELETE FROM results")
+        self._insert(connection, keys)
+        connection.execute("DELETE FROM built")
+        connection.execute("INSERT INTO built (built) VALUES (1)")
+        return keys
+
+    @staticmethod
+    def _insert(connection, keys):
+        connection.executemany(
+            """INSERT OR IGNORE INTO results (model, output, timestep, decision_iteration)
+            VALUES (?, ?, ?, ?)""",
+            [
+                (model_name, output_name, int(timestep),
+                 NO_DECISION if decision_iteration is None else int(decision_iteration))
+                for timestep, decision_iteration, model_name, output_name in keys
+            ])
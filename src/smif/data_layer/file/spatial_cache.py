@@ -0,0 +1,178 @@
+"""Binary cache of spatial dimension files
+
+Reading a large spatial dimension through fiona, then parsing the geometry of each of its
+features, is slow. A :class:`SpatialCache` keeps the elements read from each file, along
+with the geometry of each element as WKB and its bounds, in a pickle which is replaced
+whenever the file contents change.
+
+The geometries of the files read by a cache are kept in memory, by element name, so that
+they can be passed to :class:`~smif.convert.region.RegionSet`, which then loads shapes from
+WKB and bulk-loads its spatial index from the bounds, instead of parsing every feature
+again.
+"""
+import hashlib
+import os
+import pickle
+from logging import getLogger
+from threading import Lock
+
+# Import shapely if available (optional dependency)
+try:
+    from shapely.geometry import shape  # type: ignore
+except ImportError:
+    pass
+
+SPATIAL_CACHE_VERSION = 2
+
+# Files read along with a shapefile, which change its contents
+SHAPEFILE_EXTENSIONS = ('.shx', '.dbf', '.prj', '.cpg')
+
+
+class SpatialCache(object):
+    """Elements and geometries of spatial dimension files, kept until the files change
+
+    Each file is cached in a single pickle, named by its path, which also records the hash
+    of the file contents. If the file changes, the pickle is replaced.
+
+    Parameters
+    ----------
+    folder : str
+        Folder to keep cache files in, created when first needed. If the folder cannot be
+        written, files are read as if there were no cache.
+    """
+    def __init__(self, folder):
+        self.logger = getLogger(__name__)
+        self.folder = str(folder)
+        # geometries of the files read in this process, by file path
+        self._geometries = {}  # type: dict
+        self._lock = Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        del state['logger']
+        state['_geometries'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = getLogger(__name__)
+        self._lock = Lock()
+
+    def read(self, filepath, read_elements):
+        """Read the elements of a spatial dimension file, from the cache if possible
+
+        Parameters
+        ----------
+        filepath : str
+        read_elements : callable
+            Reads a list of ``{'name': ..., 'feature': ...}`` elements from `filepath`, if
+            the file is not in the cache
+
+        Returns
+        -------
+        list[dict]
+            Elements as returned by `read_elements`
+        """
+        try:
+            key = file_key(filepath)
+        except FileNotFoundError:
+            # read_elements reports the missing file
+            return read_elements(filepath)
+        path = self._cache_path(filepath)
+        try:
+            with open(path, 'rb') as file_handle:
+                cached = pickle.load(file_handle)
+            if cached['version'] != SPATIAL_CACHE_VERSION:
+                raise ValueError("version {}".format(cached['version']))
+        except FileNotFoundError:
+            cached = None
+        except Exception as ex:
+            self.logger.warning("Replacing spatial cache %s: %s", path, ex)
+            cached = None
+        if cached is None or cached['key'] != key:
+            # replaces the pickle of any earlier contents of the file
+            cached = self._write(path, key, read_elements(filepath))
+
+        with self._lock:
+            self._geometries[os.path.abspath(filepath)] = cached['geometries']
+        return cached['elements']
+
+    def geometries(self, filepath):
+        """Find the geometries of the elements of a file read by this cache
+
+        Parameters
+        ----------
+        filepath : str
+
+        Returns
+        -------
+        dict or None
+            (WKB bytes, (minx, miny, maxx, maxy) bounds) by element name, or None if the
+            file has not been read by this cache in this process
+        """
+        with self._lock:
+            return self._geometries.get(os.path.abspath(filepath))
+
+    def _cache_path(self, filepath):
+        # name by path relative to the cache folder, so that the cache still applies if
+        # the project folder is moved
+        relpath = os.path.relpath(os.path.abspath(filepath), os.path.abspath(self.folder))
+        digest = hashlib.sha1(relpath.encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, "{}.pickle".format(digest))
+
+    def _write(self, path, key, elements):
+        geometries = {}
+        for element in elements:
+            geometry = shape(element['feature']['geometry'])
+            geometries[element['name']] = (geometry.wkb, geometry.bounds)
+        cached = {
+            'version': SPATIAL_CACHE_VERSION,
+            'key': key,
+            'elements': elements,
+            'geometries': geometries
+        }
+
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(tmp_path, 'wb') as file_handle:
+                pickle.dump(cached, file_handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as ex:
+            self.logger.warning("Could not write spatial cache %s: %s", path, ex)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return cached
+
+
+def file_key(filepath):
+    """Hash the contents of a spatial file, including the files read along with a
+    shapefile
+
+    Parameters
+    ----------
+    filepath : str
+
+    Returns
+    -------
+    str
+    """
+    paths = [filepath]
+    basename, ext = os.path.splitext(filepath)
+    if ext == '.shp':
+        paths.extend(basename + sidecar for sidecar in SHAPEFILE_EXTENSIONS)
+
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            with open(path, 'rb') as file_handle:
+                for chunk in iter(lambda: file_handle.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            if path == filepath:
+                raise
+        digest.update(os.path.basename(path).encode('utf-8'))
+    return digest.hexdigest()
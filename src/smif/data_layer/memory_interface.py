@@ -362,15 +362,15 @@ class MemoryDataStore(DataStore):
     # endregion
 
     # region Conversion coefficients
-    def read_coefficients(self, source_dim, destination_dim):
+    def read_coefficients(self, source_dim, destination_dim, key=None):
         try:
-            return self._coefficients[(source_dim, destination_dim)]
+            return self._coefficients[(source_dim, destination_dim, key)]
         except KeyError:
             msg = "Could not find coefficients for conversion from {}>{}"
             raise SmifDataNotFoundError(msg.format(source_dim, destination_dim))
 
-    def write_coefficients(self, source_dim, destination_dim, data):
-        self._coefficients[(source_dim, destination_dim)] = data
+    def write_coefficients(self, source_dim, destination_dim, data, key=None):
+        self._coefficients[(source_dim, destination_dim, key)] = data
     # endregion
 
     # region Results
@@ -0,0 +1,147 @@
+"""Write results to a store in the background
+
+A :class:`ResultsBuffer` lets a model carry on running while its results are written. Results
+are kept in memory until written, so that they can be read back before the write finishes.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+from logging import getLogger
+from threading import Condition
+
+import numpy as np  # type: ignore
+
+from smif.data_layer.data_array import DataArray
+from smif.exception import SmifDataError
+
+# Default number of writer threads and maximum size of results waiting to be written
+RESULTS_BUFFER_WORKERS = 2
+RESULTS_BUFFER_SIZE = 256 * 1024 * 1024
+
+
+class ResultsBuffer(object):
+    """Write results to a store in background threads
+
+    Results are copied when written, so a model may go on to change its arrays. Writing
+    waits while the results waiting to be written would take up more than `max_bytes`.
+
+    Errors from writing are raised by :meth:`flush`, which should be called before the
+    results are needed anywhere other than through this buffer.
+
+    The store must support writing results from several threads at once.
+
+    Parameters
+    ----------
+    store : smif.data_layer.Store
+    max_workers : int, default=RESULTS_BUFFER_WORKERS
+        Number of writer threads
+    max_bytes : int, default=RESULTS_BUFFER_SIZE
+        Maximum size of the results waiting to be written. A single result larger than this
+        is written once all other results have been written.
+    """
+    def __init__(self, store, max_workers=RESULTS_BUFFER_WORKERS,
+                 max_bytes=RESULTS_BUFFER_SIZE):
+        self.logger = getLogger(__name__)
+        self._store = store
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._space = Condition()
+        self._nbytes = 0
+        self._pending = {}  # type: dict
+        self._futures = set()  # type: set
+        self._errors = []  # type: list
+
+    def write_results(self, data_array, model_run_name, model_name, timestep=None,
+                      decision_iteration=None):
+        """Write results of a `model_name` in `model_run_name` in the background
+
+        Parameters
+        ----------
+        data_array : ~smif.data_layer.data_array.DataArray
+        model_run_name : str
+        model_name : str
+        timestep : int, optional
+        decision_iteration : int, optional
+        """
+        data_array = DataArray(data_array.spec, np.array(data_array.data, copy=True))
+        nbytes = data_array.data.nbytes
+        key = (model_run_name, model_name, data_array.name, timestep, decision_iteration)
+
+        with self._space:
+            while self._nbytes and self._nbytes + nbytes > self.max_bytes:
+                self._space.wait()
+            self._nbytes += nbytes
+            # a later write of the same results must wait for any earlier one
+            previous = self._pending.get(key, (None, None))[1]
+            future = self._executor.submit(
+                self._write, key, data_array, nbytes, previous)
+            self._pending[key] = (data_array, future)
+            self._futures.add(future)
+
+    def read_results(self, model_run_name, model_name, output_spec, timestep=None,
+                     decision_iteration=None):
+        """Read results, from memory if waiting to be written, otherwise from the store
+
+        Parameters
+        ----------
+        model_run_name : str
+        model_name : str
+        output_spec : smif.metadata.Spec
+        timestep : int, optional
+        decision_iteration : int, optional
+
+        Returns
+        -------
+        ~smif.data_layer.data_array.DataArray
+        """
+        key = (model_run_name, model_name, output_spec.name, timestep, decision_iteration)
+        with self._space:
+            pending = self._pending.get(key)
+        if pending is not None:
+            return DataArray(output_spec, pending[0].data.copy())
+        return self._store.read_results(
+            model_run_name, model_name, output_spec, timestep, decision_iteration)
+
+    def flush(self):
+        """Wait for all results to be written
+
+        Raises
+        ------
+        SmifDataError
+            If any results could not be written since the last flush
+        """
+        with self._space:
+            futures = list(self._futures)
+        wait(futures)
+
+        with self._space:
+            self._futures.difference_update(futures)
+            errors, self._errors = self._errors, []
+        if errors:
+            keys = ", ".join(str(key) for key, _ in errors)
+            msg = "Could not write {} results: {}"
+            raise SmifDataError(msg.format(len(errors), keys)) from errors[0][1]
+
+    def close(self):
+        """Flush, then stop the writer threads
+        """
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
+
+    def _write(self, key, data_array, nbytes, previous):
+        try:
+            if previous is not None:
+                wait([previous])
+            model_run_name, model_name, _, timestep, decision_iteration = key
+            self._store.write_results(
+                data_array, model_run_name, model_name, timestep, decision_iteration)
+        except Exception as ex:
+            self.logger.error("Could not write results %s: %s", key, ex)
+            with self._space:
+                self._errors.append((key, ex))
+        finally:
+            with self._space:
+                self._nbytes -= nbytes
+                if self._pending.get(key, (None,))[0] is data_array:
+                    del self._pending[key]
+                self._space.notify_all()
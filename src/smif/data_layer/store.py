@@ -16,11 +16,11 @@ SmifDataReadError
 """
 import itertools
 from copy import deepcopy
+from functools import partial
 from logging import getLogger
 from operator import itemgetter
 from typing import Dict, List, Optional
 
-import numpy as np  # type: ignore
 from smif.data_layer import DataArray
 from smif.data_layer.abstract_data_store import DataStore
 from smif.data_layer.abstract_metadata_store import MetadataStore
@@ -28,6 +28,7 @@ from smif.data_layer.file import CSVDataStore, ParquetDataStore
 from smif.data_layer.validate import (validate_sos_model_config,
                                       validate_sos_model_format)
 from smif.exception import SmifDataNotFoundError
+from smif.metadata.coordinates import LazyCoordinates
 from smif.metadata.spec import Spec
 
 
@@ -48,6 +49,14 @@ class Store():
         self.data_store = data_store
         # base folder for any relative paths to models
         self.model_base_folder = str(model_base_folder)
+        # coordinates of each dimension used in specs, read on first use
+        self._dimension_coords = {}  # type: Dict[str, LazyCoordinates]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # coordinates are read again when needed, rather than copied
+        state['_dimension_coords'] = {}
+        return state
 
     #
     # CONFIG
@@ -163,9 +172,17 @@ class Store():
     # endregion
 
     # region Models
-    def read_models(self, skip_coords=False):
+    def read_models(self, skip_coords=False, lazy_coords=False):
         """Read all models
 
+        Parameters
+        ----------
+        skip_coords : bool, default=False
+            Leave out spec coords
+        lazy_coords : bool, default=False
+            Give spec coords as :class:`~smif.metadata.coordinates.LazyCoordinates`, which
+            read dimension elements on first use, rather than as lists of elements
+
         Returns
         -------
         list[~smif.model.model.Model]
@@ -173,17 +190,22 @@ class Store():
         models = sorted(self.config_store.read_models(), key=itemgetter('name'))
         if not skip_coords:
             models = [
-                self._add_coords(model, ('inputs', 'outputs', 'parameters'))
+                self._add_coords(model, ('inputs', 'outputs', 'parameters'), lazy_coords)
                 for model in models
             ]
         return models
 
-    def read_model(self, model_name, skip_coords=False):
+    def read_model(self, model_name, skip_coords=False, lazy_coords=False):
         """Read a model
 
         Parameters
         ----------
         model_name : str
+        skip_coords : bool, default=False
+            Leave out spec coords
+        lazy_coords : bool, default=False
+            Give spec coords as :class:`~smif.metadata.coordinates.LazyCoordinates`, which
+            read dimension elements on first use, rather than as lists of elements
 
         Returns
         -------
@@ -191,7 +213,8 @@ class Store():
         """
         model = self.config_store.read_model(model_name)
         if not skip_coords:
-            model = self._add_coords(model, ('inputs', 'outputs', 'parameters'))
+            model = self._add_coords(
+                model, ('inputs', 'outputs', 'parameters'), lazy_coords)
         return model
 
     def write_model(self, model):
@@ -224,9 +247,17 @@ class Store():
     # endregion
 
     # region Scenarios
-    def read_scenarios(self, skip_coords=False):
+    def read_scenarios(self, skip_coords=False, lazy_coords=False):
         """Read scenarios
 
+        Parameters
+        ----------
+        skip_coords : bool, default=False
+            Leave out spec coords
+        lazy_coords : bool, default=False
+            Give spec coords as :class:`~smif.metadata.coordinates.LazyCoordinates`, which
+            read dimension elements on first use, rather than as lists of elements
+
         Returns
         -------
         list[~smif.model.ScenarioModel]
@@ -234,17 +265,22 @@ class Store():
         scenarios = sorted(self.config_store.read_scenarios(), key=itemgetter('name'))
         if not skip_coords:
             scenarios = [
-                self._add_coords(scenario, ['provides'])
+                self._add_coords(scenario, ['provides'], lazy_coords)
                 for scenario in scenarios
             ]
         return scenarios
 
-    def read_scenario(self, scenario_name, skip_coords=False):
+    def read_scenario(self, scenario_name, skip_coords=False, lazy_coords=False):
         """Read a scenario
 
         Parameters
         ----------
         scenario_name : str
+        skip_coords : bool, default=False
+            Leave out spec coords
+        lazy_coords : bool, default=False
+            Give spec coords as :class:`~smif.metadata.coordinates.LazyCoordinates`, which
+            read dimension elements on first use, rather than as lists of elements
 
         Returns
         -------
@@ -252,7 +288,7 @@ class Store():
         """
         scenario = self.config_store.read_scenario(scenario_name)
         if not skip_coords:
-            scenario = self._add_coords(scenario, ['provides'])
+            scenario = self._add_coords(scenario, ['provides'], lazy_coords)
         return scenario
 
     def write_scenario(self, scenario):
@@ -445,6 +481,7 @@ class Store():
         dimension : ~smif.metadata.coords.Coords
         """
         self.metadata_store.write_dimension(dimension)
+        self._dimension_coords.pop(dimension['name'], None)
 
     def update_dimension(self, dimension_name, dimension):
         """Update dimension
@@ -455,6 +492,7 @@ class Store():
         dimension : ~smif.metadata.coords.Coords
         """
         self.metadata_store.update_dimension(dimension_name, dimension)
+        self._dimension_coords.pop(dimension_name, None)
 
     def delete_dimension(self, dimension_name):
         """Delete dimension
@@ -464,9 +502,29 @@ class Store():
         dimension_name : str
         """
         self.metadata_store.delete_dimension(dimension_name)
+        self._dimension_coords.pop(dimension_name, None)
+
+    def read_dimension_geometries(self, dimension_name):
+        """Return the geometries of a spatial dimension, if already parsed
+
+        Parameters
+        ----------
+        dimension_name : str
+
+        Returns
+        -------
+        dict or None
+            (WKB bytes, (minx, miny, maxx, maxy) bounds) by element name, or None if the
+            store does not keep geometries for the dimension
+        """
+        return self.metadata_store.read_dimension_geometries(dimension_name)
 
-    def _add_coords(self, item, keys):
+    def _add_coords(self, item, keys, lazy=False):
         """Add coordinates to spec definitions on an object
+
+        If `lazy`, coordinates are :class:`~smif.metadata.coordinates.LazyCoordinates`,
+        shared by every spec with the same dimension, which read the dimension elements on
+        first use.
         """
         item = deepcopy(item)
         for key in keys:
@@ -474,10 +532,22 @@ class Store():
             for spec in spec_list:
                 if 'dims' in spec and spec['dims']:
                     spec['coords'] = {
-                        dim: self.read_dimension(dim)['elements']
+                        dim: self._get_dimension_coords(dim) if lazy
+                        else self.read_dimension(dim)['elements']
                         for dim in spec['dims']
                     }
         return item
+
+    def _get_dimension_coords(self, dimension_name):
+        coords = self._dimension_coords.get(dimension_name)
+        if coords is None:
+            coords = LazyCoordinates(
+                dimension_name, partial(self._read_dimension_elements, dimension_name))
+            self._dimension_coords[dimension_name] = coords
+        return coords
+
+    def _read_dimension_elements(self, dimension_name):
+        return self.read_dimension(dimension_name)['elements']
     # endregion
 
     #
@@ -504,7 +574,7 @@ class Store():
         variant = self.read_scenario_variant(scenario_name, variant_name)
         key = self._key_from_data(variant['data'][variable], scenario_name, variant_name,
                                   variable)
-        scenario = self.read_scenario(scenario_name)
+        scenario = self.read_scenario(scenario_name, lazy_coords=True)
         spec_dict = _pick_from_list(scenario['provides'], variable)
         spec = Spec.from_dict(spec_dict)
         return self.data_store.read_scenario_variant_data(key, spec, timestep)
@@ -554,7 +624,7 @@ class Store():
         # find sector model which needs this parameter, to get spec definition
         for model_name, params in narrative['provides'].items():
             if parameter_name in params:
-                sector_model = self.read_model(model_name)
+                sector_model = self.read_model(model_name, lazy_coords=True)
                 spec_dict = _pick_from_list(sector_model['parameters'], parameter_name)
                 break
         # find spec
@@ -597,7 +667,7 @@ class Store():
         -------
         ~smif.data_layer.data_array.DataArray
         """
-        model = self.read_model(model_name)
+        model = self.read_model(model_name, lazy_coords=True)
         param = _pick_from_list(model['parameters'], parameter_name)
         spec = Spec.from_dict(param)
         try:
@@ -657,7 +727,7 @@ class Store():
             A dict of intervention dictionaries containing intervention
             attributes keyed by intervention name
         """
-        model = self.read_model(model_name)
+        model = self.read_model(model_name, lazy_coords=True)
         model['interventions'] = [model_name + '.csv']
         self.update_model(model_name, model)
         self.data_store.write_interventions(model['interventions'][0], interventions)
@@ -675,7 +745,7 @@ class Store():
         list[dict]
             A list of historical interventions, with keys 'name' and 'build_year'
         """
-        model = self.read_model(model_name)
+        model = self.read_model(model_name, lazy_coords=True)
         if model['initial_conditions'] != []:
             return self.data_store.read_initial_conditions(model['initial_conditions'])
         else:
@@ -689,7 +759,7 @@ class Store():
         list[dict]
             A list of historical interventions, with keys 'name' and 'build_year'
         """
-        model = self.read_model(model_name)
+        model = self.read_model(model_name, lazy_coords=True)
         model['initial_conditions'] = [model_name + '.csv']
         self.update_model(model_name, model)
         self.data_store.write_initial_conditions(model['initial_conditions'][0],
@@ -747,11 +817,11 @@ class Store():
     # endregion
 
     # region Conversion coefficients
-    def read_coefficients(self, source_dim: str, destination_dim: str) -> np.ndarray:
+    def read_coefficients(self, source_dim: str, destination_dim: str, key=None):
         """Reads coefficients from the store
 
-        Coefficients are uniquely identified by their source/destination dimensions.
-        This method and `write_coefficients` implement caching of conversion
+        Coefficients are uniquely identified by their source/destination dimensions and
+        key. This method and `write_coefficients` implement caching of conversion
         coefficients between dimensions.
 
         Parameters
@@ -760,22 +830,25 @@ class Store():
             Dimension name
         destination_dim : str
             Dimension name
+        key : str, optional
+            Identifies the content of the dimensions, so that coefficients written for
+            different dimension elements are not returned
 
         Returns
         -------
-        numpy.ndarray
+        numpy.ndarray or scipy.sparse.csr_matrix
 
         Notes
         -----
         To be called from :class:`~smif.convert.adaptor.Adaptor` implementations.
         """
-        return self.data_store.read_coefficients(source_dim, destination_dim)
+        return self.data_store.read_coefficients(source_dim, destination_dim, key)
 
-    def write_coefficients(self, source_dim: str, destination_dim: str, data: np.ndarray):
+    def write_coefficients(self, source_dim: str, destination_dim: str, data, key=None):
         """Writes coefficients to the store
 
-        Coefficients are uniquely identified by their source/destination dimensions.
-        This method and `read_coefficients` implement caching of conversion
+        Coefficients are uniquely identified by their source/destination dimensions and
+        key. This method and `read_coefficients` implement caching of conversion
         coefficients between dimensions.
 
         Parameters
@@ -784,13 +857,15 @@ class Store():
             Dimension name
         destination_dim : str
             Dimension name
-        data : numpy.ndarray
+        data : numpy.ndarray or scipy.sparse.spmatrix
+        key : str, optional
+            Identifies the content of the dimensions
 
         Notes
         -----
         To be called from :class:`~smif.convert.adaptor.Adaptor` implementations.
         """
-        self.data_store.write_coefficients(source_dim, destination_dim, data)
+        self.data_store.write_coefficients(source_dim, destination_dim, data, key)
     # endregion
 
     # region Results
@@ -832,6 +907,21 @@ class Store():
         self.data_store.write_results(
             data_array, model_run_name, model_name, timestep, decision_iteration)
 
+    def write_results_many(self, data_arrays, model_run_name, model_name, timestep=None,
+                           decision_iteration=None):
+        """Write several results of a `model_name` in `model_run_name` at once
+
+        Parameters
+        ----------
+        data_arrays : list[~smif.data_layer.data_array.DataArray]
+        model_run_id : str
+        model_name : str
+        timestep : int, optional
+        decision_iteration : int, optional
+        """
+        self.data_store.write_results_many(
+            data_arrays, model_run_name, model_name, timestep, decision_iteration)
+
     def available_results(self, model_run_name):
         """List available results from a model run
 
@@ -939,7 +1029,7 @@ class Store():
         # For each sector model, get the outputs and create the tuples
         for sec_model_name in sos_config['sector_models']:
 
-            sec_model_config = self.read_model(sec_model_name)
+            sec_model_config = self.read_model(sec_model_name, lazy_coords=True)
             outputs = sec_model_config['outputs']
 
             for output, t in itertools.product(outputs, timesteps):
@@ -7,14 +7,16 @@
   :class:`~smif.metadata.coordinates.Coordinates` correspond to ElementSets under the
   `OGC® Open Modelling Interface (OpenMI) Interface Standard
   <http://www.opengeospatial.org/standards/openmi>`_
+- :class:`~smif.metadata.coordinates.LazyCoordinates` read their elements only when first
+  needed
 """
 
 # import classes here if they should be accessed at the subpackage level, for example ::
 #         from smif.metadata import Spec
-from smif.metadata.coordinates import Coordinates
+from smif.metadata.coordinates import Coordinates, LazyCoordinates
 from smif.metadata.timestep import RelativeTimestep
 from smif.metadata.spec import Spec
 
 # Define what should be imported as * ::
 #         from smif.metadata import *
-__all__ = ['Coordinates', 'RelativeTimestep', 'Spec']
+__all__ = ['Coordinates', 'LazyCoordinates', 'RelativeTimestep', 'Spec']
@@ -28,6 +28,17 @@ Activities (ISIC), revision 4 would be a categorical dimension::
     ... ])
 
 """
+import hashlib
+import json
+from copy import deepcopy
+from threading import Lock
+from weakref import WeakValueDictionary
+
+import numpy as np  # type: ignore
+
+# Interned Coordinates, by name and ids, see Coordinates.intern
+_INTERNED = WeakValueDictionary()  # type: WeakValueDictionary
+_INTERN_LOCK = Lock()
 
 
 class Coordinates(object):
@@ -67,17 +78,93 @@ class Coordinates(object):
         or a list of dicts with a 'name' key
     """
     def __init__(self, name, elements):
+        self._interned = False
         self.name = name
         self._ids = None
         self._elements = None
+        self._simple = False
+        self._lookup = None
+        self._positions = None
+        self._id_array = None
+        self._digest = None
+        self._hash = None
         self._set_elements(elements)
 
+    @classmethod
+    def intern(cls, name, elements):
+        """Get the shared Coordinates for a name and elements, creating them if necessary
+
+        Interned Coordinates are shared, so cannot be renamed, and compare equal by identity
+        to Coordinates interned from the same definition. Label lookups, digests and other
+        values built from the elements are built only once for each definition. The elements
+        are copied, so that later changes to the elements passed in do not change the shared
+        Coordinates.
+
+        Parameters
+        ----------
+        name : str
+        elements : list
+
+        Returns
+        -------
+        Coordinates
+        """
+        try:
+            ids = [e['name'] for e in elements]
+            simple = False
+        except (KeyError, TypeError):
+            ids = elements
+            simple = True
+        try:
+            key = (name, tuple(ids))
+            hash(key)
+        except TypeError:
+            # labels which cannot be hashed, so cannot be looked up
+            return cls(name, elements)
+
+        with _INTERN_LOCK:
+            coords = _INTERNED.get(key)
+            if coords is None or coords._simple != simple or \
+                    not (simple or coords._elements == elements):
+                coords = cls(name, deepcopy(list(elements)))
+                coords._interned = True
+                _INTERNED[key] = coords
+        return coords
+
+    def __reduce_ex__(self, protocol):
+        if self._interned:
+            # intern again when unpickled, for example in another process
+            elements = self._ids if self._simple else self._elements
+            return (self.__class__.intern, (self.name, elements))
+        return super().__reduce_ex__(protocol)
+
+    @property
+    def name(self):
+        """Dimension name
+        """
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        if self._interned:
+            raise AttributeError("Interned Coordinates cannot be renamed")
+        self._name = name
+
     def __eq__(self, other):
+        if self is other:
+            return True
         return self.name == other.name \
             and self.elements == other.elements
 
     def __hash__(self):
-        return hash(tuple(frozenset(e.items()) for e in self._elements))
+        # consistent with __eq__, under which ids such as 1 and 1.0 are equal
+        if self._hash is None:
+            try:
+                self._hash = hash((self.name, tuple(self.ids)))
+            except TypeError:
+                # ids which cannot be hashed
+                self._hash = hash(self.name)
+        return self._hash
 
     def __repr__(self):
         return "<Coordinates name='{}' elements={}>".format(self.name, self.ids)
@@ -86,7 +173,8 @@ class Coordinates(object):
     def elements(self):
         """Elements are a list of dicts with at least a 'name' key
 
-        Coordinate elements should not be changed.
+        Coordinate elements should not be changed. The elements of interned Coordinates are
+        shared by every user of the Coordinates, but not with the caller which defined them.
         """
         return self._elements
 
@@ -102,9 +190,117 @@ class Coordinates(object):
         """
         return self._ids
 
+    @property
+    def digest(self):
+        """Hash of the coordinate elements, which changes if any element changes
+
+        Returns
+        -------
+        str
+            Hex digest, calculated once
+        """
+        if self._digest is None:
+            content = json.dumps(self._elements, sort_keys=True, default=str)
+            self._digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        return self._digest
+
+    @property
+    def id_array(self):
+        """Element ids as a :class:`numpy.ndarray`, built on first use
+
+        The array is shared and read-only.
+        """
+        if self._id_array is None:
+            id_array = np.asarray(self._ids)
+            id_array.flags.writeable = False
+            self._id_array = id_array
+        return self._id_array
+
+    def position(self, label):
+        """Find the position of a label in these coordinates
+
+        Parameters
+        ----------
+        label
+            Coordinate identifier
+
+        Returns
+        -------
+        int
+            Position of the label in :attr:`ids`
+
+        Raises
+        ------
+        KeyError
+            If the label is not in these coordinates
+        """
+        try:
+            return self._get_positions()[label]
+        except KeyError:
+            msg = "Could not find '{}' in coordinates for '{}'"
+            raise KeyError(msg.format(label, self.name))
+
+    def _get_positions(self):
+        if self._positions is None:
+            self._positions = {id_: position for position, id_ in enumerate(self._ids)}
+        return self._positions
+
+    def positions(self, labels):
+        """Find the position of each of a sequence of labels in these coordinates
+
+        Parameters
+        ----------
+        labels : list or numpy.ndarray
+            Coordinate identifiers
+
+        Returns
+        -------
+        numpy.ndarray
+            Integer position of each label in :attr:`ids`, or -1 for labels which are not
+            in these coordinates
+        """
+        sorted_ids, sorter = self._get_lookup()
+        if sorted_ids is not None:
+            labels = np.asarray(labels)
+            if labels.dtype == object:
+                # e.g. strings from a pandas index
+                labels = _as_single_type(labels)
+
+        if sorted_ids is None or _kind(labels.dtype) != _kind(sorted_ids.dtype):
+            # ids or labels of mixed type, fall back to lookup by element
+            labels = np.asarray(labels, dtype=object)
+            positions = self._get_positions()
+            return np.fromiter(
+                (positions.get(label, -1) for label in labels.ravel()),
+                dtype=np.intp, count=labels.size).reshape(labels.shape)
+
+        found = np.searchsorted(sorted_ids, labels)
+        found = np.clip(found, 0, len(sorted_ids) - 1)
+        matched = sorted_ids[found] == labels
+        return np.where(matched, sorter[found], -1)
+
+    def _get_lookup(self):
+        """Sorted ids and the sort order, built on first use to look up positions by binary
+        search. Sorted ids are None if ids cannot be sorted as a single array type.
+        """
+        if self._lookup is None:
+            ids = self.id_array
+            if _kind(ids.dtype) is not None and ids.ndim == 1 \
+                    and len({type(id_) for id_ in self._ids}) == 1:
+                sorter = np.argsort(ids, kind='stable')
+                self._lookup = (ids[sorter], sorter)
+            else:
+                self._lookup = (None, None)
+        return self._lookup
+
     def _set_elements(self, elements):
         """Set elements with a list of ids (string or numeric) or dicts (including key 'id')
         """
+        self._lookup = None
+        self._positions = None
+        self._id_array = None
+        self._digest = None
+        self._hash = None
         if not elements:
             raise ValueError("Coordinates.elements must not be empty")
 
@@ -125,6 +321,7 @@ class Coordinates(object):
             # elements might not be dict-like - in which case, treat them as names
             self._ids = elements
             self._elements = [{"name": e} for e in elements]
+            self._simple = True
 
     @property
     def dim(self):
@@ -137,3 +334,96 @@ class Coordinates(object):
         """Set name as dim
         """
         self.name = dim
+
+
+class LazyCoordinates(Coordinates):
+    """Coordinates which read their elements when first needed
+
+    Creating LazyCoordinates does not read the elements of the dimension, so specs built
+    from a configuration need not load large dimensions, for example with geometry, which
+    are never used. Elements are read once, on first use of any value built from them.
+
+    LazyCoordinates are shared, like interned :class:`Coordinates`, so cannot be renamed and
+    are not copied by :func:`copy.copy` or :func:`copy.deepcopy`. They are pickled as
+    interned Coordinates, with their elements.
+
+    Parameters
+    ----------
+    name : str
+        Name of the dimension
+    load_elements : callable
+        Called with no arguments to read the list of elements
+    """
+    def __init__(self, name, load_elements):
+        # _ids, _elements and _simple are set by _load, on first use
+        self._interned = False
+        self.name = name
+        self._interned = True
+        self._lookup = None
+        self._positions = None
+        self._id_array = None
+        self._digest = None
+        self._hash = None
+        self._load_elements = load_elements
+        self._load_lock = Lock()
+
+    def __getattr__(self, attr):
+        if attr in ('_ids', '_elements', '_simple'):
+            self._load()
+            return self.__dict__[attr]
+        raise AttributeError(attr)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce_ex__(self, protocol):
+        elements = self._ids if self._simple else self._elements
+        return (Coordinates.intern, (self.name, elements))
+
+    def __repr__(self):
+        if not self.loaded:
+            return "<LazyCoordinates name='{}' (not loaded)>".format(self.name)
+        return super().__repr__()
+
+    @property
+    def loaded(self):
+        """Whether the elements have been read
+        """
+        return '_ids' in self.__dict__
+
+    def _load(self):
+        with self._load_lock:
+            if not self.loaded:
+                # copied, as the loaded elements may be shared, for example with a cache
+                coords = Coordinates(self.name, deepcopy(self._load_elements()))
+                self._simple = coords._simple
+                self._elements = coords._elements
+                # set last, to mark the elements as loaded
+                self._ids = coords._ids
+
+
+def _as_single_type(labels):
+    """Convert an object array to a typed array, if all its elements have the same type
+    """
+    types = set(map(type, labels.ravel()))
+    if len(types) == 1:
+        try:
+            dtype = np.dtype(types.pop())
+        except TypeError:
+            return labels
+        if _kind(dtype) is not None:
+            return labels.astype(dtype)
+    return labels
+
+
+def _kind(dtype):
+    """Group numpy dtypes which can be compared with each other in a sorted lookup
+    """
+    if dtype.kind in 'iuf':
+        return 'number'
+    if dtype.kind in 'US':
+        return 'string'
+    return None
@@ -6,6 +6,12 @@ from collections import defaultdict
 
 from smif.metadata.coordinates import Coordinates
 
+# Import pandas if available (optional dependency)
+try:
+    import pandas  # type: ignore
+except ImportError:
+    pass
+
 
 class Spec(object):
     """N-dimensional metadata.
@@ -51,7 +57,7 @@ class Spec(object):
         List of dimension names, must be provided if coords is a dict
     coords : list[Coordinates] or dict[str, list], optional
         A list of :class`Coordinates` or a dict mapping each dimension name to a list of names
-        which label that dimension.
+        which label that dimension, or to the :class:`Coordinates` of that dimension.
     dtype : str
         String suitable for contructing a simple :class:`numpy.dtype`
     abs_range : tuple, optional
@@ -99,6 +105,10 @@ class Spec(object):
 
         self._unit = unit
 
+        # pandas indexes, built on first use
+        self._index = None
+        self._dim_indexes = None
+
     def _coords_from_list(self, coords, dims):
         """Set up coords and dims, checking for consistency
         """
@@ -135,7 +145,8 @@ class Spec(object):
             msg = "Spec.dims must match the keys in coords, in {}"
             raise ValueError(msg.format(self._name))
 
-        coords = [Coordinates(dim, coords[dim]) for dim in dims]
+        # shared with every other spec with the same coordinates
+        coords = [_dim_coords(dim, coords[dim]) for dim in dims]
 
         return coords, dims
 
@@ -230,6 +241,31 @@ class Spec(object):
         """
         return list(self._coords)
 
+    @property
+    def index(self):
+        """A :class:`pandas.MultiIndex` of every combination of coordinates, in the order of
+        the data that this spec describes.
+
+        Built once, on first use, and shared: use a view (:meth:`pandas.Index.view`) to change
+        names or other attributes. Requires pandas.
+        """
+        if self._index is None:
+            self._index = pandas.MultiIndex.from_product(self.dim_indexes, names=self._dims)
+        return self._index
+
+    @property
+    def dim_indexes(self):
+        """A :class:`pandas.Index` of the coordinates of each dimension.
+
+        Built once, on first use, and shared. Requires pandas.
+        """
+        if self._dim_indexes is None:
+            self._dim_indexes = [
+                pandas.Index(coord.ids, name=dim)
+                for dim, coord in zip(self._dims, self._coords)
+            ]
+        return list(self._dim_indexes)
+
     def dim_coords(self, dim: str):
         """Coordinates for a given dimension
         """
@@ -262,6 +298,8 @@ class Spec(object):
         return self._unit
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return self.dtype == other.dtype \
             and self.dims == other.dims \
             and self.coords == other.coords \
@@ -275,6 +313,13 @@ class Spec(object):
             self.unit
         ))
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # indexes are rebuilt on first use, rather than copied
+        state['_index'] = None
+        state['_dim_indexes'] = None
+        return state
+
     def __repr__(self):
         return "<Spec name='{}' dims='{}' unit='{}'>".format(self.name, self.dims, self.unit)
 
@@ -293,6 +338,17 @@ class Spec(object):
             raise ValueError(msg.format(range_, self._name))
 
 
+def _dim_coords(dim, coords):
+    """Get interned Coordinates for a dimension from a list of elements, or use Coordinates
+    (for example LazyCoordinates) of the dimension as given, without reading their elements
+    """
+    if isinstance(coords, Coordinates):
+        if coords.name == dim:
+            return coords
+        coords = coords.elements
+    return Coordinates.intern(dim, coords)
+
+
 def _is_sequence(obj):
     """Check for iterable object that is not a string ('strip' is a method on str)
     """
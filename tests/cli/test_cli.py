@@ -73,6 +73,39 @@ def test_fixture_single_run_csv(tmp_sample_project):
     assert "Model run 'energy_central' complete" in str(output.stdout)
 
 
+def test_fixture_single_run_queue(tmp_sample_project):
+    """Test running the single_run fixture through a work queue, with two workers
+    """
+    run = subprocess.Popen(
+        ["smif", "run", "-q", "-d", tmp_sample_project, "energy_central"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    workers = [
+        subprocess.Popen(
+            ["smif", "worker", "-d", tmp_sample_project, "--poll", "0.1",
+             "--idle-timeout", "5"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        for _ in range(2)
+    ]
+    stdout, stderr = run.communicate(timeout=120)
+    for worker in workers:
+        worker.communicate(timeout=30)
+
+    print(stdout.decode("utf-8"))
+    print(stderr.decode("utf-8"), file=sys.stderr)
+    assert "Model run 'energy_central' complete" in str(stdout)
+    assert os.listdir(os.path.join(tmp_sample_project, 'queue', 'done'))
+    assert not os.listdir(os.path.join(tmp_sample_project, 'queue', 'failed'))
+
+
+def test_fixture_migrate(tmp_sample_project):
+    """Test migrating a project with only text data files, which are left as they are
+    """
+    output = subprocess.run(
+        ["smif", "migrate", "-d", tmp_sample_project, "-c", "zstd"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert "Migrated 0 files" in str(output.stdout)
+
+
 def test_fixture_single_run_warm(tmp_sample_project):
     """Test running the (default) single_run fixture with warm setting enabled
     """
@@ -155,6 +188,32 @@ def test_fixture_available_results(tmp_sample_project):
     assert(out_str.count(': 2020') == 2)
 
 
+def test_fixture_catalogue(tmp_sample_project):
+    """Test cli for rebuilding the results catalogue
+    """
+    config_dir = tmp_sample_project
+    subprocess.run(["smif", "run", "energy_central", "-d", config_dir], stdout=subprocess.PIPE)
+    catalogue = os.path.join(config_dir, 'results', 'energy_central', 'catalogue.db')
+    os.remove(catalogue)
+
+    output = subprocess.run(["smif", "catalogue", "energy_central", "-d", config_dir],
+                            stdout=subprocess.PIPE)
+    assert "Catalogued 8 results" in str(output.stdout)
+    assert os.path.isfile(catalogue)
+
+
+def test_fixture_compile(tmp_sample_project):
+    """Test cli for compiling the project configuration
+    """
+    config_dir = tmp_sample_project
+    output = subprocess.run(["smif", "compile", "-d", config_dir], stdout=subprocess.PIPE)
+    assert "Compiled 14 configuration files" in str(output.stdout)
+    assert os.path.isfile(os.path.join(config_dir, 'config.snapshot'))
+
+    output = subprocess.run(["smif", "list", "-d", config_dir], stdout=subprocess.PIPE)
+    assert "energy_central" in str(output.stdout)
+
+
 def test_fixture_missing_results(tmp_sample_project):
     """Test cli for listing missing results
     """
@@ -260,3 +319,14 @@ def test_verbose_debug_alt():
     """
     output = subprocess.run(['smif', 'list', '--verbose', '--verbose'], stderr=subprocess.PIPE)
     assert 'DEBUG' in str(output.stderr)
+
+
+def test_fixture_single_run_write_behind(tmp_sample_project):
+    """Test running the single_run fixture, writing results in the background
+    """
+    output = subprocess.run(
+        ["smif", "run", "--write-behind", "-d", tmp_sample_project, "energy_central"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    print(output.stdout.decode("utf-8"))
+    print(output.stderr.decode("utf-8"), file=sys.stderr)
+    assert "Model run 'energy_central' complete" in str(output.stdout)
@@ -393,3 +393,65 @@ class TestModelRunnerJobGraphs():
         actual = list(job_graph.successors('test_simulate_1_0_model_a'))
         expected = []
         assert actual == expected
+
+    def test_split_jobgraph_by_decision_iteration(self, mock_model_run):
+        """
+        a[before]
+        |         |
+        v         v
+        a[sim]    a[sim]
+        d=0       d=1
+        """
+        model_a = EmptySectorModel('model_a')
+        mock_model_run.sos_model.add_model(model_a)
+
+        runner = ModelRunner()
+        bundle = {
+            'decision_iterations': [0, 1],
+            'timesteps': [1]
+        }
+        job_graph = runner.build_job_graph(mock_model_run, bundle)
+        iteration_graphs = runner.split_job_graph(job_graph)
+
+        assert [sorted(graph.nodes) for graph in iteration_graphs] == [
+            ['test_before_model_run_model_a', 'test_simulate_1_0_model_a'],
+            ['test_before_model_run_model_a', 'test_simulate_1_1_model_a']
+        ]
+        for graph in iteration_graphs:
+            assert len(graph.edges) == 1
+
+    def test_split_jobgraph_skips_previous_bundle(self, mock_model_run):
+        """
+        a[sim]  (previous bundle)
+        t=1
+        |
+        v
+        a[sim]
+        t=2
+        """
+        model_a = EmptySectorModel('model_a')
+        model_a.add_input(Spec('input', dtype='float'))
+        model_a.add_output(Spec('output', dtype='float'))
+        mock_model_run.sos_model.add_model(model_a)
+        mock_model_run.sos_model.add_dependency(
+            model_a, 'output',
+            model_a, 'input',
+            RelativeTimestep.PREVIOUS)
+        mock_model_run.model_horizon = [1, 2]
+        mock_model_run.initialised = True
+
+        runner = ModelRunner()
+        bundle = {
+            'decision_iterations': [1, 2],
+            'timesteps': [2],
+            'decision_links': {1: 0, 2: 0}
+        }
+        job_graph = runner.build_job_graph(mock_model_run, bundle)
+        assert 'test_simulate_1_0_model_a' in job_graph
+
+        iteration_graphs = runner.split_job_graph(job_graph)
+
+        assert [list(graph.nodes) for graph in iteration_graphs] == [
+            ['test_simulate_2_1_model_a'],
+            ['test_simulate_2_2_model_a']
+        ]
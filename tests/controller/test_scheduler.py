@@ -3,8 +3,14 @@
 from unittest.mock import Mock, patch
 
 import networkx
+import numpy as np
 from pytest import fixture, raises
 from smif.controller.scheduler import JobScheduler, ModelRunScheduler
+from smif.data_layer import Store
+from smif.data_layer.file import (CSVDataStore, FileMetadataStore,
+                                  YamlConfigStore)
+from smif.exception import SmifDataError
+from smif.metadata import Spec
 from smif.model import ModelOperation, ScenarioModel, SectorModel
 
 
@@ -13,6 +19,47 @@ class EmptySectorModel(SectorModel):
         return data
 
 
+class RecordingSectorModel(SectorModel):
+    """Append model name to a log file on simulate
+    """
+    log_path = None
+
+    def simulate(self, data):
+        with open(self.log_path, 'a') as log_file:
+            log_file.write(self.name + '\n')
+        return data
+
+
+class InitialisingSectorModel(RecordingSectorModel):
+    """Set state on before_model_run, which must be available on simulate
+    """
+    def before_model_run(self, data):
+        self.initialised_name = self.name
+
+    def simulate(self, data):
+        with open(self.log_path, 'a') as log_file:
+            log_file.write(self.initialised_name + '\n')
+        return data
+
+
+class ResultSectorModel(SectorModel):
+    """Set a single result on simulate
+    """
+    def __init__(self, name):
+        super().__init__(name)
+        self.add_output(Spec(name='energy', dtype='float', dims=['region'],
+                             coords={'region': ['a', 'b']}))
+
+    def simulate(self, data):
+        data.set_results('energy', np.array([1., 2.]))
+        return data
+
+
+class FailingSectorModel(SectorModel):
+    def simulate(self, data):
+        raise RuntimeError("Failed to simulate")
+
+
 class TestModelRunScheduler():
     @patch('smif.controller.scheduler.subprocess.Popen')
     def test_single_modelrun(self, mock_popen):
@@ -183,6 +230,34 @@ class TestJobScheduler():
         assert err is None
         assert scheduler.get_status(job_id)['status'] == 'done'
 
+    def test_write_behind(self, job_graph, scheduler):
+        """Results written in the background should be in the store once the job graph is
+        done, and write errors should fail the job graph
+        """
+        model = ResultSectorModel('c')
+        job_graph.add_node(
+            'c',
+            model=model,
+            operation=ModelOperation.SIMULATE,
+            modelrun_name='test',
+            current_timestep=1,
+            timesteps=[1],
+            decision_iteration=0
+        )
+        scheduler.write_behind = True
+
+        job_id, err = scheduler.add(job_graph)
+
+        assert err is None
+        actual = scheduler.store.read_results('test', 'c', model.outputs['energy'], 1, 0)
+        np.testing.assert_equal(actual.data, np.array([1., 2.]))
+
+        scheduler.store.write_results = Mock(side_effect=ValueError("disk full"))
+        job_id, err = scheduler.add(job_graph)
+
+        assert isinstance(err, SmifDataError)
+        assert scheduler.get_status(job_id)['status'] == 'failed'
+
     def test_default_status(self):
         scheduler = JobScheduler()
         assert scheduler.get_status(0)['status'] == 'unstarted'
@@ -217,3 +292,154 @@ class TestJobScheduler():
 
         assert isinstance(err, ValueError)
         assert scheduler.get_status(job_id)['status'] == 'failed'
+
+
+class TestJobSchedulerParallel():
+    @fixture
+    def log_path(self, setup_empty_folder_structure):
+        return str(setup_empty_folder_structure.join('jobs.log'))
+
+    @fixture
+    def job_graph(self, log_path):
+        """Diamond-shaped graph: a before b and c, b and c before d
+        """
+        G = networkx.DiGraph()
+        for name in ('a', 'b', 'c', 'd'):
+            model = RecordingSectorModel(name)
+            model.log_path = log_path
+            G.add_node(
+                name,
+                model=model,
+                operation=ModelOperation.SIMULATE,
+                modelrun_name='test',
+                current_timestep=1,
+                timesteps=[1],
+                decision_iteration=0
+            )
+        G.add_edges_from([('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd')])
+        return G
+
+    @fixture
+    def scheduler(self, setup_empty_folder_structure):
+        directory = str(setup_empty_folder_structure)
+        store = Store(
+            config_store=YamlConfigStore(directory),
+            metadata_store=FileMetadataStore(directory),
+            data_store=CSVDataStore(directory)
+        )
+        store.write_model_run({
+            'name': 'test',
+            'narratives': {},
+            'scenarios': {},
+            'sos_model': 'test_sos_model'
+        })
+        store.write_sos_model({
+            'name': 'test_sos_model',
+            'scenario_dependencies': [],
+            'model_dependencies': []
+        })
+        scheduler = JobScheduler(max_workers=2)
+        scheduler.store = store
+        return scheduler
+
+    def test_add(self, job_graph, scheduler, log_path):
+        job_id, err = scheduler.add(job_graph)
+
+        assert err is None
+        assert scheduler.get_status(job_id)['status'] == 'done'
+
+        with open(log_path) as log_file:
+            run_order = log_file.read().split()
+        assert sorted(run_order) == ['a', 'b', 'c', 'd']
+        assert run_order[0] == 'a'
+        assert run_order[-1] == 'd'
+
+    def test_add_cyclic(self, job_graph, scheduler):
+        job_graph.add_edge('d', 'a')
+        job_id, err = scheduler.add(job_graph)
+
+        assert isinstance(err, NotImplementedError)
+        assert scheduler.get_status(job_id)['status'] == 'failed'
+
+    def test_failing_job(self, job_graph, scheduler, log_path):
+        job_graph.nodes['b']['model'] = FailingSectorModel('b')
+        job_id, err = scheduler.add(job_graph)
+
+        assert isinstance(err, RuntimeError)
+        assert scheduler.get_status(job_id)['status'] == 'failed'
+
+        with open(log_path) as log_file:
+            run_order = log_file.read().split()
+        assert 'd' not in run_order
+
+    def test_add_many(self, job_graph, scheduler, log_path):
+        other_graph = job_graph.copy()
+        other_graph.nodes['b']['model'] = FailingSectorModel('b')
+        results = scheduler.add_many([job_graph, other_graph])
+
+        (ok_id, ok_err), (failed_id, failed_err) = results
+        assert ok_err is None
+        assert scheduler.get_status(ok_id)['status'] == 'done'
+        assert isinstance(failed_err, RuntimeError)
+        assert scheduler.get_status(failed_id)['status'] == 'failed'
+
+        with open(log_path) as log_file:
+            run_order = log_file.read().split()
+        # first graph runs in full, second stops after the failure
+        assert run_order.count('d') == 1
+        assert run_order.count('a') == 2
+
+    def test_before_model_run_state(self, job_graph, scheduler, log_path):
+        """State set by before_model_run should be available to simulate on every worker
+        """
+        for name in ('a', 'b', 'c', 'd'):
+            model = InitialisingSectorModel(name)
+            model.log_path = log_path
+            job_graph.nodes[name]['model'] = model
+            job_graph.add_node(
+                'before_' + name,
+                model=model,
+                operation=ModelOperation.BEFORE_MODEL_RUN,
+                modelrun_name='test',
+                current_timestep=None,
+                timesteps=[1],
+                decision_iteration=None
+            )
+            job_graph.add_edge('before_' + name, name)
+        job_id, err = scheduler.add(job_graph)
+
+        assert err is None
+        # a graph with simulate jobs only, as for a later bundle
+        iteration_graph = job_graph.subgraph(['a', 'b', 'c', 'd']).copy()
+        results = scheduler.add_many([iteration_graph, iteration_graph.copy()])
+        assert [err for _, err in results] == [None, None]
+
+        with open(log_path) as log_file:
+            run_order = log_file.read().split()
+        assert sorted(run_order) == ['a'] * 3 + ['b'] * 3 + ['c'] * 3 + ['d'] * 3
+
+    def test_write_behind(self, job_graph, scheduler):
+        """Results written in the background by workers should be in the store once each
+        job is done
+        """
+        model = ResultSectorModel('e')
+        job_graph.add_node(
+            'e',
+            model=model,
+            operation=ModelOperation.SIMULATE,
+            modelrun_name='test',
+            current_timestep=1,
+            timesteps=[1],
+            decision_iteration=0
+        )
+        scheduler.backend.write_behind = True
+
+        job_id, err = scheduler.add(job_graph)
+
+        assert err is None
+        actual = scheduler.store.read_results('test', 'e', model.outputs['energy'], 1, 0)
+        np.testing.assert_equal(actual.data, np.array([1., 2.]))
+
+    def test_no_workers(self):
+        with raises(ValueError):
+            JobScheduler(max_workers=0)
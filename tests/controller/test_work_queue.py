@@ -0,0 +1,203 @@
+"""Test WorkQueue and WorkQueueBackend
+"""
+import os
+import threading
+from unittest.mock import Mock
+
+import networkx
+from pytest import fixture, raises
+from smif.controller.scheduler import JobScheduler
+from smif.controller import work_queue
+from smif.controller.work_queue import (WorkQueue, WorkQueueBackend,
+                                        run_worker, serialise_job)
+from smif.exception import SmifModelRunError
+from smif.model import ModelOperation, SectorModel
+
+
+class EmptySectorModel(SectorModel):
+    def simulate(self, data):
+        return data
+
+
+@fixture
+def queue(tmpdir):
+    return WorkQueue(str(tmpdir.join('queue')))
+
+
+@fixture
+def job():
+    return {
+        'model': EmptySectorModel('a'),
+        'operation': ModelOperation.SIMULATE,
+        'modelrun_name': 'test',
+        'current_timestep': 1,
+        'timesteps': [1, 2],
+        'decision_iteration': 0
+    }
+
+
+@fixture
+def job_graph(job):
+    G = networkx.DiGraph()
+    G.add_node('a', **job)
+    b_job = dict(job)
+    b_job['model'] = EmptySectorModel('b')
+    G.add_node('b', **b_job)
+    G.add_edge('a', 'b')
+    return G
+
+
+def run_fake_worker(queue, fail_models=(), stop=None):
+    """Claim queued items, failing any which include a model in fail_models
+    """
+    while not stop.is_set():
+        claimed = queue.claim()
+        if claimed is None:
+            stop.wait(0.01)
+            continue
+        item_id, jobs = claimed
+        if any(job['model_name'] in fail_models for job in jobs):
+            queue.fail(item_id, 'Failed to simulate')
+        else:
+            queue.complete(item_id)
+
+
+@fixture
+def fake_worker(queue):
+    stop = threading.Event()
+
+    def start(fail_models=()):
+        thread = threading.Thread(target=run_fake_worker, args=(queue, fail_models, stop))
+        thread.start()
+
+    yield start
+    stop.set()
+
+
+class TestWorkQueue():
+    def test_serialise_job(self, job):
+        assert serialise_job(job) == {
+            'run_id': None,
+            'modelrun_name': 'test',
+            'model_name': 'a',
+            'operation': 'simulate',
+            'current_timestep': 1,
+            'timesteps': [1, 2],
+            'decision_iteration': 0
+        }
+
+    def test_claim_empty(self, queue):
+        assert queue.claim() is None
+
+    def test_put_claim_complete(self, queue, job):
+        item_id = queue.put([serialise_job(job)])
+        assert queue.status(item_id) == ('pending', None)
+
+        claimed_id, jobs = queue.claim()
+        assert claimed_id == item_id
+        assert jobs == [serialise_job(job)]
+        assert queue.status(item_id) == ('running', None)
+        # each item is only claimed once
+        assert queue.claim() is None
+
+        queue.complete(item_id)
+        assert queue.status(item_id) == ('done', None)
+
+    def test_fail(self, queue, job):
+        item_id = queue.put([serialise_job(job)])
+        queue.claim()
+        queue.fail(item_id, 'Error message')
+        assert queue.status(item_id) == ('failed', 'Error message')
+
+    def test_cancel(self, queue, job):
+        item_id = queue.put([serialise_job(job)])
+        assert queue.cancel(item_id)
+        assert queue.claim() is None
+        with raises(KeyError):
+            queue.status(item_id)
+
+    def test_cancel_claimed(self, queue, job):
+        item_id = queue.put([serialise_job(job)])
+        queue.claim()
+        assert not queue.cancel(item_id)
+
+
+class TestWorkQueueBackend():
+    @fixture
+    def scheduler(self, queue):
+        return JobScheduler(backend=WorkQueueBackend(queue, poll_interval=0.01))
+
+    def test_add(self, scheduler, job_graph, fake_worker):
+        fake_worker()
+        job_id, err = scheduler.add(job_graph)
+
+        assert err is None
+        assert scheduler.get_status(job_id)['status'] == 'done'
+
+    def test_add_failing(self, scheduler, job_graph, fake_worker):
+        fake_worker(fail_models=('a',))
+        job_id, err = scheduler.add(job_graph)
+
+        assert isinstance(err, SmifModelRunError)
+        assert 'Failed to simulate' in str(err)
+        assert scheduler.get_status(job_id)['status'] == 'failed'
+
+    def test_add_many(self, scheduler, job_graph, fake_worker, queue):
+        other_graph = networkx.relabel_nodes(job_graph, {'a': 'c', 'b': 'd'})
+        other_graph.nodes['c']['model'] = EmptySectorModel('c')
+        fake_worker(fail_models=('c',))
+
+        (ok_id, ok_err), (failed_id, failed_err) = scheduler.add_many(
+            [job_graph, other_graph])
+
+        assert ok_err is None
+        assert scheduler.get_status(ok_id)['status'] == 'done'
+        assert isinstance(failed_err, SmifModelRunError)
+        assert scheduler.get_status(failed_id)['status'] == 'failed'
+
+    def test_add_failing_partial_write(self, scheduler, job_graph, queue):
+        """A failed item which is still being written should be checked again later
+        """
+        def fail_slowly():
+            claimed = None
+            while claimed is None:
+                claimed = queue.claim()
+            item_id, _ = claimed
+            with open(os.path.join(queue.folders['failed'], item_id + '.json'), 'w') as fh:
+                fh.write('{"id": ')
+            threading.Event().wait(0.1)
+            queue.fail(item_id, 'Failed to simulate')
+
+        thread = threading.Thread(target=fail_slowly)
+        thread.start()
+        job_id, err = scheduler.add(job_graph)
+        thread.join()
+
+        assert isinstance(err, SmifModelRunError)
+        assert scheduler.get_status(job_id)['status'] == 'failed'
+
+
+class TestRunWorker():
+    def test_reload_per_run(self, queue, job, monkeypatch):
+        """Models and RunContexts should be loaded once for each run of a scheduler, so
+        that a model run which is run again starts afresh
+        """
+        sos_model = Mock()
+        sos_model.get_model = Mock(return_value=job['model'])
+        get_model_run_definition = Mock(return_value={'sos_model': sos_model})
+        monkeypatch.setattr(
+            work_queue, 'get_model_run_definition', get_model_run_definition)
+        run_contexts = []
+        monkeypatch.setattr(
+            work_queue, 'run_job',
+            lambda store, job, contexts: run_contexts.append(contexts))
+
+        first = [queue.put([serialise_job(job, 'run_1')]) for _ in range(2)]
+        second = queue.put([serialise_job(job, 'run_2')])
+        run_worker(Mock(), queue, poll_interval=0, idle_timeout=0)
+
+        for item_id in first + [second]:
+            assert queue.status(item_id) == ('done', None)
+        assert get_model_run_definition.call_count == 2
+        assert run_contexts[0] is run_contexts[1]
+        assert run_contexts[2] is not run_contexts[0]
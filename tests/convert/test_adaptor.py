@@ -1,9 +1,19 @@
 """Tests functionality of NDimensionalRegister class that computes coefficients for
 different operations
 """
+from unittest.mock import Mock
+
 import numpy as np
 from pytest import mark
+from scipy import sparse
 from smif.convert.adaptor import Adaptor
+from smif.convert.interval import IntervalAdaptor
+from smif.data_layer import DataArray, Store
+from smif.data_layer.data_handle import DataHandle
+from smif.data_layer.memory_interface import (MemoryConfigStore,
+                                              MemoryDataStore,
+                                              MemoryMetadataStore)
+from smif.metadata import Spec
 
 
 class TestPerformConversion:
@@ -113,3 +123,130 @@ class TestPerformConversion:
         )
         actual = Adaptor.convert_with_coefficients(actual, coefficients, 2)
         np.testing.assert_allclose(actual, expected)
+
+    @mark.parametrize("axis", [0, 1, 2])
+    def test_sparse_operation(self, axis):
+        """Sparse coefficients should give the same result as dense
+        """
+        data = np.arange(24, dtype=float).reshape((2, 3, 4))
+        size = data.shape[axis]
+        dense = np.zeros((size, 5))
+        dense[0, 1] = 0.5
+        dense[0, 2] = 0.5
+        dense[size - 1, 4] = 1
+
+        expected = Adaptor.convert_with_coefficients(data, dense, axis)
+        actual = Adaptor.convert_with_coefficients(data, sparse.csr_matrix(dense), axis)
+
+        assert isinstance(actual, np.ndarray)
+        np.testing.assert_allclose(actual, expected)
+
+
+class TestGetCoefficients:
+    """Read, generate and cache coefficients
+    """
+    @staticmethod
+    def spec(dim, intervals):
+        return Spec(
+            name='energy',
+            dtype='float',
+            dims=[dim],
+            coords={dim: [
+                {'name': str(idx), 'interval': [interval]}
+                for idx, interval in enumerate(intervals)
+            ]}
+        )
+
+    def test_key_changes_with_elements(self):
+        adaptor = IntervalAdaptor('convert')
+        from_spec = self.spec('half_year', [('PT0H', 'PT4380H'), ('PT4380H', 'PT8760H')])
+        to_spec = self.spec('year', [('PT0H', 'PT8760H')])
+        changed_spec = self.spec('half_year', [('PT0H', 'PT4000H'), ('PT4000H', 'PT8760H')])
+
+        key = adaptor.get_coefficients_key(from_spec, to_spec)
+        assert key == adaptor.get_coefficients_key(from_spec, to_spec)
+        assert key != adaptor.get_coefficients_key(changed_spec, to_spec)
+
+    def test_generate_once_per_run(self):
+        """Coefficients should be read from the store once, then kept for the run
+        """
+        store = Store(
+            config_store=MemoryConfigStore(),
+            metadata_store=MemoryMetadataStore(),
+            data_store=MemoryDataStore()
+        )
+        store.write_model_run(
+            {'name': 'test', 'sos_model': 'test_sos', 'scenarios': {}, 'narratives': {}})
+        store.write_sos_model(
+            {'name': 'test_sos', 'scenario_dependencies': [], 'model_dependencies': []})
+        from_spec = self.spec('half_year', [('PT0H', 'PT4380H'), ('PT4380H', 'PT8760H')])
+        to_spec = self.spec('year', [('PT0H', 'PT8760H')])
+        adaptor = IntervalAdaptor('convert')
+        adaptor.add_input(from_spec)
+        adaptor.add_output(to_spec)
+        data_handle = DataHandle(store, 'test', 2010, [2010], adaptor)
+        store.read_coefficients = Mock(wraps=store.read_coefficients)
+
+        first = adaptor.get_coefficients(data_handle, from_spec, to_spec)
+        second = adaptor.get_coefficients(data_handle, from_spec, to_spec)
+
+        np.testing.assert_equal(first, np.array([[1], [1]]))
+        assert second is first
+        assert store.read_coefficients.call_count == 1
+
+
+class TestSimulate:
+    """Convert all variables in one simulate step
+    """
+    @staticmethod
+    def spec(name, dim, intervals):
+        return Spec(
+            name=name,
+            dtype='float',
+            dims=['region', dim],
+            coords={
+                'region': ['a', 'b'],
+                dim: [
+                    {'name': str(idx), 'interval': [interval]}
+                    for idx, interval in enumerate(intervals)
+                ]
+            }
+        )
+
+    def test_group_shared_coefficients(self):
+        """Variables with the same dims should share one contraction and be written at once
+        """
+        half_years = [('PT0H', 'PT4380H'), ('PT4380H', 'PT8760H')]
+        quarters = [('PT0H', 'PT2190H'), ('PT2190H', 'PT4380H'), ('PT4380H', 'PT6570H'),
+                    ('PT6570H', 'PT8760H')]
+        year = [('PT0H', 'PT8760H')]
+
+        adaptor = IntervalAdaptor('convert')
+        data = {}
+        for idx, name in enumerate(['electricity', 'gas', 'heat']):
+            adaptor.add_input(self.spec(name, 'half_year', half_years))
+            adaptor.add_output(self.spec(name, 'year', year))
+            data[name] = np.array([[1., 2.], [3., 4.]]) * (idx + 1)
+        adaptor.add_input(self.spec('water', 'quarter', quarters))
+        adaptor.add_output(self.spec('water', 'year', year))
+        data['water'] = np.array([[1., 1., 1., 1.], [2., 2., 2., 2.]])
+
+        data_handle = Mock()
+        data_handle.read_coefficients = Mock(
+            side_effect=lambda from_dim, to_dim, key: adaptor.generate_coefficients(
+                adaptor.inputs['water' if from_dim == 'quarter' else 'gas'],
+                adaptor.outputs['water' if from_dim == 'quarter' else 'gas']))
+        data_handle.get_data = Mock(
+            side_effect=lambda name: DataArray(adaptor.inputs[name], data[name]))
+        adaptor.convert_with_coefficients = Mock(wraps=adaptor.convert_with_coefficients)
+
+        adaptor.simulate(data_handle)
+
+        assert data_handle.read_coefficients.call_count == 2
+        assert adaptor.convert_with_coefficients.call_count == 2
+        assert data_handle.set_results_many.call_count == 1
+        actual = data_handle.set_results_many.call_args[0][0]
+        assert list(actual) == ['electricity', 'gas', 'heat', 'water']
+        np.testing.assert_allclose(actual['electricity'], np.array([[3.], [7.]]))
+        np.testing.assert_allclose(actual['heat'], np.array([[9.], [21.]]))
+        np.testing.assert_allclose(actual['water'], np.array([[4.], [8.]]))
@@ -0,0 +1,113 @@
+"""Test chained conversion of several dimensions
+"""
+from unittest.mock import Mock
+
+import numpy as np
+from pytest import fixture, raises
+from smif.convert import ChainedAdaptor, IntervalAdaptor, RegionAdaptor
+from smif.data_layer.data_array import DataArray
+from smif.exception import SmifDataMismatchError, SmifDataNotFoundError
+from smif.metadata import Spec
+
+
+@fixture(scope='function')
+def from_spec(regions_half_squares, months):
+    return Spec(
+        name='test-var',
+        dtype='float',
+        dims=['half_squares', 'months'],
+        coords={'half_squares': regions_half_squares, 'months': months},
+        unit='liter'
+    )
+
+
+@fixture(scope='function')
+def to_spec(regions_rect, seasons):
+    return Spec(
+        name='test-var',
+        dtype='float',
+        dims=['seasons', 'rect'],
+        coords={'seasons': seasons, 'rect': regions_rect},
+        unit='milliliter'
+    )
+
+
+@fixture(scope='function')
+def data_handle():
+    data_handle = Mock()
+    data_handle.read_unit_definitions = Mock(return_value=[])
+    data_handle.read_coefficients = Mock(side_effect=SmifDataNotFoundError)
+    data_handle.read_dimension_geometries = Mock(return_value=None)
+    return data_handle
+
+
+class TestChainedAdaptor:
+    def test_plan_smallest_intermediate(self, from_spec, to_spec):
+        """Months to seasons first leaves 2x4 values, rather than 1x12 for regions first
+        """
+        adaptor = ChainedAdaptor('convert')
+        plan = adaptor.plan(from_spec, to_spec)
+
+        assert [(step.from_dim, step.to_dim) for step in plan] == [
+            ('months', 'seasons'), ('half_squares', 'rect')]
+        assert isinstance(plan[0].adaptor, IntervalAdaptor)
+        assert isinstance(plan[1].adaptor, RegionAdaptor)
+
+    def test_simulate(self, from_spec, to_spec, data_handle):
+        """Regions, intervals and units should be converted in one step, matching the
+        single dimension adaptors
+        """
+        adaptor = ChainedAdaptor('convert')
+        adaptor.add_input(from_spec)
+        adaptor.add_output(to_spec)
+        data = np.arange(24, dtype=float).reshape((2, 12))
+        data_handle.get_data = Mock(return_value=DataArray(from_spec, data))
+
+        adaptor.before_model_run(data_handle)
+        adaptor.simulate(data_handle)
+
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
+        region_coefficients = RegionAdaptor('region').generate_coefficients(
+            Spec(dtype='float', coords=[from_spec.dim_coords('half_squares')]),
+            Spec(dtype='float', coords=[to_spec.dim_coords('rect')]))
+        interval_coefficients = IntervalAdaptor('interval').generate_coefficients(
+            Spec(dtype='float', coords=[from_spec.dim_coords('months')]),
+            Spec(dtype='float', coords=[to_spec.dim_coords('seasons')]))
+        expected = (region_coefficients.T @ data @ interval_coefficients).T * 1000
+        np.testing.assert_allclose(actual, expected)
+
+        # coefficients are saved for each pair of dimensions, not intermediate results
+        assert data_handle.write_coefficients.call_count == 2
+        assert data_handle.set_results_many.call_count == 1
+
+    def test_offset_units_convert_source(self, regions_half_squares, regions_rect,
+                                         data_handle):
+        """Conversions with an offset should apply to the source values
+        """
+        from_spec = Spec(name='t', dtype='float', dims=['half_squares'],
+                         coords={'half_squares': regions_half_squares}, unit='degC')
+        to_spec = Spec(name='t', dtype='float', dims=['rect'],
+                       coords={'rect': regions_rect}, unit='degF')
+        adaptor = ChainedAdaptor('convert')
+        adaptor.before_model_run(data_handle)
+        coefficients = adaptor.get_coefficients(data_handle, from_spec, to_spec)
+
+        actual = adaptor.convert(
+            DataArray(from_spec, np.array([0., 100.])), to_spec, coefficients)
+        np.testing.assert_allclose(actual, np.array([32. + 212.]))
+
+    def test_unmatched_dims(self, from_spec, regions_rect):
+        to_spec = Spec(name='test-var', dtype='float', dims=['rect'],
+                       coords={'rect': regions_rect})
+        adaptor = ChainedAdaptor('convert')
+        with raises(SmifDataMismatchError) as ex:
+            adaptor.plan(from_spec, to_spec)
+        assert 'Cannot match dimensions to convert' in str(ex.value)
+
+    def test_no_adaptor(self, from_spec, to_spec):
+        to_spec = Spec(name='test-var', dtype='float', dims=['seasons', 'other'],
+                       coords={'seasons': to_spec.dim_elements('seasons'), 'other': ['x']})
+        adaptor = ChainedAdaptor('convert')
+        with raises(SmifDataMismatchError) as ex:
+            adaptor.plan(from_spec, to_spec)
+        assert 'No adaptor found to convert other' in str(ex.value)
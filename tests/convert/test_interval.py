@@ -5,8 +5,9 @@ from unittest.mock import Mock
 import numpy as np
 from numpy.testing import assert_equal
 from pytest import raises
+from scipy import sparse
 from smif.convert.interval import Interval, IntervalAdaptor, IntervalSet
-from smif.convert.register import NDimensionalRegister
+from smif.convert.register import NDimensionalRegister, as_coefficients
 from smif.data_layer.data_array import DataArray
 from smif.exception import SmifDataNotFoundError
 from smif.metadata import Spec
@@ -49,7 +50,7 @@ class TestTimeRegisterConversion:
         data_handle.read_coefficients = Mock(return_value=actual_coefficients)
 
         adaptor.simulate(data_handle)
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
         expected = monthly_data_as_seasons
 
         assert np.allclose(actual, expected, rtol=1e-05, atol=1e-08)
@@ -87,7 +88,7 @@ class TestTimeRegisterConversion:
         data_handle.read_coefficients = Mock(return_value=actual_coefficients)
 
         adaptor.simulate(data_handle)
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
         expected = np.array([24])
 
         assert np.allclose(actual, expected, rtol=1e-05, atol=1e-08)
@@ -125,7 +126,7 @@ class TestTimeRegisterConversion:
         data_handle.read_coefficients = Mock(return_value=actual_coefficients)
 
         adaptor.simulate(data_handle)
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
         expected = np.array([3, 3, 3, 3])
         np.testing.assert_array_equal(actual, expected)
 
@@ -160,7 +161,7 @@ class TestTimeRegisterConversion:
         data_handle.read_coefficients = Mock(return_value=actual_coefficients)
 
         adaptor.simulate(data_handle)
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
         expected = np.array([1.033333, 0.933333, 1.01087, 0.978261,
                              1.01087, 0.978261, 1.01087, 1.01087,
                              0.989011, 1.021978, 0.989011, 1.033333])
@@ -300,7 +301,7 @@ class TestConvertor:
         data_handle.read_coefficients = Mock(side_effect=SmifDataNotFoundError)
 
         adaptor.simulate(data_handle)
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
 
         assert np.allclose(actual, expected)
 
@@ -384,7 +385,7 @@ class TestConvertor:
         data_handle.read_coefficients = Mock(side_effect=SmifDataNotFoundError)
 
         adaptor.simulate(data_handle)
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
 
         assert np.allclose(actual, expected)
 
@@ -424,7 +425,7 @@ class TestConvertor:
         data_handle.read_coefficients = Mock(side_effect=SmifDataNotFoundError)
 
         adaptor.simulate(data_handle)
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
 
         assert np.allclose(actual, expected)
 
@@ -470,7 +471,7 @@ class TestConvertor:
         data_handle.read_coefficients = Mock(side_effect=SmifDataNotFoundError)
 
         adaptor.simulate(data_handle)
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
 
         assert np.allclose(actual, expected)
 
@@ -613,6 +614,13 @@ class TestInterval:
         actual = interval.bounds
         assert actual == [(1416, 2160), (2160, 2880), (2880, 3624)]
 
+    def test_bounds_reset_on_set_interval(self):
+        interval = Interval('1', ('PT0H', 'PT1H'))
+        assert interval.bounds == [(0, 1)]
+
+        interval.interval = ('PT1H', 'PT2H')
+        assert interval.bounds == [(0, 1), (1, 2)]
+
 
 class TestIntervalSet:
     """IntervalSet should map to a Coordinates definition
@@ -730,6 +738,57 @@ class TestTimeRegisterCoefficients:
         expected = month_to_season_coefficients
         assert np.allclose(actual, expected, rtol=1e-05, atol=1e-08)
 
+    def test_coeff_sparse(self):
+        """Large, mostly-zero coefficients should be generated as a sparse matrix
+        """
+        hours = [
+            {'name': str(hour), 'interval': [('PT{}H'.format(hour), 'PT{}H'.format(hour + 1))]}
+            for hour in range(200)
+        ]
+        register = NDimensionalRegister()
+        register.register(IntervalSet('hours', hours))
+        register.register(IntervalSet('same_hours', hours))
+
+        actual = register.get_coefficients('hours', 'same_hours')
+
+        assert sparse.isspmatrix_csr(actual)
+        assert_equal(actual.toarray(), np.identity(200))
+
+    def test_coeff_sparse_multiple_bounds(self):
+        """Intervals with several bounds should not have their sparse coefficients counted
+        once per bound
+        """
+        intervals = [
+            {'name': str(idx), 'interval': [
+                ('PT{}H'.format(idx), 'PT{}H'.format(idx + 1)),
+                ('PT{}H'.format(idx + 100), 'PT{}H'.format(idx + 101))
+            ]}
+            for idx in range(100)
+        ]
+        register = NDimensionalRegister()
+        register.register(IntervalSet('pairs', intervals))
+        register.register(IntervalSet('same_pairs', intervals))
+
+        actual = register.get_coefficients('pairs', 'same_pairs')
+
+        assert sparse.isspmatrix_csr(actual)
+        assert_equal(actual.toarray(), np.identity(100))
+
+    def test_as_coefficients_duplicates(self):
+        """Repeated positions should keep the last value, for sparse and dense coefficients
+        """
+        rows = [0, 1, 1, 2]
+        cols = [0, 1, 1, 2]
+        values = [1., 0.5, 1., 1.]
+
+        dense = as_coefficients(rows, cols, values, (3, 3))
+        sparse_coefficients = as_coefficients(rows, cols, values, (300, 300))
+
+        assert_equal(dense, np.identity(3))
+        assert sparse.isspmatrix_csr(sparse_coefficients)
+        assert_equal(sparse_coefficients.toarray()[:3, :3], np.identity(3))
+        assert sparse_coefficients.nnz == 3
+
 
 class TestValidation:
 
@@ -737,7 +796,7 @@ class TestValidation:
         intervals = IntervalSet('remap_months', remap_months)
 
         actual = intervals._get_hourly_array()
-        expected = np.ones(8760, dtype=np.int)
+        expected = np.ones(8760, dtype=int)
         assert_equal(actual, expected)
 
     def test_validate_intervals_passes(self, remap_months):
@@ -846,3 +905,26 @@ class TestProportions:
         actual = remap_set.get_proportion(0, to_interval)
         expected = 1.0333333333333
         np.testing.assert_allclose(actual, expected, rtol=1e-3)
+
+    def test_get_proportions_matches_pairwise(self, months, seasons, remap_months):
+        """Proportions for a whole pair of sets should match those for each pair of
+        intervals
+        """
+        sets = [
+            IntervalSet('months', months),
+            IntervalSet('seasons', seasons),
+            IntervalSet('remap_months', remap_months)
+        ]
+        for from_set in sets:
+            for to_set in sets:
+                rows, cols, values = from_set.get_proportions(to_set)
+                actual = np.zeros((len(from_set), len(to_set)))
+                actual[rows, cols] = values
+
+                expected = np.zeros((len(from_set), len(to_set)))
+                for to_idx, to_interval in enumerate(to_set.data):
+                    for from_idx in from_set.intersection(to_interval):
+                        expected[from_idx, to_idx] = \
+                            from_set.get_proportion(from_idx, to_interval)
+
+                np.testing.assert_allclose(actual, expected)
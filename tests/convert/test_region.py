@@ -5,9 +5,12 @@ from unittest.mock import Mock
 
 import numpy as np
 from pytest import fixture, raises
+from shapely.geometry import shape
 from smif.convert.region import RegionAdaptor, RegionSet
 from smif.convert.register import NDimensionalRegister
 from smif.data_layer.data_array import DataArray
+from smif.data_layer.file.spatial_cache import SpatialCache
+from smif.exception import SmifDataNotFoundError
 from smif.metadata import Spec
 
 
@@ -65,7 +68,7 @@ class TestRegionAdaptor:
         data_handle.read_coefficients = Mock(return_value=actual_coefficients)
         adaptor.simulate(data_handle)
 
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
         expected = np.array([48])  # area zero
         assert np.allclose(actual, expected)
 
@@ -107,10 +110,32 @@ class TestRegionAdaptor:
         data_handle.read_coefficients = Mock(return_value=actual_coefficients)
         adaptor.simulate(data_handle)
 
-        actual = data_handle.set_results.call_args[0][1]
+        actual = data_handle.set_results_many.call_args[0][0]['test-var']
         expected = np.ones((2, 12)) / 2  # areas a-b, months 1-12
         assert np.allclose(actual, expected)
 
+    def test_coefficients_from_geometries(self, regions_rect, regions_half_squares):
+        """Shapes parsed by the store should be passed to RegionSets
+        """
+        adaptor = RegionAdaptor('test-square-half')
+        from_spec = Spec(name='test-var', dtype='float', dims=['half_squares'],
+                         coords={'half_squares': regions_half_squares})
+        to_spec = Spec(name='test-var', dtype='float', dims=['rect'],
+                       coords={'rect': regions_rect})
+        geometries = {}
+        for element in regions_half_squares + regions_rect:
+            geometry = shape(element['feature']['geometry'])
+            geometries[element['name']] = (geometry.wkb, geometry.bounds)
+
+        data_handle = Mock()
+        data_handle.read_coefficients = Mock(side_effect=SmifDataNotFoundError)
+        data_handle.read_dimension_geometries = Mock(return_value=geometries)
+        actual = adaptor.get_coefficients(data_handle, from_spec, to_spec)
+
+        np.testing.assert_allclose(actual, np.ones((2, 1)), rtol=1e-3)
+        data_handle.read_dimension_geometries.assert_any_call('half_squares')
+        data_handle.read_dimension_geometries.assert_any_call('rect')
+
 
 def test_proportion(regions):
     """Sense-check proportion calculator
@@ -144,11 +169,32 @@ class TestRegionSet():
     def test_create(self, regions):
         rset = RegionSet('test', regions)
         assert rset.name == 'test'
+        assert rset.max_workers == 1
         assert len(rset) == 3
         assert rset[0].name == 'unit'
         assert rset[1].name == 'half'
         assert rset[2].name == 'two'
 
+    def test_create_from_cache(self, regions, tmpdir):
+        """Shapes of elements read through a spatial cache should load from WKB
+        """
+        regions_file = tmpdir.join('regions.geojson')
+        regions_file.write('regions')
+        cache = SpatialCache(str(tmpdir.join('cache')))
+        cache.read(str(regions_file), lambda filepath: regions)
+
+        read_elements = Mock(side_effect=AssertionError("should read from cache"))
+        cache = SpatialCache(str(tmpdir.join('cache')))
+        elements = cache.read(str(regions_file), read_elements)
+        assert elements == regions
+
+        rset = RegionSet('test', elements, geometries=cache.geometries(str(regions_file)))
+        expected = RegionSet('test', regions)
+        assert rset.get_entry_names() == expected.get_entry_names()
+        for actual_region, expected_region in zip(rset, expected):
+            assert actual_region.shape.equals(expected_region.shape)
+        assert rset.intersection(expected[1]) == expected.intersection(expected[1])
+
     def test_get_names(self, regions):
         rset = RegionSet('test', regions)
         actual = rset.get_entry_names()
@@ -323,6 +369,52 @@ class TestRegionRegister():
         np.testing.assert_equal(converted, expected)
 
 
+class TestGetProportions:
+
+    def test_get_proportions(self, regions_half_triangles, regions_half_squares):
+        from_set = RegionSet('half_triangles', regions_half_triangles)
+        to_set = RegionSet('half_squares', regions_half_squares)
+
+        rows, cols, values = from_set.get_proportions(to_set)
+        actual = np.zeros((2, 2))
+        actual[rows, cols] = values
+
+        np.testing.assert_equal(actual, np.array([[0.75, 0.25], [0.25, 0.75]]))
+
+    def test_get_proportions_parallel(self, monkeypatch, regions_half_triangles,
+                                      regions_half_squares):
+        """Proportions calculated on worker processes should match
+        """
+        monkeypatch.setattr('smif.convert.region.PARALLEL_MIN_SIZE', 1)
+        from_set = RegionSet('half_triangles', regions_half_triangles, max_workers=2)
+        to_set = RegionSet('half_squares', regions_half_squares)
+
+        expected = RegionSet('half_triangles', regions_half_triangles, max_workers=1) \
+            .get_proportions(to_set)
+        actual = from_set.get_proportions(to_set)
+
+        for actual_array, expected_array in zip(actual, expected):
+            np.testing.assert_equal(actual_array, expected_array)
+
+    def test_invalid_shape(self, regions_half_squares):
+        """Invalid shapes should raise an error
+        """
+        bowtie = {
+            'type': 'Feature',
+            'properties': {'name': 'bowtie'},
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]
+            }
+        }
+        from_set = RegionSet('bowtie', [{'name': 'bowtie', 'feature': bowtie}])
+        to_set = RegionSet('half_squares', regions_half_squares)
+
+        with raises(RuntimeError) as ex:
+            from_set.get_proportions(to_set)
+        assert "Shape bowtie from bowtie is not valid" in str(ex)
+
+
 class TestGetCoefficients:
 
     def test_get_coefficients(self, register):
@@ -3,6 +3,7 @@
 from unittest.mock import Mock
 
 import numpy as np
+from pytest import raises
 from smif.convert.unit import UnitAdaptor
 from smif.data_layer.data_array import DataArray
 from smif.metadata import Spec
@@ -33,7 +34,7 @@ def test_convert_unit():
     ))
     adaptor.simulate(data_handle)
 
-    actual = data_handle.set_results.call_args[0][1]
+    actual = data_handle.set_results_many.call_args[0][0]['test_variable']
     expected = np.array([1000], dtype=float)
     np.testing.assert_allclose(actual, expected)
 
@@ -67,6 +68,56 @@ def test_convert_custom():
     adaptor.before_model_run(data_handle)  # must have run before_model_run to register units
     adaptor.simulate(data_handle)
 
-    actual = data_handle.set_results.call_args[0][1]
+    actual = data_handle.set_results_many.call_args[0][0]['test_variable']
     expected = np.array([2], dtype=float)
     np.testing.assert_allclose(actual, expected)
+
+
+def test_conversion_resolved_once():
+    """Scale and offset should be found once, in before_model_run
+    """
+    data_handle = Mock()
+    data_handle.read_unit_definitions = Mock(return_value=[])
+    coords = {'site': ['a', 'b', 'c']}
+    from_spec = Spec(name='temperature', dtype='float', unit='degC', dims=['site'],
+                     coords=coords)
+    to_spec = Spec(name='temperature', dtype='float', unit='degF', dims=['site'],
+                   coords=coords)
+
+    adaptor = UnitAdaptor('test-degC-degF')
+    adaptor.add_input(from_spec)
+    adaptor.add_output(to_spec)
+    adaptor.before_model_run(data_handle)
+
+    scale, offset = adaptor.get_conversion('degC', 'degF')
+    np.testing.assert_allclose([scale, offset], [1.8, 32])
+
+    data = np.array([-40, 0, 100], dtype=float)
+    adaptor._register = None  # conversion does not need pint
+    actual = adaptor.convert(DataArray(from_spec, data), to_spec, None)
+    np.testing.assert_allclose(actual, np.array([-40, 32, 212]))
+    np.testing.assert_equal(data, np.array([-40, 0, 100]))
+
+
+def test_convert_non_affine():
+    """Logarithmic units should be converted by pint
+    """
+    coords = {'site': ['a', 'b']}
+    from_spec = Spec(name='power', dtype='float', unit='dBm', dims=['site'], coords=coords)
+    to_spec = Spec(name='power', dtype='float', unit='mW', dims=['site'], coords=coords)
+    adaptor = UnitAdaptor('test-dBm-mW')
+
+    assert adaptor.get_conversion('dBm', 'mW') is None
+    actual = adaptor.convert(DataArray(from_spec, np.array([0., 10.])), to_spec, None)
+    np.testing.assert_allclose(actual, np.array([1, 10]))
+
+
+def test_convert_undefined():
+    adaptor = UnitAdaptor('test-undefined')
+    with raises(ValueError) as ex:
+        adaptor.get_conversion('not_a_unit', 'GW')
+    assert 'Cannot convert from undefined unit not_a_unit' in str(ex.value)
+
+    with raises(ValueError) as ex:
+        adaptor.get_conversion('GW', 'liter')
+    assert 'Cannot convert unit from GW to liter' in str(ex.value)
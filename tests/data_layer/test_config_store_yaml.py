@@ -1,6 +1,9 @@
 """Test YAML config store
 """
+import os
+
 from pytest import fixture, raises
+from smif.data_layer.file.config_snapshot import ConfigSnapshot
 from smif.data_layer.file.file_config_store import YamlConfigStore
 from smif.exception import (SmifDataExistsError, SmifDataMismatchError,
                             SmifDataNotFoundError)
@@ -375,3 +378,82 @@ class TestScenarios:
         with raises(SmifDataNotFoundError) as ex:
             config_handler.read_scenario('missing')
         assert "Scenario 'missing' not found" in str(ex)
+
+
+class TestSnapshot:
+    """Compiled configuration should be read until the YAML files change
+    """
+    def test_read_from_snapshot(self, setup_folder_structure, config_handler,
+                                get_sector_model):
+        """Should read unchanged files from the snapshot, as plain data
+        """
+        expected = config_handler.read_model(get_sector_model['name'])
+        count = ConfigSnapshot(str(setup_folder_structure)).compile()
+        assert count > 0
+
+        handler = YamlConfigStore(str(setup_folder_structure))
+        actual = handler.read_model(get_sector_model['name'])
+        assert actual == expected
+        assert type(actual) is dict
+        assert handler._cache.snapshot.read(os.path.join(
+            handler.config_folders['sector_models'], 'energy_demand.yml')) == actual
+
+        # each read is a copy
+        actual['description'] = 'changed'
+        assert handler.read_model(get_sector_model['name']) == expected
+
+    def test_snapshot_invalidated(self, setup_folder_structure, config_handler,
+                                  get_sector_model):
+        """Should read changed files from YAML
+        """
+        ConfigSnapshot(str(setup_folder_structure)).compile()
+        handler = YamlConfigStore(str(setup_folder_structure))
+
+        model = handler.read_model(get_sector_model['name'])
+        model['description'] = 'a changed description'
+        handler.update_model(model['name'], model)
+        assert handler.read_model(model['name'])['description'] == 'a changed description'
+
+        path = os.path.join(handler.config_folders['sector_models'], 'energy_demand.yml')
+        with raises(KeyError):
+            handler._cache.snapshot.read(path)
+
+
+class TestCache:
+    """Parsed config should be cached until written or changed
+    """
+    def test_read_cached(self, config_handler, get_sector_model):
+        """Should parse once, then return copies from the cache
+        """
+        first = config_handler.read_model(get_sector_model['name'])
+        first['description'] = 'changed'
+        second = config_handler.read_model(get_sector_model['name'])
+        assert second['description'] == get_sector_model['description']
+        assert config_handler.cache_info().hits >= 1
+
+    def test_invalidate_on_write(self, config_handler, get_sector_model):
+        """Should read again after the store writes a file
+        """
+        model = config_handler.read_model(get_sector_model['name'])
+        model['description'] = 'a changed description'
+        config_handler.update_model(model['name'], model)
+        actual = config_handler.read_model(model['name'])
+        assert actual['description'] == 'a changed description'
+
+    def test_invalidate_on_change(self, config_handler, get_sector_model):
+        """Should read again after the file is changed by something else
+        """
+        config_handler.read_model(get_sector_model['name'])
+        misses = config_handler.cache_info().misses
+
+        path = os.path.join(
+            config_handler.config_folders['sector_models'], 'energy_demand.yml')
+        with open(path, 'r') as file_handle:
+            contents = file_handle.read()
+        with open(path, 'w') as file_handle:
+            file_handle.write(contents.replace(
+                get_sector_model['description'], 'an edited description'))
+
+        actual = config_handler.read_model(get_sector_model['name'])
+        assert actual['description'] == 'an edited description'
+        assert config_handler.cache_info().misses == misses + 1
@@ -3,6 +3,7 @@
 # pylint: disable=redefined-outer-name
 import numpy
 import pandas as pd
+import pyarrow as pa
 import xarray as xr
 from numpy.testing import assert_array_equal
 from pytest import fixture, raises
@@ -130,6 +131,76 @@ class TestDataArray():
         assert_array_equal(actual.data, expected.data)
         assert actual == expected
 
+    def test_from_df_unordered(self, small_da, small_da_df):
+        """Should create a DataArray from a DataFrame with rows in any order
+        """
+        shuffled = small_da_df.sample(frac=1, random_state=1)
+        actual = DataArray.from_df(small_da.spec, shuffled)
+        assert actual == small_da
+
+    def test_as_df_shares_data(self, small_da):
+        """Should wrap the data and the index cached on the spec, without copying
+        """
+        actual = small_da.as_df()
+        assert numpy.shares_memory(actual.values, small_da.data)
+        assert actual.index.equals(small_da.spec.index)
+        assert small_da.spec.index is small_da.spec.index
+
+        # changing the DataFrame index does not change the cached index
+        actual.index.names = ['x', 'y', 'z']
+        assert small_da.spec.index.names == ['a', 'b', 'c']
+
+    def test_as_xarray_shares_data(self, small_da):
+        """Should wrap the data without copying
+        """
+        assert numpy.shares_memory(small_da.as_xarray().data, small_da.data)
+
+    def test_from_arrow(self, small_da, small_da_df):
+        """Should create a read-only DataArray backed by the table, from rows in order
+        """
+        table = pa.Table.from_pandas(small_da_df.reset_index())
+        actual = DataArray.from_arrow(small_da.spec, table)
+        assert actual == small_da
+        assert not actual.data.flags.writeable
+
+    def test_from_arrow_unordered(self, small_da, small_da_df):
+        """Should create a DataArray from a table with rows in any order, or missing rows
+        """
+        shuffled = small_da_df.sample(frac=1, random_state=1).reset_index()
+        actual = DataArray.from_arrow(small_da.spec, pa.Table.from_pandas(shuffled))
+        assert actual == small_da
+
+        partial = shuffled[shuffled.test_data != 5]
+        actual = DataArray.from_arrow(small_da.spec, pa.Table.from_pandas(partial))
+        assert numpy.isnan(actual.data[0, 1, 1])
+        assert numpy.nansum(actual.data) == small_da.data.sum() - 5
+
+    def test_from_arrow_errors(self, small_da, small_da_df):
+        """Should report unexpected and duplicate coordinates as from a DataFrame
+        """
+        df = small_da_df.reset_index()
+        extra = df.copy()
+        extra.loc[0, 'b'] = 'b4'
+        with raises(SmifDataMismatchError) as ex:
+            DataArray.from_arrow(small_da.spec, pa.Table.from_pandas(extra))
+        assert "dimension 'b': ['b4']" in str(ex.value)
+
+        duplicate = pd.concat([df, df.iloc[:1]])
+        with raises(SmifDataMismatchError) as ex:
+            DataArray.from_arrow(small_da.spec, pa.Table.from_pandas(duplicate))
+        assert "duplicate values" in str(ex.value)
+
+    def test_from_df_partial_int(self):
+        """Should promote integer data to float when filling out missing data
+        """
+        spec = Spec(name='test', dims=['a'], coords={'a': [1, 2]}, dtype='int')
+        df = pd.DataFrame([{'a': 2, 'test': 3}]).set_index('a')
+
+        actual = DataArray.from_df(spec, df)
+
+        assert actual.data.dtype == numpy.float64
+        assert_array_equal(actual.data, numpy.array([numpy.nan, 3]))
+
     def test_combine(self, small_da, data):
         """Should override values where present (use case: full array of default values,
         overridden by a partial array of specific values).
@@ -153,6 +224,43 @@ class TestDataArray():
         assert small_da == expected
         assert_array_equal(small_da.data, expected.data)
 
+    def test_combine_many(self, small_da, data):
+        """Should override values from each in turn, later values taking precedence
+        """
+        first_data = numpy.full(small_da.shape, numpy.nan)
+        first_data[0, 0, 1] = 99
+        first_data[1, 2, 3] = 98
+        second_data = numpy.full(small_da.shape, numpy.nan)
+        second_data[1, 2, 3] = 97
+        others = [DataArray(small_da.spec, first_data), DataArray(small_da.spec, second_data)]
+
+        expected = DataArray(small_da.spec, small_da.data.copy())
+        for other in others:
+            expected.update(other)
+
+        original = small_da.data
+        small_da.update_many(others)
+
+        assert small_da == expected
+        assert small_da.data[0, 0, 1] == 99
+        assert small_da.data[1, 2, 3] == 97
+        # updated in place
+        assert small_da.data is original
+
+    def test_combine_int(self):
+        """Should hold updated values which do not fit the original data type
+        """
+        spec = Spec(name='test', dims=['a'], coords={'a': [1, 2]}, dtype='int')
+        da = DataArray(spec, numpy.array([1, 2]))
+        da.update(DataArray(spec, numpy.array([numpy.nan, 2.5])))
+        assert_array_equal(da.data, numpy.array([1, 2.5]))
+
+        # zero-dimensional data, as read from a single value
+        spec = Spec(name='test', dtype='int')
+        da = DataArray(spec, numpy.int64(1))
+        da.update_many([DataArray(spec, numpy.float64(2.5)), DataArray(spec, numpy.nan)])
+        assert da.data == 2.5
+
     def test_as_xarray(self, small_da, small_da_xr):
         actual = small_da.as_xarray()
         xr.testing.assert_equal(actual, small_da_xr)
@@ -368,6 +476,14 @@ class TestMissingData:
               "total, from dims of length {a: 2, b: 3, c: 4}"
         assert msg in str(ex)
 
+    def test_validate_without_dataframe(self, small_da, monkeypatch):
+        """Should check full data without building a DataFrame
+        """
+        def as_df():
+            raise AssertionError("DataFrame should not be built")
+        monkeypatch.setattr(small_da, 'as_df', as_df)
+        small_da.validate_as_full()
+
     def test_missing_data_message(self, small_da):
         """Should check for NaNs and raise SmifDataError
         """
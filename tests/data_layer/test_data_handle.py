@@ -9,7 +9,7 @@ from pytest import fixture, raises
 
 from smif.data_layer import DataHandle
 from smif.data_layer.data_array import DataArray
-from smif.data_layer.data_handle import ResultsHandle
+from smif.data_layer.data_handle import ResultsHandle, RunContext
 from smif.exception import (SmifDataError, SmifDataMismatchError,
                             SmifDataNotFoundError, SmifTimestepResolutionError)
 from smif.metadata import Spec
@@ -460,6 +460,23 @@ class TestDataHandle():
         np.testing.assert_equal(actual.as_ndarray(), data)
         assert actual == da
 
+    def test_set_results_many(self, mock_store, mock_model_with_conversion):
+        """should write several outputs at once
+        """
+        data = np.array([[1.0], [4.0]])
+        data_handle = DataHandle(mock_store, 1, 2015, [2015, 2020], mock_model_with_conversion)
+        mock_store.write_results_many = Mock(wraps=mock_store.write_results_many)
+
+        data_handle.set_results_many({'test': data})
+
+        assert mock_store.write_results_many.call_count == 1
+        actual = mock_store.read_results(
+            1, 'test_convertor', mock_model_with_conversion.outputs['test'], 2015, None)
+        np.testing.assert_equal(actual.as_ndarray(), data)
+
+        with raises(KeyError):
+            data_handle.set_results_many({'not_an_output': data})
+
     def test_set_data_wrong_shape(self, mock_store, mock_model_with_conversion):
         """should allow write access to output data
         """
@@ -804,6 +821,144 @@ class TestDataHandleGetParameters:
         assert actual == expected
 
 
+class TestRunContext:
+
+    def test_shared_context_reads_config_once(self, mock_store, mock_model):
+        """DataHandles sharing a context should not re-read configuration
+        """
+        context = RunContext(mock_store, 1)
+        mock_store.read_model_run = Mock(side_effect=AssertionError)
+        mock_store.read_sos_model = Mock(side_effect=AssertionError)
+
+        first = DataHandle(mock_store, 1, 2015, [2015, 2020], mock_model, context=context)
+        second = DataHandle(mock_store, 1, 2020, [2015, 2020], mock_model, context=context)
+        derived = first.derive_for(mock_model)
+
+        assert first.get_parameters() == second.get_parameters()
+        assert derived._context is context
+
+    def test_parameters_loaded_once(self, mock_store, mock_model):
+        """Parameter defaults should be read once per model
+        """
+        context = RunContext(mock_store, 1)
+        read_default = Mock(wraps=mock_store.read_model_parameter_default)
+        mock_store.read_model_parameter_default = read_default
+
+        DataHandle(mock_store, 1, 2015, [2015, 2020], mock_model, context=context)
+        n_calls = read_default.call_count
+        DataHandle(mock_store, 1, 2020, [2015, 2020], mock_model, context=context)
+
+        assert n_calls == len(mock_model.parameters)
+        assert read_default.call_count == n_calls
+
+    def test_shared_parameters_read_only(self, mock_store, mock_model):
+        """Parameter values shared between DataHandles should not be writeable
+        """
+        context = RunContext(mock_store, 1)
+        parameter = context.get_parameters(mock_model)['smart_meter_savings']
+
+        with raises(ValueError):
+            parameter.data[()] = 0
+
+    def test_parameters_leave_store_unchanged(self, mock_store, mock_model):
+        """Applying narrative variants should not change the defaults held by the store
+        """
+        mock_store.update_model_run(1, {
+            'name': 1,
+            'narratives': {'test_narrative': ['high_tech_dsm']},
+            'sos_model': 'test_sos_model',
+            'scenarios': {}})
+        default = mock_store.read_model_parameter_default(
+            mock_model.name, 'smart_meter_savings')
+        expected = default.data.copy()
+
+        parameter = RunContext(mock_store, 1).get_parameters(mock_model)[
+            'smart_meter_savings']
+
+        assert parameter.data == 99
+        assert default.data == expected
+        assert default.data.flags.writeable
+        assert mock_store.read_model_parameter_default(
+            mock_model.name, 'smart_meter_savings').data == expected
+
+    def test_coefficients_cached(self, mock_store, mock_model):
+        """Coefficients should be read from the store once, for the most recently used
+        """
+        context = RunContext(mock_store, 1, coefficient_cache_size=1)
+        mock_store.write_coefficients('a', 'b', np.ones(2))
+        mock_store.write_coefficients('b', 'c', np.zeros(2))
+        read_coefficients = Mock(wraps=mock_store.read_coefficients)
+        mock_store.read_coefficients = read_coefficients
+
+        first = DataHandle(mock_store, 1, 2015, [2015, 2020], mock_model, context=context)
+        second = DataHandle(mock_store, 1, 2020, [2015, 2020], mock_model, context=context)
+        np.testing.assert_equal(first.read_coefficients('a', 'b'), np.ones(2))
+        np.testing.assert_equal(second.read_coefficients('a', 'b'), np.ones(2))
+        assert read_coefficients.call_count == 1
+
+        # least recently used are dropped
+        second.read_coefficients('b', 'c')
+        first.read_coefficients('a', 'b')
+        assert read_coefficients.call_count == 3
+
+    def test_parameters_copied_per_data_handle(self, mock_store, mock_model):
+        """Each DataHandle should get its own writeable copy of shared parameters
+        """
+        context = RunContext(mock_store, 1)
+        first = DataHandle(mock_store, 1, 2015, [2015, 2020], mock_model, context=context)
+        second = DataHandle(mock_store, 1, 2020, [2015, 2020], mock_model, context=context)
+        expected = second.get_parameter('smart_meter_savings').data.copy()
+
+        parameter = first.get_parameter('smart_meter_savings')
+        parameter.data[()] = 0
+
+        assert first.get_parameter('smart_meter_savings') is parameter
+        assert first.get_parameters()['smart_meter_savings'] is parameter
+        assert second.get_parameter('smart_meter_savings').data == expected
+
+    def test_results_handed_to_dependent_model(self, mock_store, mock_model):
+        """Results should be read from memory by dependent models, until every dependency
+        has read them
+        """
+        source_model = EmptySectorModel.from_dict(mock_store.read_model('test_source'))
+        context = RunContext(mock_store, 1)
+        source = DataHandle(mock_store, 1, 2015, [2015, 2020], source_model, context=context)
+        sink = DataHandle(mock_store, 1, 2015, [2015, 2020], mock_model, context=context)
+        data = np.array([[1], [2]])
+        source.set_results('test', data)
+
+        # results are still written to the store
+        stored = mock_store.read_results(1, 'test_source', source_model.outputs['test'], 2015)
+        np.testing.assert_equal(stored.data, np.array([[1], [2]]))
+
+        # results are copied, so the model may change its array
+        data[0, 0] = 100
+
+        mock_store.read_results = Mock(side_effect=AssertionError)
+        actual = sink.get_data('population')
+        assert actual.name == 'population'
+        np.testing.assert_equal(actual.data, np.array([[1], [2]]))
+
+        # the only dependency has read the results, so they are handed over and dropped
+        actual.data[0, 0] = 0
+        assert not context._results
+        assert context._results_nbytes == 0
+
+    def test_results_cache_size(self, mock_store, mock_model):
+        """Results larger than the cache should be read from the store
+        """
+        source_model = EmptySectorModel.from_dict(mock_store.read_model('test_source'))
+        context = RunContext(mock_store, 1, results_cache_size=0)
+        source = DataHandle(mock_store, 1, 2015, [2015, 2020], source_model, context=context)
+        sink = DataHandle(mock_store, 1, 2015, [2015, 2020], mock_model, context=context)
+        source.set_results('test', np.array([[1], [2]]))
+        mock_store.read_results = Mock(wraps=mock_store.read_results)
+
+        actual = sink.get_data('population')
+        np.testing.assert_equal(actual.data, np.array([[1], [2]]))
+        assert mock_store.read_results.call_count == 1
+
+
 class TestDataHandleCoefficients:
     """Tests the interface for reading and writing coefficients
     """
@@ -2,6 +2,7 @@
 """
 import numpy as np
 from pytest import fixture, mark, param, raises
+from scipy import sparse
 from smif.data_layer.data_array import DataArray
 from smif.data_layer.database_interface import DbDataStore
 from smif.data_layer.file.file_data_store import CSVDataStore, ParquetDataStore
@@ -14,6 +15,7 @@ from smif.metadata import Spec
     params=[
         'memory',
         'file_csv',
+        'file_hybrid',
         'file_parquet',
         param('database', marks=mark.skip)]
     )
@@ -23,6 +25,9 @@ def handler(request, setup_empty_folder_structure):
     elif request.param == 'file_csv':
         base_folder = setup_empty_folder_structure
         handler = CSVDataStore(base_folder)
+    elif request.param == 'file_hybrid':
+        base_folder = setup_empty_folder_structure
+        handler = CSVDataStore(base_folder, hybrid=True)
     elif request.param == 'file_parquet':
         base_folder = setup_empty_folder_structure
         handler = ParquetDataStore(base_folder)
@@ -165,6 +170,31 @@ class TestCoefficients():
         actual = handler.read_coefficients('from_dim_name', 'to_dim_name')
         np.testing.assert_equal(actual, expected)
 
+    def test_read_write_sparse_coefficients(self, handler):
+        expected = sparse.csr_matrix(np.identity(3))
+        handler.write_coefficients('from_dim_name', 'to_dim_name', expected)
+
+        actual = handler.read_coefficients('from_dim_name', 'to_dim_name')
+        assert sparse.issparse(actual)
+        np.testing.assert_equal(actual.toarray(), expected.toarray())
+
+        # dense coefficients replace sparse
+        handler.write_coefficients('from_dim_name', 'to_dim_name', np.array([[2]]))
+        actual = handler.read_coefficients('from_dim_name', 'to_dim_name')
+        np.testing.assert_equal(actual, np.array([[2]]))
+
+    def test_read_write_coefficients_key(self, handler):
+        """Coefficients written with a key should only be read with the same key
+        """
+        handler.write_coefficients('from_dim_name', 'to_dim_name', np.array([[2]]), 'abc')
+
+        actual = handler.read_coefficients('from_dim_name', 'to_dim_name', 'abc')
+        np.testing.assert_equal(actual, np.array([[2]]))
+        with raises(SmifDataNotFoundError):
+            handler.read_coefficients('from_dim_name', 'to_dim_name', 'def')
+        with raises(SmifDataNotFoundError):
+            handler.read_coefficients('from_dim_name', 'to_dim_name')
+
 
 class TestResults():
     """Read/write results and prepare warm start
@@ -3,9 +3,12 @@
 # pylint: disable=redefined-outer-name
 import csv
 import os
+import pickle
+import shutil
 from tempfile import TemporaryDirectory
 
 import numpy as np
+import pandas
 from pytest import fixture, mark, raises
 from smif.data_layer.data_array import DataArray
 from smif.data_layer.file.file_data_store import CSVDataStore
@@ -241,6 +244,79 @@ class TestScenarios:
         actual = config_handler.read_scenario_variant_data(key, scenario_spec, 2015)
         assert actual == expected
 
+    def test_scenario_data_timestep_cache(self, setup_folder_structure, config_handler,
+                                          get_remapped_scenario_data, scenario_spec,
+                                          monkeypatch):
+        """Reading several timesteps from a scenario file should parse the file once
+        """
+        key = _write_scenario_csv(setup_folder_structure, get_remapped_scenario_data,
+                                  ('population_count', 'county', 'season', 'timestep'))
+
+        calls = []
+        read_csv = pandas.read_csv
+
+        def counting_read_csv(*args, **kwargs):
+            calls.append(args)
+            return read_csv(*args, **kwargs)
+
+        monkeypatch.setattr(pandas, 'read_csv', counting_read_csv)
+
+        first = config_handler.read_scenario_variant_data(key, scenario_spec, 2015)
+        second = config_handler.read_scenario_variant_data(key, scenario_spec, 2016)
+        again = config_handler.read_scenario_variant_data(key, scenario_spec, 2015)
+
+        assert len(calls) == 1
+        assert first == again
+        np.testing.assert_equal(second.data, np.array([[100, 150, 200, 200]]))
+
+        with raises(SmifDataNotFoundError):
+            config_handler.read_scenario_variant_data(key, scenario_spec, 2017)
+
+    def test_scenario_data_timestep_cache_invalidated(
+            self, setup_folder_structure, config_handler, get_remapped_scenario_data,
+            scenario_spec):
+        """Cached timestep data should be replaced when the file is rewritten
+        """
+        key = _write_scenario_csv(setup_folder_structure, get_remapped_scenario_data,
+                                  ('population_count', 'county', 'season', 'timestep'))
+        config_handler.read_scenario_variant_data(key, scenario_spec, 2015)
+
+        expected = DataArray(scenario_spec, np.array([[1, 2, 3, 4]]))
+        config_handler.write_scenario_variant_data(key, expected, 2015)
+
+        actual = config_handler.read_scenario_variant_data(key, scenario_spec, 2015)
+        assert actual == expected
+
+    def test_scenario_data_timestep_cache_copied(self, setup_folder_structure, config_handler,
+                                                 get_remapped_scenario_data, scenario_spec):
+        """Changing data read through the timestep cache should leave the cache unchanged
+        """
+        key = _write_scenario_csv(setup_folder_structure, get_remapped_scenario_data,
+                                  ('population_count', 'county', 'season', 'timestep'))
+        path = os.path.join(config_handler.data_folders['scenarios'], key)
+        expected = config_handler._read_timestep_slice(path, scenario_spec, 2015)
+        expected_values = expected.copy()
+
+        expected['population_count'] = 0
+        actual = config_handler._read_timestep_slice(path, scenario_spec, 2015)
+        pandas.testing.assert_frame_equal(actual, expected_values)
+
+    def test_scenario_data_timestep_cache_size(self, setup_folder_structure,
+                                               get_remapped_scenario_data, scenario_spec):
+        """Timestep cache should hold at most the configured number of files
+        """
+        store = CSVDataStore(str(setup_folder_structure), timestep_cache_size=1)
+        key = _write_scenario_csv(setup_folder_structure, get_remapped_scenario_data,
+                                  ('population_count', 'county', 'season', 'timestep'))
+        other_key = 'population_low.csv'
+        shutil.copy(os.path.join(store.data_folders['scenarios'], key),
+                    os.path.join(store.data_folders['scenarios'], other_key))
+
+        store.read_scenario_variant_data(key, scenario_spec, 2015)
+        store.read_scenario_variant_data(other_key, scenario_spec, 2015)
+
+        assert len(store._timestep_cache) == 1
+
 
 class TestNarrativeVariantData:
     """Narratives, parameters and interventions should be readable, metadata is editable. May
@@ -446,6 +522,83 @@ class TestResults:
             modelrun, model, output_spec, timestep, decision_iteration)
         assert actual == expected
 
+    def test_available_results_catalogued(self, setup_folder_structure, config_handler,
+                                          sample_results):
+        """Results written by the store are listed from the catalogue of the model run
+        """
+        modelrun = 'energy_transport_baseline'
+        config_handler.write_results(sample_results, modelrun, 'energy_demand', 2010, 1)
+        config_handler.write_results_many(
+            [sample_results], modelrun, 'energy_demand', 2015, None)
+
+        catalogue = os.path.join(
+            str(setup_folder_structure), "results", modelrun, "catalogue.db")
+        assert os.path.isfile(catalogue)
+        assert config_handler.available_results(modelrun) == [
+            (2010, 1, 'energy_demand', sample_results.name),
+            (2015, None, 'energy_demand', sample_results.name)
+        ]
+
+        # results folder removed along with the catalogue
+        shutil.rmtree(os.path.join(str(setup_folder_structure), "results", modelrun))
+        assert config_handler.available_results(modelrun) == []
+
+    def test_rebuild_catalogue(self, setup_folder_structure, config_handler, sample_results):
+        """Results written other than by the store are catalogued on rebuild, or when first
+        listed
+        """
+        modelrun = 'energy_transport_baseline'
+        config_handler.write_results(sample_results, modelrun, 'energy_demand', 2010, 1)
+
+        path = os.path.join(
+            str(setup_folder_structure), "results", modelrun, "energy_demand",
+            "decision_1", "output_{}_timestep_2015.csv".format(sample_results.name))
+        shutil.copy(path.replace('2015', '2010'), path)
+        assert len(config_handler.available_results(modelrun)) == 1
+
+        assert config_handler.rebuild_catalogue() == 2
+        assert config_handler.available_results(modelrun) == [
+            (2010, 1, 'energy_demand', sample_results.name),
+            (2015, 1, 'energy_demand', sample_results.name)
+        ]
+
+        os.remove(os.path.join(
+            str(setup_folder_structure), "results", modelrun, "catalogue.db"))
+        assert len(config_handler.available_results(modelrun)) == 2
+
+    def test_catalogue_connection(self, setup_folder_structure, config_handler,
+                                  sample_results):
+        """The catalogue of a model run keeps one connection, which is not pickled
+        """
+        modelrun = 'energy_transport_baseline'
+        config_handler.write_results(sample_results, modelrun, 'energy_demand', 2010, 1)
+        catalogue = config_handler._get_catalogue(modelrun)
+        connection = catalogue._connection
+        assert connection is not None
+
+        config_handler.write_results(sample_results, modelrun, 'energy_demand', 2015, 1)
+        assert config_handler._get_catalogue(modelrun)._connection is connection
+
+        copied = pickle.loads(pickle.dumps(config_handler))
+        assert copied._get_catalogue(modelrun)._connection is None
+        assert len(copied.available_results(modelrun)) == 2
+
+        catalogue.close()
+        assert catalogue._connection is None
+        assert len(config_handler.available_results(modelrun)) == 2
+
+    def test_write_results_many_checks_types(self, config_handler, sample_results):
+        """Timestep and decision iteration should be integers
+        """
+        modelrun = 'energy_transport_baseline'
+        with raises(AssertionError):
+            config_handler.write_results_many(
+                [sample_results], modelrun, 'energy_demand', '2010')
+        with raises(AssertionError):
+            config_handler.write_results_many(
+                [sample_results], modelrun, 'energy_demand', 2010, 1.5)
+        assert config_handler.available_results(modelrun) == []
+
 
 @mark.skip(reason="Move to test available_results implementation")
 class TestWarmStart:
@@ -646,3 +799,37 @@ class TestCoefficients:
             # start with empty project (no data/coefficients subdirectory)
             with raises(SmifDataNotFoundError):
                 CSVDataStore(tmpdirname)
+
+
+class TestHybrid:
+    """Coefficients and state are written in binary files in hybrid mode, and text files
+    written before are still read
+    """
+    def test_read_text_coefficients(self, setup_folder_structure):
+        CSVDataStore(str(setup_folder_structure)).write_coefficients(
+            'from_dim', 'to_dim', np.array([[2.0]]))
+        store = CSVDataStore(str(setup_folder_structure), hybrid=True)
+        np.testing.assert_equal(
+            store.read_coefficients('from_dim', 'to_dim'), np.array([[2.0]]))
+
+        store.write_coefficients('from_dim', 'to_dim', np.array([[3.0]]))
+        coefficients = os.listdir(os.path.join(
+            str(setup_folder_structure), 'data', 'coefficients'))
+        assert 'from_dim.to_dim.npy' in coefficients
+        assert 'from_dim.to_dim.txt.gz' not in coefficients
+
+        actual = store.read_coefficients('from_dim', 'to_dim')
+        assert isinstance(actual, np.memmap)
+        np.testing.assert_equal(actual, np.array([[3.0]]))
+
+    def test_read_text_state(self, setup_folder_structure, state):
+        CSVDataStore(str(setup_folder_structure)).write_state(state, 'test_modelrun', 2010)
+        store = CSVDataStore(str(setup_folder_structure), hybrid=True)
+        assert store.read_state('test_modelrun', 2010) == state
+
+        store.write_state(state, 'test_modelrun', 2010)
+        results = os.listdir(os.path.join(str(setup_folder_structure), 'results',
+                                          'test_modelrun'))
+        assert 'state_2010.arrow' in results
+        assert 'state_2010.csv' not in results
+        assert store.read_state('test_modelrun', 2010) == state
@@ -0,0 +1,156 @@
+"""Test Parquet data store
+"""
+# pylint: disable=redefined-outer-name
+import os
+
+import numpy as np
+import pandas
+import pyarrow.parquet as pq
+from pytest import fixture, raises
+from smif.data_layer.data_array import DataArray
+from smif.data_layer.file.file_data_store import ParquetDataStore
+from smif.exception import SmifDataNotFoundError
+from smif.metadata import Spec
+
+
+@fixture
+def store(setup_empty_folder_structure):
+    return ParquetDataStore(str(setup_empty_folder_structure), compression='zstd')
+
+
+@fixture
+def spec():
+    return Spec(
+        name='population',
+        unit='people',
+        dtype='float',
+        dims=['county'],
+        coords={'county': ['oxford', 'cambridge']}
+    )
+
+
+class TestPartitionedData:
+    def test_write_partitions(self, store, spec):
+        """Data written for a timestep should go to a partition for that timestep
+        """
+        store.write_scenario_variant_data(
+            'population', DataArray(spec, np.array([1., 2.])), 2015)
+        store.write_scenario_variant_data(
+            'population', DataArray(spec, np.array([3., 4.])), 2020)
+
+        path = os.path.join(store.data_folders['scenarios'], 'population')
+        assert sorted(os.listdir(path)) == ['timestep=2015', 'timestep=2020']
+        metadata = pq.read_metadata(os.path.join(path, 'timestep=2020', 'part-0.parquet'))
+        assert metadata.row_group(0).column(0).compression == 'ZSTD'
+
+        actual = store.read_scenario_variant_data('population', spec, 2020)
+        assert actual == DataArray(spec, np.array([3., 4.]))
+
+        with raises(SmifDataNotFoundError) as ex:
+            store.read_scenario_variant_data('population', spec, 2025)
+        assert "not found for timestep 2025" in str(ex)
+
+    def test_overwrite_partition(self, store, spec):
+        """Writing a timestep again should replace only that timestep
+        """
+        store.write_scenario_variant_data(
+            'population', DataArray(spec, np.array([1., 2.])), 2015)
+        store.write_scenario_variant_data(
+            'population', DataArray(spec, np.array([3., 4.])), 2020)
+        store.write_scenario_variant_data(
+            'population', DataArray(spec, np.array([5., 6.])), 2015)
+
+        actual = store.read_scenario_variant_data('population', spec, 2015)
+        assert actual == DataArray(spec, np.array([5., 6.]))
+        actual = store.read_scenario_variant_data('population', spec, 2020)
+        assert actual == DataArray(spec, np.array([3., 4.]))
+
+    def test_read_all_timesteps(self, store, spec):
+        """Reading without a timestep should read all partitions
+        """
+        store.write_scenario_variant_data(
+            'population', DataArray(spec, np.array([1., 2.])), 2015)
+        store.write_scenario_variant_data(
+            'population', DataArray(spec, np.array([3., 4.])), 2020)
+
+        timeseries_spec = Spec(
+            name='population',
+            dtype='float',
+            dims=['timestep', 'county'],
+            coords={'timestep': [2015, 2020], 'county': ['oxford', 'cambridge']}
+        )
+        actual = store.read_scenario_variant_data('population', timeseries_spec)
+        assert actual == DataArray(timeseries_spec, np.array([[1., 2.], [3., 4.]]))
+
+
+class TestMigrate:
+    def test_migrate_scenario(self, store, spec):
+        """Unpartitioned scenario files with a timestep column should be partitioned
+        """
+        path = os.path.join(store.data_folders['scenarios'], 'population.parquet')
+        pandas.DataFrame({
+            'timestep': [2015, 2015, 2020, 2020],
+            'county': ['oxford', 'cambridge', 'oxford', 'cambridge'],
+            'population': [1., 2., 3., 4.]
+        }).set_index(['timestep', 'county']).to_parquet(path, compression='gzip')
+
+        before = store.read_scenario_variant_data('population.parquet', spec, 2020)
+        migrated = store.migrate()
+
+        assert migrated == [path]
+        assert os.path.isdir(path)
+        after = store.read_scenario_variant_data('population.parquet', spec, 2020)
+        assert after == before
+
+    def test_migrate_results(self, store, spec):
+        """Results should be recompressed in place
+        """
+        data = DataArray(spec, np.array([1., 2.]))
+        gzip_store = ParquetDataStore(store.base_folder, compression='gzip')
+        gzip_store.write_results(data, 'test_modelrun', 'energy', 2010, 0)
+        csv_path = os.path.join(store.data_folders['scenarios'], 'population.csv')
+        with open(csv_path, 'w') as file_handle:
+            file_handle.write('county,population\noxford,1\n')
+
+        migrated = store.migrate()
+
+        assert len(migrated) == 1
+        metadata = pq.read_metadata(migrated[0])
+        assert metadata.row_group(0).column(0).compression == 'ZSTD'
+        assert store.read_results('test_modelrun', 'energy', spec, 2010, 0) == data
+
+
+class TestMemoryMap:
+    def test_read_memory_mapped(self, setup_empty_folder_structure, spec):
+        """Data should be read-only when memory-mapped, and writeable otherwise
+        """
+        data = DataArray(spec, np.array([1., 2.]))
+        store = ParquetDataStore(str(setup_empty_folder_structure), memory_map=True)
+        store.write_scenario_variant_data('population', data, 2015)
+        store.write_results(data, 'test_modelrun', 'energy', 2010, 0)
+
+        actual = store.read_scenario_variant_data('population', spec, 2015)
+        assert actual == data
+        assert not actual.data.flags.writeable
+        actual = store.read_results('test_modelrun', 'energy', spec, 2010, 0)
+        assert actual == data
+        assert not actual.data.flags.writeable
+
+        store = ParquetDataStore(str(setup_empty_folder_structure))
+        actual = store.read_results('test_modelrun', 'energy', spec, 2010, 0)
+        assert actual == data
+        assert actual.data.flags.writeable
+
+
+class TestCoefficients:
+    def test_read_memory_mapped(self, store):
+        """Dense coefficients should be memory-mapped, and rewriting them should not change
+        arrays already read
+        """
+        store.write_coefficients('from_dim', 'to_dim', np.identity(3))
+        first = store.read_coefficients('from_dim', 'to_dim')
+        assert isinstance(first, np.memmap)
+
+        store.write_coefficients('from_dim', 'to_dim', np.ones((3, 3)))
+        np.testing.assert_equal(first, np.identity(3))
+        np.testing.assert_equal(store.read_coefficients('from_dim', 'to_dim'), np.ones((3, 3)))
@@ -1,6 +1,9 @@
 """Test all MetadataStore implementations
 """
+import json
+
 from pytest import fixture, mark, param
+from shapely import wkb
 from smif.data_layer.database_interface import DbMetadataStore
 from smif.data_layer.file.file_metadata_store import FileMetadataStore
 from smif.data_layer.memory_interface import MemoryMetadataStore
@@ -97,3 +100,56 @@ def sorted_by_name(list_):
     """Helper to sort lists-of-dicts
     """
     return sorted(list_, key=lambda d: d['name'])
+
+
+class TestSpatialDimensions():
+    """Spatial dimension files should be cached after the first read
+    """
+    def test_read_spatial_cached(self, setup_folder_structure, monkeypatch):
+        handler = FileMetadataStore(setup_folder_structure)
+        expected = handler._read_dimension_file('test_region.geojson')
+        assert [element['name'] for element in expected] == ['oxford']
+
+        def read_spatial_file(filepath):
+            raise AssertionError("should read from cache")
+        monkeypatch.setattr(FileMetadataStore, '_read_spatial_file', read_spatial_file)
+
+        actual = FileMetadataStore(setup_folder_structure)._read_dimension_file(
+            'test_region.geojson')
+        assert actual == expected
+
+    def test_read_spatial_changed(self, setup_folder_structure, oxford_region):
+        """Cached elements should be replaced when the file changes
+        """
+        FileMetadataStore(setup_folder_structure)._read_dimension_file('test_region.geojson')
+
+        oxford_region['features'][0]['properties']['name'] = 'oxford_changed'
+        setup_folder_structure.join('data', 'dimensions', 'test_region.geojson').write(
+            json.dumps(oxford_region))
+        actual = FileMetadataStore(setup_folder_structure)._read_dimension_file(
+            'test_region.geojson')
+        assert [element['name'] for element in actual] == ['oxford_changed']
+
+        cache_folder = setup_folder_structure.join('data', 'dimensions', '.spatial_cache')
+        assert len(cache_folder.listdir()) == 1
+
+    def test_read_spatial_unwritable(self, setup_folder_structure):
+        """Spatial dimension files should be read if the cache cannot be written
+        """
+        setup_folder_structure.join('data', 'dimensions', '.spatial_cache').write('')
+        handler = FileMetadataStore(setup_folder_structure)
+        actual = handler._read_dimension_file('test_region.geojson')
+        assert [element['name'] for element in actual] == ['oxford']
+
+    def test_read_geometries(self, setup_folder_structure):
+        setup_folder_structure.join('config', 'dimensions', 'test_region.yml').write(
+            "name: test_region\nelements: test_region.geojson\n")
+        handler = FileMetadataStore(setup_folder_structure)
+        elements = handler.read_dimension('test_region')['elements']
+        assert 'geometry' in elements[0]['feature']
+        assert 'spatial_key' not in elements[0]
+
+        geometries = handler.read_dimension_geometries('test_region')
+        assert list(geometries) == ['oxford']
+        region_wkb, bounds = geometries['oxford']
+        assert wkb.loads(region_wkb).bounds == bounds
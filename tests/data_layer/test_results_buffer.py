@@ -0,0 +1,95 @@
+"""Test writing results in the background
+"""
+from threading import Event, Timer
+from unittest.mock import Mock
+
+import numpy as np
+from pytest import fixture, raises
+from smif.data_layer.data_array import DataArray
+from smif.data_layer.memory_interface import MemoryDataStore
+from smif.data_layer.results_buffer import ResultsBuffer
+from smif.exception import SmifDataError, SmifDataNotFoundError
+from smif.metadata import Spec
+
+
+@fixture
+def spec():
+    return Spec(name='energy', dtype='float', dims=['region'], coords={'region': ['a', 'b']})
+
+
+@fixture
+def blocked_store():
+    """Store which holds each write until `release` is set
+    """
+    store = MemoryDataStore()
+    store.release = Event()
+    write_results = store.write_results
+
+    def blocked_write_results(*args):
+        store.release.wait(5)
+        write_results(*args)
+
+    store.write_results = Mock(side_effect=blocked_write_results)
+    return store
+
+
+class TestResultsBuffer:
+    def test_read_before_written(self, spec, blocked_store):
+        """Results should be read from memory until written, then from the store
+        """
+        buffer = ResultsBuffer(blocked_store)
+        data = np.array([1., 2.])
+        buffer.write_results(DataArray(spec, data), 'run', 'model', 2010)
+        data[0] = 100  # results are copied, so the model may change its array
+
+        actual = buffer.read_results('run', 'model', spec, 2010)
+        np.testing.assert_equal(actual.data, np.array([1., 2.]))
+        with raises(SmifDataNotFoundError):
+            blocked_store.read_results('run', 'model', spec, 2010)
+
+        blocked_store.release.set()
+        buffer.close()
+        actual = blocked_store.read_results('run', 'model', spec, 2010)
+        np.testing.assert_equal(actual.data, np.array([1., 2.]))
+        assert buffer.read_results('run', 'model', spec, 2010) == actual
+
+    def test_bounded(self, spec, blocked_store):
+        """Writing should wait while the buffer is full
+        """
+        buffer = ResultsBuffer(blocked_store, max_workers=1, max_bytes=16)
+        buffer.write_results(DataArray(spec, np.array([1., 2.])), 'run', 'model', 2010)
+        assert buffer._nbytes == 16
+
+        Timer(0.1, blocked_store.release.set).start()
+        buffer.write_results(DataArray(spec, np.array([3., 4.])), 'run', 'model', 2015)
+        # returns once the first results are written
+        assert blocked_store.release.is_set()
+        assert buffer._nbytes <= 16
+        buffer.close()
+        assert buffer._nbytes == 0
+
+    def test_same_results_written_in_order(self, spec):
+        store = MemoryDataStore()
+        buffer = ResultsBuffer(store, max_workers=4)
+        for value in range(20):
+            buffer.write_results(
+                DataArray(spec, np.array([value, value], dtype=float)), 'run', 'model', 2010)
+        buffer.flush()
+
+        actual = store.read_results('run', 'model', spec, 2010)
+        np.testing.assert_equal(actual.data, np.array([19., 19.]))
+
+    def test_flush_raises(self, spec):
+        store = Mock()
+        store.write_results = Mock(side_effect=ValueError("disk full"))
+        buffer = ResultsBuffer(store)
+        buffer.write_results(DataArray(spec, np.array([1., 2.])), 'run', 'model', 2010)
+
+        with raises(SmifDataError) as ex:
+            buffer.flush()
+        assert "Could not write 1 results: ('run', 'model', 'energy', 2010, None)" in \
+            str(ex.value)
+        assert isinstance(ex.value.__cause__, ValueError)
+
+        # errors are reported once
+        buffer.close()
@@ -11,7 +11,7 @@ from smif.data_layer.data_array import DataArray
 from smif.data_layer.memory_interface import (MemoryConfigStore,
                                               MemoryDataStore,
                                               MemoryMetadataStore)
-from smif.metadata import Spec
+from smif.metadata import LazyCoordinates, Spec
 
 
 @fixture
@@ -89,6 +89,29 @@ class TestStoreConfig():
         for dim in sample_dimensions:
             store.delete_dimension(dim['name'])
 
+    def test_models_lazy_coords(self, store, get_sector_model, sample_dimensions):
+        # setup
+        for dim in sample_dimensions:
+            store.write_dimension(dim)
+        store.write_model(get_sector_model)
+
+        model = store.read_model(get_sector_model['name'], lazy_coords=True)
+        coords = model['inputs'][0]['coords']
+        for dim, dim_coords in coords.items():
+            assert isinstance(dim_coords, LazyCoordinates)
+            assert not dim_coords.loaded
+        # shared between reads, so compare equal without reading elements
+        other = store.read_models(lazy_coords=True)[0]
+        assert other['inputs'][0]['coords'] == coords
+        assert not any(dim_coords.loaded for dim_coords in coords.values())
+
+        # read elements on first use
+        spec = Spec.from_dict(model['inputs'][0])
+        expected = get_sector_model['inputs'][0]
+        assert spec.shape == tuple(len(expected['coords'][dim]) for dim in expected['dims'])
+        first_dim = expected['dims'][0]
+        assert spec.dim_elements(first_dim) == expected['coords'][first_dim]
+
     def test_models_skip_coords(self, store, get_sector_model, get_sector_model_no_coords):
         # write
         store.write_model(get_sector_model)
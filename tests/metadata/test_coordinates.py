@@ -1,9 +1,13 @@
 """Test Coordinates metadata
 """
+import pickle
 from collections import OrderedDict
+from copy import deepcopy
+from unittest.mock import Mock
 
+import numpy as np
 from pytest import mark, raises
-from smif.metadata import Coordinates
+from smif.metadata import Coordinates, LazyCoordinates
 
 
 class CustomMapping():
@@ -145,3 +149,124 @@ class TestCoordinates():
         assert a != c
         assert a != d
         assert a != e
+
+    def test_hash_consistent_with_eq(self):
+        """Equal coordinates should have equal hashes
+        """
+        coords = Coordinates('dim', [{'name': 1}, {'name': 2}])
+        other = Coordinates('dim', [{'name': 1.0}, {'name': 2.0}])
+        assert coords == other
+        assert hash(coords) == hash(other)
+        assert hash(Coordinates('dim', [[1, 2]])) == hash(Coordinates('dim', [[1, 2]]))
+
+    def test_positions(self):
+        """Positions of labels in ids, -1 if not found
+        """
+        coords = Coordinates('lad', ['b', 'c', 'a'])
+        actual = coords.positions(['a', 'b', 'x', 'a'])
+        assert actual.tolist() == [2, 0, -1, 2]
+
+        numeric = Coordinates('year', [2020, 2010, 2015])
+        assert numeric.positions([2010, 2015.0, 2011]).tolist() == [1, 2, -1]
+        # labels must match the type of ids
+        assert numeric.positions(['2010']).tolist() == [-1]
+
+    def test_positions_mixed_types(self):
+        """Positions of labels in ids of mixed types
+        """
+        coords = Coordinates('mixed', ['a', 1])
+        assert coords.positions(['a', 1, '1']).tolist() == [0, 1, -1]
+        # fallback lookup is built once
+        lookup = coords._positions
+        assert coords.positions([1]).tolist() == [1]
+        assert coords._positions is lookup
+
+    def test_digest(self):
+        """Digest should identify the coordinate elements
+        """
+        coords = Coordinates('lad', ['a', 'b'])
+        assert coords.digest == Coordinates('other_name', ['a', 'b']).digest
+        assert coords.digest != Coordinates('lad', ['b', 'a']).digest
+        assert coords.digest != Coordinates(
+            'lad', [{'name': 'a', 'area': 1}, {'name': 'b', 'area': 1}]).digest
+
+    def test_positions_object_labels(self):
+        """Object arrays of labels, as from a pandas index, should use the sorted lookup
+        """
+        coords = Coordinates('lad', ['b', 'c', 'a'])
+        labels = np.array(['a', 'b', 'x'], dtype=object)
+        assert coords.positions(labels).tolist() == [2, 0, -1]
+        assert coords._positions is None
+
+        numeric = Coordinates('year', [2020, 2010, 2015])
+        labels = np.array([2010, 2011], dtype=object)
+        assert numeric.positions(labels).tolist() == [1, -1]
+        assert numeric._positions is None
+
+    def test_intern(self):
+        """Interned coordinates should be shared between equal definitions
+        """
+        elements = [{'name': 'a', 'area': 1}, {'name': 'b', 'area': 2}]
+        coords = Coordinates.intern('lad', elements)
+        assert Coordinates.intern('lad', [dict(e) for e in elements]) is coords
+        assert Coordinates.intern('lad', ['a', 'b']) is not coords
+        assert Coordinates.intern('lad', ['a', 'b']) is Coordinates.intern('lad', ['a', 'b'])
+        assert Coordinates.intern('other', elements) is not coords
+        assert Coordinates.intern(
+            'lad', [{'name': 'a', 'area': 1}, {'name': 'b', 'area': 3}]) is not coords
+
+        # equal to coordinates which are not interned
+        assert coords == Coordinates('lad', elements)
+        assert hash(coords) == hash(Coordinates('lad', elements))
+
+        # changes to the list or its elements do not change the shared coordinates
+        elements.append({'name': 'c', 'area': 3})
+        elements[0]['area'] = 10
+        assert coords.ids == ['a', 'b']
+        assert coords.elements == [{'name': 'a', 'area': 1}, {'name': 'b', 'area': 2}]
+
+    def test_intern_immutable(self):
+        """Interned coordinates cannot be renamed, and are interned again when unpickled
+        """
+        coords = Coordinates.intern('lad', ['a', 'b'])
+        with raises(AttributeError):
+            coords.name = 'other'
+        with raises(AttributeError):
+            coords.dim = 'other'
+        assert pickle.loads(pickle.dumps(coords)) is coords
+
+        not_interned = Coordinates('lad', ['a', 'b'])
+        copied = pickle.loads(pickle.dumps(not_interned))
+        assert copied == not_interned
+        copied.name = 'other'
+
+    def test_position(self):
+        """Position of a single label, and ids as an array
+        """
+        coords = Coordinates.intern('lad', ['b', 'c', 'a'])
+        assert coords.position('a') == 2
+        with raises(KeyError):
+            coords.position('x')
+        assert coords.id_array.tolist() == ['b', 'c', 'a']
+        assert not coords.id_array.flags.writeable
+
+    def test_lazy(self):
+        """Lazy coordinates read elements once, on first use
+        """
+        load_elements = Mock(return_value=[{'name': 'a'}, {'name': 'b'}])
+        coords = LazyCoordinates('lad', load_elements)
+        assert coords.name == 'lad'
+        assert not coords.loaded
+        assert "not loaded" in repr(coords)
+        assert deepcopy(coords) is coords
+        load_elements.assert_not_called()
+
+        assert coords.ids == ['a', 'b']
+        assert coords.position('b') == 1
+        assert coords == Coordinates('lad', ['a', 'b'])
+        load_elements.assert_called_once_with()
+
+        with raises(AttributeError):
+            coords.name = 'other'
+        copied = pickle.loads(pickle.dumps(coords))
+        assert copied is Coordinates.intern('lad', [{'name': 'a'}, {'name': 'b'}])
@@ -194,6 +194,15 @@ class TestSpec():
         assert spec.coords[0].name == 'countries'
         assert spec.coords[0].ids == ["England", "Wales"]
 
+    def test_coords_shared(self):
+        """Specs from equal definitions should share coordinates
+        """
+        definition = {'dims': ['x'], 'coords': {'x': [1, 2]}, 'dtype': 'int'}
+        a = Spec.from_dict(dict(definition, name='a'))
+        b = Spec.from_dict(dict(definition, name='b'))
+        assert a.dim_coords('x') is b.dim_coords('x')
+        assert a == b
+
     def test_coords_from_dict_error(self):
         """A Spec constructed with a dict must have dims
         """